@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Measure per-record cost of compiled record filters.
+
+Records are parsed from saved archive page and matched against filter
+lists and expressions. Watchlist matchers are measured on generated
+watchlists of growing size.
+
+Config file isn't needed:
+    python3 benchmarks/filters.py [-n 2000] [--archive PAGE]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FIXTURES = os.path.join(_ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, _ROOT)
+
+from zoneh.filters.engine import FilterEngine  # noqa: E402
+from zoneh.filters.matchers import (  # noqa: E402
+    AhoCorasick, CidrTree, SuffixTrie
+)
+from zoneh.parsers.htmlparser import HTMLParser  # noqa: E402
+
+_CASES = (
+    ('no filters', {}),
+    ('lists', {'countries': ['FR', 'BR'], 'domains': ['.go.id', '.gov.br'],
+               'notifiers': ['BrB']}),
+    ('and', {'expression': 'country = BR and domain suffix .gov.br'}),
+    ('and not regex', {'expression': 'domain suffix .gov.br and '
+                                     'not notifier ~ "(?i)^test"'}),
+    ('or merged', {'expression': 'country = FR or country = BR or '
+                                 'country = ID or notifier = BrB'}),
+    ('nested', {'expression': '(country = BR or country = ID) and '
+                              '(domain suffix .gov.br or domain suffix '
+                              '.go.id) and os != Win'}),
+)
+_WATCHLIST_SIZES = (100, 10000, 100000)
+_MATCHERS = (
+    ('suffix trie', SuffixTrie, lambda i: f'.d{i}.example.org',
+     'www.site.unknown.gov.br'),
+    ('aho-corasick', AhoCorasick, lambda i: f'kw{i}x',
+     'http://www.site.unknown.gov.br/index.php?page=kw12'),
+    ('cidr tree', CidrTree, lambda i: f'{i >> 8 & 255}.{i & 255}.0.0/16',
+     '203.0.113.7'),
+)
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as fd:
+        return fd.read()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('-n', '--number', type=int, default=2000)
+    arg_parser.add_argument('--archive', default=os.path.join(
+        _FIXTURES, 'archive.html'))
+    args = arg_parser.parse_args()
+
+    records = [record for record, _ in
+               HTMLParser().get_records(_read(args.archive))]
+    print(f'{len(records)} records')
+    print(f'{"filter":<14} {"us/record":>10} {"matched":>8}')
+    for name, conf in _CASES:
+        match = FilterEngine(conf).match
+        matched = sum(map(match, records))
+        total = min(timeit.repeat(lambda: list(map(match, records)),
+                                  number=args.number, repeat=3))
+        per_record = total / args.number / len(records) * 1e6
+        print(f'{name:<14} {per_record:>10.3f} {matched:>8}')
+
+    print()
+    print(f'{"matcher":<14} ' + ' '.join(f'{f"us@{size}":>10}'
+                                         for size in _WATCHLIST_SIZES))
+    for name, matcher_cls, make_entry, key in _MATCHERS:
+        timings = []
+        for size in _WATCHLIST_SIZES:
+            match = matcher_cls(map(make_entry, range(size))).match
+            timings.append(min(timeit.repeat(
+                lambda: match(key), number=args.number, repeat=3)) /
+                args.number * 1e6)
+        print(f'{name:<14} ' + ' '.join(f'{x:>10.3f}' for x in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Compare HTML parser backends on saved Zone-H pages.
+
+Config file isn't needed:
+    python3 benchmarks/parsers.py [-n 200] [--archive PAGE] [--mirror PAGE]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FIXTURES = os.path.join(_ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, _ROOT)
+
+from zoneh.const import ParserBackend  # noqa: E402
+from zoneh.parsers.backends import get_backend  # noqa: E402
+from zoneh.parsers.htmlparser import HTMLParser  # noqa: E402
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as fd:
+        return fd.read()
+
+
+def _make_parser(backend):
+    return HTMLParser(backend=backend)
+
+
+def _bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('-n', '--number', type=int, default=200)
+    arg_parser.add_argument('--archive', default=os.path.join(
+        _FIXTURES, 'archive.html'))
+    arg_parser.add_argument('--mirror', default=os.path.join(
+        _FIXTURES, 'mirror.html'))
+    args = arg_parser.parse_args()
+
+    archive, mirror = _read(args.archive), _read(args.mirror)
+    print(f'{"backend":<8} {"archive ms":>11} {"mirror ms":>10}')
+    for name in (ParserBackend.SOUP, ParserBackend.STREAM,
+                 ParserBackend.LXML):
+        backend = get_backend(name)
+        if backend.NAME != name:
+            print(f'{name:<8} {"n/a":>11} {"n/a":>10}')
+            continue
+        parser = _make_parser(backend)
+        t_archive = _bench(lambda: list(parser.get_records(archive)),
+                           args.number)
+        t_mirror = _bench(lambda: parser.get_advanced_data(mirror),
+                          args.number)
+        print(f'{name:<8} {t_archive * 1000:>11.3f} {t_mirror * 1000:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
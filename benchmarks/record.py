@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Record Zone-H pages as benchmark fixtures.
+
+Pre-login page and `z.js` are fetched with a fresh session, archive and
+mirror pages with the bot's API client which solves cookie challenge.
+Page whose type differs from the expected one (e.g. captcha instead of
+archive) is saved under the name of its type, so captcha fixture is
+recorded when Zone-H asks for it.
+
+Run from the repository root with `config.json` in place:
+    python3 benchmarks/record.py [--archive special] [--page 1]
+        [--mirror ID] [--out DIR]
+"""
+
+import argparse
+import os
+import sys
+
+import requests
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+from zoneh.clients.zoneh import ZoneHAPI  # noqa: E402
+from zoneh.conf import load_config  # noqa: E402
+from zoneh.const import (  # noqa: E402
+    ARCHIVE_TYPES, COOKIES_JS_URL, HEADERS, PageType
+)
+from zoneh.parsers.classifier import classify_page  # noqa: E402
+from zoneh.parsers.htmlparser import HTMLParser  # noqa: E402
+
+
+def _save(out_dir, name, text):
+    path = os.path.join(out_dir, name)
+    with open(path, 'w', encoding='utf-8') as fd:
+        fd.write(text)
+    print(f'Saved {path} ({len(text)} chars)')
+
+
+def _save_page(out_dir, name, expected, text):
+    """Save page under expected name or under name of its actual type."""
+    page_type = classify_page(text)
+    if page_type != expected:
+        print(f'Expected {expected} page for {name}, got {page_type}')
+        name = f'{page_type}.html'
+    _save(out_dir, name, text)
+    return page_type == expected
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--archive', default='special',
+                            choices=sorted(ARCHIVE_TYPES))
+    arg_parser.add_argument('--page', type=int, default=1)
+    arg_parser.add_argument('--mirror', type=int,
+                            help='mirror id, first record of page if unset')
+    arg_parser.add_argument('--out', default=os.path.join(
+        _ROOT, 'benchmarks', 'fixtures'))
+    args = arg_parser.parse_args()
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    _save_page(args.out, 'prelogin.html', PageType.PRELOGIN,
+               session.get(ARCHIVE_TYPES[args.archive]['base']).text)
+    _save(args.out, 'z.js', session.get(COOKIES_JS_URL).text)
+
+    api = ZoneHAPI(load_config()['zoneh'])
+    api.init_cookies()
+    archive = api.get_page(args.page, args.archive).text
+    if not _save_page(args.out, 'archive.html', PageType.RECORDS, archive):
+        return
+    mirror_id = args.mirror
+    if mirror_id is None:
+        record, _ = next(HTMLParser().get_records(archive))
+        mirror_id = record.mirror
+    _save_page(args.out, 'mirror.html', PageType.UNKNOWN,
+               api.get_mirror_page(mirror_id).text)
+
+
+if __name__ == '__main__':
+    main()
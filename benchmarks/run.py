@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Run benchmark suite on saved Zone-H pages and check for regressions.
+
+Every case reports operations per second and peak memory allocated by one
+operation. Import cases import bot modules in a fresh interpreter started
+outside of the repository, so they also check that importing doesn't need
+`config.json`. Results can be saved as baseline and later runs are
+compared against it, exit status is 1 when any case got slower or
+allocates more than allowed by thresholds.
+
+Config file isn't needed:
+    python3 benchmarks/run.py [-k NAME] [--save] [--compare]
+        [--baseline FILE] [--threshold 0.15] [--mem-threshold 0.25]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from functools import partial
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FIXTURES = os.path.join(_ROOT, 'benchmarks', 'fixtures')
+_BASELINE = os.path.join(_ROOT, 'benchmarks', 'baseline.json')
+sys.path.insert(0, _ROOT)
+
+from zoneh.clients.slowaes import _solve, solve_challenge  # noqa: E402
+from zoneh.const import ParserBackend  # noqa: E402
+from zoneh.filters.engine import FilterEngine  # noqa: E402
+from zoneh.parsers.backends import get_backend  # noqa: E402
+from zoneh.parsers.classifier import classify_page  # noqa: E402
+from zoneh.parsers.formatter import DigestRecord, FormattedRecord  # noqa
+from zoneh.parsers.htmlparser import HTMLParser, MirrorPageParser  # noqa
+from zoneh.processors.csv import CsvProcessor  # noqa: E402
+from zoneh.processors.export import ExportOptions, RecordExporter  # noqa
+from zoneh.useragents import UserAgentPool  # noqa: E402
+
+_EXPORT_RECORDS = 1000
+_MIN_TIME = 0.2
+_REPEAT = 5
+_IMPORT_MODULES = (('import.zoneh', 'zoneh.zoneh'),
+                   ('import.launcher', 'zoneh.launcher'))
+_IMPORT_SCRIPT = """
+import sys, time, tracemalloc
+if sys.argv[2] == 'memory':
+    tracemalloc.start()
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(time.perf_counter() - start, tracemalloc.get_traced_memory()[1])
+"""
+
+
+def _read(name):
+    with open(os.path.join(_FIXTURES, name), 'r', encoding='utf-8') as fd:
+        return fd.read()
+
+
+class _Fixtures:
+    """Saved pages and objects built from them."""
+
+    def __init__(self):
+        self.archive = _read('archive.html')
+        self.mirror = _read('mirror.html')
+        self.captcha = _read('captcha.html')
+        self.prelogin = _read('prelogin.html')
+        zjs_path = os.path.join(_FIXTURES, 'z.js')
+        self.zjs = _read('z.js') if os.path.isfile(zjs_path) else None
+        self.backend = get_backend(ParserBackend.LXML)
+        self.parser = HTMLParser(backend=self.backend)
+        self.records = [rec for rec, _ in self.parser.get_records(
+            self.archive)]
+        self.js_funcs, _ = self.parser.parse_cookies(self.prelogin)
+
+
+def _export_csv(records):
+    fd = io.StringIO()
+    writer = CsvProcessor(fd)
+    for record in records:
+        writer.write(record)
+    return fd
+
+
+def _export_gzip(records):
+    spool, _ = RecordExporter(ExportOptions.from_text(
+        '/csv compress=gzip')).export(records)
+    spool.close()
+
+
+def _solve_uncached(js_funcs):
+    _solve.cache_clear()
+    return solve_challenge(js_funcs)
+
+
+def _make_cases(fx):
+    """Return list of benchmark case names and functions."""
+    filter_lists = FilterEngine({'countries': ['FR', 'BR'],
+                                 'domains': ['.go.id', '.gov.br'],
+                                 'notifiers': ['BrB']}, {}).match
+    filter_expr = FilterEngine({'expression': (
+        '(country = BR or country = ID) and domain suffix .gov.br and '
+        'not notifier ~ "(?i)^test"')}, {}).match
+    export_records = (fx.records * (_EXPORT_RECORDS // len(fx.records) + 1)
+                      )[:_EXPORT_RECORDS]
+    cases = [
+        ('parse.archive', lambda: list(fx.parser.get_records(fx.archive))),
+        ('parse.mirror', lambda: MirrorPageParser(
+            fx.mirror, fx.backend).get_mirror_data()),
+        ('classify.pages', lambda: [classify_page(page) for page in (
+            fx.archive, fx.mirror, fx.captcha, fx.prelogin)]),
+        ('format.record', lambda: [FormattedRecord(rec, 1).format()
+                                   for rec in fx.records]),
+        ('format.digest', lambda: [DigestRecord(rec, 1).data
+                                   for rec in fx.records]),
+        ('filter.lists', lambda: list(map(filter_lists, fx.records))),
+        ('filter.expression', lambda: list(map(filter_expr, fx.records))),
+        ('export.csv', lambda: _export_csv(export_records)),
+        ('export.csv_gzip', lambda: _export_gzip(export_records)),
+        ('cookies.parse', lambda: fx.parser.parse_cookies(fx.prelogin)),
+        ('cookies.solve', lambda: _solve_uncached(fx.js_funcs)),
+        ('useragent.choice', UserAgentPool().choice),
+    ]
+    if fx.zjs:
+        import js2py
+        script = '\n'.join([fx.zjs, fx.js_funcs])
+        cases.append(('cookies.solve_js2py', lambda: js2py.eval_js(script)))
+    return cases
+
+
+def _measure(func):
+    """Return best operations per second and peak KB allocated by one
+    operation.
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * _MIN_TIME / elapsed))
+    best = min(timer.repeat(repeat=_REPEAT, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        func()
+        tracemalloc.clear_traces()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return 1 / best, peak / 1024
+
+
+def _run_import(module, mode):
+    """Import module in a fresh interpreter, return seconds and peak bytes."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, (_ROOT, os.environ.get('PYTHONPATH')))))
+    with tempfile.TemporaryDirectory() as cwd:
+        output = subprocess.run(
+            [sys.executable, '-c', _IMPORT_SCRIPT, module, mode], cwd=cwd,
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+    if output.returncode:
+        raise RuntimeError(f'Failed to import {module}:\n{output.stderr}')
+    seconds, peak = output.stdout.split()
+    return float(seconds), int(peak)
+
+
+def _measure_import(module):
+    """Return imports per second and peak KB allocated by import."""
+    best = min(_run_import(module, 'time')[0] for _ in range(_REPEAT))
+    return 1 / best, _run_import(module, 'memory')[1] / 1024
+
+
+def _load_baseline(path):
+    with open(path, 'r', encoding='utf-8') as fd:
+        return json.load(fd)['results']
+
+
+def _save_baseline(path, results):
+    data = {'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results}
+    with open(path, 'w', encoding='utf-8') as fd:
+        json.dump(data, fd, indent=2, sort_keys=True)
+    print(f'Baseline saved to {path}')
+
+
+def _compare(name, result, baseline, threshold, mem_threshold):
+    """Return comparison column text and whether case regressed."""
+    if name not in baseline:
+        return 'new', False
+    base = baseline[name]
+    speed = result['ops'] / base['ops'] - 1
+    memory = result['peak_kb'] / base['peak_kb'] - 1 \
+        if base['peak_kb'] else 0.0
+    regressed = speed < -threshold or memory > mem_threshold
+    mark = '  REGRESSION' if regressed else ''
+    return f'{speed:+7.1%} {memory:+8.1%}{mark}', regressed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('-k', dest='pattern', default='',
+                            help='run only cases containing pattern')
+    arg_parser.add_argument('--baseline', default=_BASELINE)
+    arg_parser.add_argument('--save', action='store_true',
+                            help='save results as baseline')
+    arg_parser.add_argument('--compare', action='store_true',
+                            help='compare results with baseline')
+    arg_parser.add_argument('--threshold', type=float, default=0.15,
+                            help='allowed ops/sec drop, fraction')
+    arg_parser.add_argument('--mem-threshold', type=float, default=0.25,
+                            help='allowed peak memory growth, fraction')
+    args = arg_parser.parse_args()
+
+    baseline = _load_baseline(args.baseline) if args.compare else {}
+    cases = [(name, partial(_measure, func))
+             for name, func in _make_cases(_Fixtures())]
+    cases.extend((name, partial(_measure_import, module))
+                 for name, module in _IMPORT_MODULES)
+    cases = [(name, measure) for name, measure in cases
+             if args.pattern in name]
+
+    header = f'{"case":<22} {"ops/sec":>12} {"us/op":>10} {"peak KB":>9}'
+    if args.compare:
+        header += f' {"speed":>7} {"memory":>8}'
+    print(header)
+    results = {}
+    regressions = []
+    for name, measure in cases:
+        ops, peak_kb = measure()
+        results[name] = {'ops': ops, 'peak_kb': peak_kb}
+        line = f'{name:<22} {ops:>12.1f} {1e6 / ops:>10.2f} {peak_kb:>9.1f}'
+        if args.compare:
+            column, regressed = _compare(name, results[name], baseline,
+                                         args.threshold, args.mem_threshold)
+            line += f' {column}'
+            if regressed:
+                regressions.append(name)
+        print(line, flush=True)
+
+    if args.save:
+        if args.pattern and os.path.isfile(args.baseline):
+            results = dict(_load_baseline(args.baseline), **results)
+        _save_baseline(args.baseline, results)
+    if regressions:
+        print(f'Regressed: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compare native and js2py solvers of Zone-H slowAES cookie challenge.
+
+js2py solver needs slowAES library saved from https://www.zone-h.org/z.js,
+it is skipped when the file is missing.
+
+Config file isn't needed:
+    python3 benchmarks/slowaes.py [-n 200] [--page PAGE] [--zjs Z_JS]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FIXTURES = os.path.join(_ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, _ROOT)
+
+from zoneh.clients.slowaes import _solve, solve_challenge  # noqa: E402
+from zoneh.parsers.htmlparser import HTMLParser  # noqa: E402
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as fd:
+        return fd.read()
+
+
+def _bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def _solve_uncached(js_funcs):
+    _solve.cache_clear()
+    return solve_challenge(js_funcs)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('-n', '--number', type=int, default=200)
+    arg_parser.add_argument('--page', default=os.path.join(
+        _FIXTURES, 'prelogin.html'))
+    arg_parser.add_argument('--zjs', default=os.path.join(_FIXTURES, 'z.js'))
+    args = arg_parser.parse_args()
+
+    js_funcs, _ = HTMLParser().parse_cookies(_read(args.page))
+    print(f'{"solver":<14} {"ms":>10}')
+    t_native = _bench(lambda: _solve_uncached(js_funcs), args.number)
+    print(f'{"native":<14} {t_native * 1000:>10.4f}')
+    t_cached = _bench(lambda: solve_challenge(js_funcs), args.number)
+    print(f'{"native cached":<14} {t_cached * 1000:>10.4f}')
+
+    if not os.path.isfile(args.zjs):
+        print(f'{"js2py":<14} {"n/a":>10}  (no {args.zjs})')
+        return
+    import js2py
+
+    script = '\n'.join([_read(args.zjs), js_funcs])
+    value = js2py.eval_js(script)
+    if value != solve_challenge(js_funcs):
+        print(f'Solvers disagree: js2py {value}, '
+              f'native {solve_challenge(js_funcs)}')
+    t_js = _bench(lambda: js2py.eval_js(script), max(1, args.number // 100))
+    print(f'{"js2py":<14} {t_js * 1000:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Run asyncio engine against local stand-in Zone-H server.
+
+Stand-in server serves saved pages from `benchmarks/fixtures`: pre-login
+challenge page until the challenge cookie is set, archive pages with
+`ETag`, mirror pages and captcha page every `--captcha-every` archive or
+mirror request until the captcha is solved. Engine crawls `special`
+archive with `--identities` identities, records are pushed to fake
+telegram chat which solves captchas it receives. Exit status is 1 when
+not all records are delivered, archive rescan doesn't get
+`304 Not Modified` or captcha solve fails.
+
+Config file isn't needed:
+    python3 benchmarks/standin.py [--identities 2] [--captcha-every 10]
+        [--timeout 30] [--verbose]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from threading import Event, Timer
+from types import SimpleNamespace
+
+from aiohttp import web
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FIXTURES = os.path.join(_ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, _ROOT)
+
+from zoneh.aio.client import AsyncIdentityPool  # noqa: E402
+from zoneh.aio.engine import AsyncEngine  # noqa: E402
+from zoneh.clients.cache import PageCache  # noqa: E402
+from zoneh.clients.pool import IdentityPool  # noqa: E402
+from zoneh.clients.slowaes import solve_challenge  # noqa: E402
+from zoneh.clients.zoneh import ZoneHAPI  # noqa: E402
+from zoneh.const import COOKIES_JS_NAME  # noqa: E402
+from zoneh.managers.captcha import captcha_manager  # noqa: E402
+from zoneh.parsers.htmlparser import HTMLParser  # noqa: E402
+from zoneh.processors.zoneh import ZonehProcessor  # noqa: E402
+from zoneh.threads.pusher import Pusher  # noqa: E402
+
+_PAGES = ('prelogin.html', 'archive.html', 'archive_last.html',
+          'mirror.html', 'captcha.html')
+_PAGE_NUM_REGEX = re.compile(r'page=(\d+)')
+_CAPTCHA_IMAGE = b'GIF89a\x01\x00\x01\x00\x00\x00\x00;'
+
+
+def _read(name):
+    with open(os.path.join(_FIXTURES, name), 'r', encoding='utf-8') as fd:
+        return fd.read()
+
+
+class StandInServer:
+    """Stand-in Zone-H server serving saved pages."""
+
+    def __init__(self, captcha_every):
+        """Class constructor."""
+        self._pages = {name: _read(name) for name in _PAGES}
+        js_funcs, _ = HTMLParser().parse_cookies(self._pages['prelogin.html'])
+        self._cookie = solve_challenge(js_funcs)
+        self._captcha_every = captcha_every
+        self._is_captcha = False
+        self._served = 0
+        self._runner = None
+        self.requests = Counter()
+        self.url = None
+
+    async def start(self):
+        """Start serving on random local port."""
+        app = web.Application()
+        app.router.add_get('/', self._index)
+        app.router.add_get('/archive/{tail:.*}', self._archive)
+        app.router.add_post('/archive/{tail:.*}', self._solve_captcha)
+        app.router.add_get('/mirror/id/{mirror_id}', self._mirror)
+        app.router.add_get('/captcha.py', self._captcha_img)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', 0).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f'http://{host}:{port}'
+
+    async def stop(self):
+        """Stop serving."""
+        await self._runner.cleanup()
+
+    def _html(self, name, **kwargs):
+        return web.Response(text=self._pages[name], content_type='text/html',
+                            **kwargs)
+
+    def _has_cookie(self, request):
+        return request.cookies.get(COOKIES_JS_NAME) == self._cookie
+
+    def _challenge(self, request):
+        """Return name of challenge page to serve instead of the requested
+        one or None.
+        """
+        if not self._has_cookie(request):
+            return 'prelogin.html'
+        if not self._is_captcha and self._captcha_every:
+            self._served += 1
+            self._is_captcha = self._served % self._captcha_every == 0
+        return 'captcha.html' if self._is_captcha else None
+
+    async def _index(self, request):
+        self.requests['prelogin'] += 1
+        if 'hz' in request.query and self._has_cookie(request):
+            return self._html('archive.html')
+        return self._html('prelogin.html')
+
+    async def _archive(self, request):
+        challenge = self._challenge(request)
+        if challenge:
+            self.requests[challenge] += 1
+            return self._html(challenge)
+
+        match = _PAGE_NUM_REGEX.search(request.path)
+        page_num = int(match.group(1)) if match else 1
+        name = 'archive.html' if page_num == 1 else 'archive_last.html'
+        etag = f'"{name}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.requests['archive 304'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        self.requests['archive'] += 1
+        return self._html(name, headers={'ETag': etag})
+
+    async def _solve_captcha(self, request):
+        self.requests['captcha solve'] += 1
+        data = await request.post()
+        if not data.get('captcha'):
+            return self._html('captcha.html')
+        self._is_captcha = False
+        return self._html('archive.html')
+
+    async def _mirror(self, request):
+        challenge = self._challenge(request)
+        if challenge:
+            self.requests[challenge] += 1
+            return self._html(challenge)
+        self.requests['mirror'] += 1
+        return self._html('mirror.html')
+
+    async def _captcha_img(self, request):
+        self.requests['captcha image'] += 1
+        return web.Response(body=_CAPTCHA_IMAGE, content_type='image/gif')
+
+
+class FakeChat:
+    """Telegram chat message stand-in, solves captchas it receives."""
+
+    chat_id = 1
+
+    def __init__(self):
+        """Class constructor."""
+        self._message_id = 0
+        self._solvers = []
+        self.messages = 0
+        self.errors = []
+
+    def reply_html(self, text, **kwargs):
+        self.messages += 1
+
+    def reply_photo(self, photo, caption):
+        self._message_id += 1
+        solver = Timer(0.1, self._solve_captcha, args=(self._message_id,))
+        self._solvers.append(solver)
+        solver.start()
+        return SimpleNamespace(message_id=self._message_id)
+
+    def close(self):
+        """Cancel captcha solves not started yet and wait for running
+        ones.
+        """
+        for solver in self._solvers:
+            solver.cancel()
+            solver.join()
+
+    def _solve_captcha(self, message_id):
+        try:
+            captcha_manager.solve_captcha('captcha', message_id)
+        except Exception as err:
+            self.errors.append(err)
+
+
+def _make_conf(captcha_timeout):
+    """Return `zoneh` config section of the template tuned for the
+    stand-in server.
+    """
+    with open(os.path.join(_ROOT, 'config-template.json'), 'r',
+              encoding='utf-8') as fd:
+        conf = json.load(fd)['zoneh']
+    conf['archive'] = 'special'
+    # Every record needs its mirror page.
+    conf['filters']['expression'] = 'ip in 0.0.0.0/0'
+    conf['rescan_period'] = 0.5
+    conf['seen_db'] = conf['record_db'] = None
+    conf['rate_limit'] = {'initial_rate': 200, 'min_rate': 50,
+                          'max_rate': 500, 'burst': 10}
+    conf['captcha_timeout'] = captcha_timeout
+    conf['delivery'].update(chat_rate=1000.0, global_rate=1000.0)
+    return conf
+
+
+def _expected_records():
+    """Return number of records the crawl should deliver."""
+    parser = HTMLParser()
+    mirrors = set()
+    for name in ('archive.html', 'archive_last.html'):
+        mirrors.update(record.mirror for record, _ in
+                       parser.get_records(_read(name)))
+    return len(mirrors)
+
+
+async def _wait_done(server, pusher, expected, timeout):
+    """Wait for all records to be delivered and rescan to get 304."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pusher.stats.records >= expected and \
+                server.requests['archive 304']:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def _run(args, cookie_dir):
+    server = StandInServer(args.captcha_every)
+    await server.start()
+    conf = _make_conf(args.timeout)
+    processor = ZonehProcessor(conf)
+    page_cache = PageCache()
+    pool = IdentityPool(
+        [ZoneHAPI(conf, name=f'standin{num}',
+                  cookie_file=os.path.join(cookie_dir, f'cookies{num}'),
+                  page_cache=page_cache, base_url=server.url)
+         for num in range(args.identities)],
+        conf['captcha_timeout'])
+    chat = FakeChat()
+    pusher = Pusher(conf, processor.push_queue,
+                    SimpleNamespace(message=chat))
+    captcha_manager.subscribe(processor.push_queue.put_captcha)
+
+    run_trigger = Event()
+    run_trigger.set()
+    engine = AsyncEngine(processor, pusher, run_trigger,
+                         api=AsyncIdentityPool(pool))
+    expected = _expected_records()
+    start = time.perf_counter()
+    engine_task = asyncio.ensure_future(engine.run())
+    is_done = await _wait_done(server, pusher, expected, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    run_trigger.clear()
+    captcha_manager.interrupt()
+    engine.stop()
+    await engine_task
+    # Captcha solves need the server.
+    await asyncio.get_event_loop().run_in_executor(None, chat.close)
+    await server.stop()
+    processor.close()
+
+    records = pusher.stats.records
+    print(f'identities        {args.identities}')
+    print(f'records           {records}/{expected} in {elapsed:.2f}s, '
+          f'{records / elapsed:.1f} records/s')
+    print(f'telegram messages {chat.messages}')
+    print(f'page cache        {page_cache!r}')
+    print('requests          ' + ', '.join(
+        f'{kind} {count}' for kind, count in sorted(server.requests.items())))
+    for err in chat.errors:
+        print(f'captcha solve error: {err!r}')
+    return is_done and records == expected and not chat.errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--identities', type=int, default=2)
+    parser.add_argument('--captcha-every', type=int, default=10,
+                        help='serve captcha every N archive or mirror '
+                             'requests, 0 disables captcha')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as cookie_dir:
+        loop = asyncio.get_event_loop()
+        is_ok = loop.run_until_complete(_run(args, cookie_dir))
+    if not is_ok:
+        print('FAILED: not all records delivered, rescan not cached or '
+              'captcha solve failed')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
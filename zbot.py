@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Main entry point."""
 
-from zoneh.launcher import ZBotLauncher
+from zoneh.conf import load_config
 from zoneh.log import init_logging
 
 __version__ = '0.2.2'
@@ -10,8 +10,11 @@ __version__ = '0.2.2'
 def main():
     """Main function."""
     init_logging()
+    conf = load_config()
 
-    zoneh = ZBotLauncher()
+    # Telegram and scraping stack is imported after config is validated.
+    from zoneh.launcher import ZBotLauncher
+    zoneh = ZBotLauncher(conf)
     zoneh.run()
 
 
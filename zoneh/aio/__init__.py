@@ -0,0 +1 @@
+"""asyncio scraping engine package."""
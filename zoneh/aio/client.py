@@ -0,0 +1,166 @@
+"""Async Zone-H API Client."""
+
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+import aiohttp
+
+import zoneh.exceptions as exc
+from zoneh.clients.zoneh import (
+    Page, classify_response, is_penalized, make_headers, observe_request
+)
+from zoneh.const import MIRROR_URL, Http, RequestKind
+
+Response = namedtuple('Response', ('status', 'headers', 'content', 'text',
+                                   'page_type'))
+
+
+class AsyncZoneHAPI:
+    """Async Zone-H API class.
+
+    Shares cookies, User-Agent, proxy, base URL, rate limiter and page
+    cache with `ZoneHAPI` identity, so captcha and cookie challenges are
+    still solved by the threaded client.
+    """
+
+    def __init__(self, api):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._api = api
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            headers=make_headers(self._api.base_url))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._session.close()
+        self._session = None
+
+    @property
+    def sync_api(self):
+        """Threaded client sharing session state with this one."""
+        return self._api
+
+    @property
+    def page_cache(self):
+        return self._api.page_cache
+
+    async def init_cookies(self, force=False):
+        """Init cookies using threaded client."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._api.init_cookies, force)
+
+    def page_url(self, page_num, type_):
+        """Return URL of archive page, it is the page cache key."""
+        return self._api.page_url(page_num, type_)
+
+    async def get_page(self, page_num, type_):
+        """Get Zone-H html-page for parsing by its type.
+
+        Return None when page is unchanged since its state was saved in
+        page cache.
+        """
+        url = self.page_url(page_num, type_)
+        res = await self._request(
+            url, headers=self._api.page_cache.get_headers(url),
+            kind=RequestKind.ARCHIVE)
+        if self._api.page_cache.is_unchanged(url, res.status, res.headers,
+                                             res.content):
+            return None
+        return Page(res.text, res.page_type)
+
+    async def get_mirror_page(self, mirror_id):
+        """Get Zone-H mirror html-page."""
+        url = self._api.rebase(MIRROR_URL).format(mirror_id=mirror_id)
+        res = await self._request(url, kind=RequestKind.MIRROR)
+        return Page(res.text, res.page_type)
+
+    async def _request(self, url, method=Http.GET, data=None, headers=None,
+                       kind=RequestKind.ARCHIVE):
+        """General request method."""
+        self._log.debug('%s: %s %s', method, url, data)
+        await self._api.limiter.acquire_async()
+        # Session User-Agent goes together with cookies of threaded client.
+        request_headers = {'User-Agent': self._api.user_agent}
+        if headers:
+            request_headers.update(headers)
+        start = time.monotonic()
+        try:
+            async with self._session.request(
+                    method, url, data=data, headers=request_headers,
+                    cookies=self._api.cookies, proxy=self._api.proxy) as res:
+                content = await res.read()
+                text = content.decode(res.get_encoding(), 'replace')
+                self._api.update_cookies(
+                    {name: morsel.value for name, morsel in
+                     res.cookies.items()})
+        except Exception:
+            observe_request(kind, 'error', start)
+            self._api.limiter.on_penalty()
+            err_msg = 'Issue with request to Zone-H'
+            self._log.exception(err_msg)
+            raise exc.ZoneHError(err_msg)
+
+        observe_request(kind, res.status, start)
+        page_type = classify_response(res.headers, content)
+        if is_penalized(res.status, page_type, kind):
+            self._api.limiter.on_penalty()
+        else:
+            self._api.limiter.on_success()
+        return Response(res.status, res.headers, content, text, page_type)
+
+
+class AsyncIdentityPool:
+    """Async clients of identity pool identities.
+
+    Identities are scheduled by the threaded `IdentityPool`.
+    """
+
+    def __init__(self, pool):
+        """Class constructor."""
+        self._pool = pool
+        self._clients = {api: AsyncZoneHAPI(api) for api in pool}
+
+    async def __aenter__(self):
+        for client in self._clients.values():
+            await client.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        for client in self._clients.values():
+            await client.__aexit__(exc_type, exc_val, exc_tb)
+
+    @property
+    def page_cache(self):
+        return self._pool.page_cache
+
+    @property
+    def max_attempts(self):
+        return self._pool.max_attempts
+
+    async def acquire(self):
+        """Take client of identity with initialized cookies for one
+        request, wait while all identities are quarantined.
+
+        Client must be returned with `release()`.
+        """
+        loop = asyncio.get_event_loop()
+        api = self._pool.take()
+        while api is None:
+            await loop.run_in_executor(None, self._pool.wait)
+            api = self._pool.take()
+        client = self._clients[api]
+        try:
+            await client.init_cookies()
+        except BaseException:
+            self._pool.release(api)
+            raise
+        return client
+
+    def release(self, client):
+        """Return client taken with `acquire()`."""
+        self._pool.release(client.sync_api)
@@ -0,0 +1,125 @@
+"""asyncio scraping engine module."""
+
+import asyncio
+import logging
+from functools import partial
+
+from zoneh.aio.client import AsyncIdentityPool
+from zoneh.aio.scraper import AsyncScraper
+from zoneh.commons import CommonThread
+from zoneh.const import ThreadName
+from zoneh.managers.captcha import captcha_manager
+
+
+class AsyncEngine:
+    """Run async processor task per archive and pusher task in one loop."""
+
+    def __init__(self, processor, pusher, run_trigger, api=None):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._processor = processor
+        self._pusher = pusher
+        self._run_trigger = run_trigger
+        self._api = api or AsyncIdentityPool(processor.identities)
+        self._rescan_period = processor.conf['rescan_period']
+        self._loop = None
+        self._stop_event = None
+
+    def stop(self):
+        """Stop engine, thread-safe."""
+        self._pusher.stop()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def run(self):
+        """Run engine until stopped."""
+        self._stop_event = asyncio.Event()
+        self._loop = asyncio.get_event_loop()
+        if not self._run_trigger.is_set():
+            return
+        self._processor.log_last_mirror_ids()
+        async with self._api:
+            scraper = AsyncScraper(self._processor.conf, self._api,
+                                   self._processor.filter_engine)
+            tasks = [self._process(scraper, arch_type)
+                     for arch_type in self._processor.arch_types]
+            tasks.append(self._push())
+            await asyncio.gather(*tasks)
+
+    async def _process(self, scraper, arch_type):
+        """Processor task crawling one archive."""
+        loop = asyncio.get_event_loop()
+        while self._run_trigger.is_set():
+            try:
+                await self._pull_records(scraper, arch_type)
+            except Exception:
+                err_msg = 'Processor task received error during ' \
+                          'handling scrape records of "%s" archive'
+                self._log.exception(err_msg, arch_type)
+                await self._take_a_nap(2)
+                continue
+            await loop.run_in_executor(None, self._processor.flush)
+            await self._take_a_nap(self._rescan_period)
+
+    async def _pull_records(self, scraper, arch_type):
+        """Pull records."""
+        loop = asyncio.get_event_loop()
+        is_seen = partial(self._processor.is_seen, arch_type=arch_type)
+        records = scraper.get_archive(type_=arch_type, is_known=is_seen)
+        try:
+            async for record in records:
+                if not self._run_trigger.is_set() or is_seen(record):
+                    break
+                await loop.run_in_executor(
+                    None, self._processor.process_record, record, arch_type)
+        finally:
+            await records.aclose()
+
+    async def _push(self):
+        """Pusher task."""
+        loop = asyncio.get_event_loop()
+        while self._run_trigger.is_set():
+            try:
+                if not await loop.run_in_executor(None,
+                                                  self._pusher.push_pending):
+                    break
+            except Exception:
+                self._log.exception('Pusher task received error')
+                await self._take_a_nap(1)
+
+    async def _take_a_nap(self, seconds):
+        """Task sleep until timeout or stop."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+class AsyncEngineThread(CommonThread):
+    """Thread running asyncio engine event loop."""
+
+    def __init__(self, processor, pusher):
+        """Class constructor."""
+        super().__init__(name=ThreadName.ASYNC_ENGINE)
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._processor = processor
+        self._pusher = pusher
+        self._engine = None
+
+    def stop(self):
+        """Stop engine running in the thread."""
+        self._pusher.stop()
+        captcha_manager.interrupt()
+        if self._engine is not None:
+            self._engine.stop()
+
+    def _run(self):
+        """Real thread run method."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._engine = AsyncEngine(self._processor, self._pusher,
+                                       self._run_trigger)
+            loop.run_until_complete(self._engine.run())
+        finally:
+            loop.close()
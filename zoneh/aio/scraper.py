@@ -0,0 +1,161 @@
+"""Async scraper module."""
+
+import asyncio
+import logging
+
+import zoneh.exceptions as exc
+from zoneh.const import MIRROR_WORKERS, START_PAGE, PageType
+from zoneh.managers.captcha import captcha_manager
+from zoneh.metrics import PAGE_PARSE_DURATION
+from zoneh.parsers.htmlparser import HTMLParser
+from zoneh.scraper import apply_mirror_data, needs_mirror_data
+
+_log = logging.getLogger(__name__)
+_ARCHIVE_PARSE = PAGE_PARSE_DURATION.labels('archive')
+_MIRROR_PARSE = PAGE_PARSE_DURATION.labels('mirror')
+
+
+class AsyncScraper:
+    """Zone-H Website async Scraper class."""
+
+    def __init__(self, conf, pool, filter_engine):
+        """Class constructor.
+
+        `conf` is `zoneh` config section. `pool` is `AsyncIdentityPool`,
+        identity hitting captcha is quarantined and the page is refetched
+        with another one. `filter_engine` of the processor tells which
+        records need mirror page data.
+        """
+        self._pool = pool
+        self._parser = HTMLParser.from_config(conf)
+        self._filter = filter_engine
+        self._semaphore = asyncio.Semaphore(
+            conf.get('mirror_workers', MIRROR_WORKERS))
+
+    async def get_archive(self, type_, start=None, is_known=None):
+        """Get archive from Zone-H by given archive type.
+
+        `is_known` predicate marks record at which the caller stops
+        consuming, records starting from it are not enriched. Fetched
+        pages are saved in page cache only when the crawl reaches known
+        record or the end, so failed crawl is repeated in full.
+        """
+        page_num = start or START_PAGE
+        attempt = 0
+        fetched = []
+        while page_num:
+            client = await self._pool.acquire()
+            try:
+                url = client.page_url(page_num, type_)
+                html_page = await client.get_page(page_num, type_)
+                if html_page and html_page.type in PageType.CHALLENGES:
+                    attempt += 1
+                    await self._resolve_challenge(
+                        client, html_page.type, (type_, page_num), attempt)
+                    continue
+            finally:
+                self._pool.release(client)
+            if html_page is None:
+                _log.info('Page %s of "%s" archive is unchanged, stop '
+                          'paging. %r', page_num, type_,
+                          self._pool.page_cache)
+                break
+            if html_page.type == PageType.UNKNOWN:
+                err_msg = f'Unknown page {page_num} of "{type_}" archive'
+                _log.error(err_msg)
+                raise exc.ScraperError(err_msg)
+
+            attempt = 0
+            fetched.append(url)
+            page = (type_, page_num)
+            try:
+                with _ARCHIVE_PARSE.time():
+                    rows = list(self._parser.get_records(html_page.text))
+            except Exception:
+                err_msg = 'Exception during getting record'
+                _log.exception(err_msg)
+                raise exc.ScraperError(err_msg)
+
+            page_num = rows[-1][1] if rows else None
+            async for record in self._enrich_records(
+                    [record for record, _ in rows], is_known, page):
+                if is_known and is_known(record):
+                    # Caller stops at it, records before are processed.
+                    self._pool.page_cache.save(fetched)
+                yield record
+        self._pool.page_cache.save(fetched)
+
+    async def _resolve_challenge(self, client, page_type, page, attempt):
+        """Request captcha quarantining the identity or renew its cookies
+        before refetching challenged page.
+        """
+        if attempt > self._pool.max_attempts:
+            err_msg = f'Page {page} is still challenged after ' \
+                      f'{self._pool.max_attempts} attempts'
+            _log.error(err_msg)
+            raise exc.ScraperError(err_msg)
+        loop = asyncio.get_event_loop()
+        if page_type == PageType.CAPTCHA:
+            _log.warning('Captcha request for %r', client.sync_api)
+            await loop.run_in_executor(None, captcha_manager.request,
+                                       client.sync_api, *page)
+        else:
+            _log.error('Pre-login page for %r. Need to set cookies',
+                       client.sync_api)
+            await client.init_cookies(force=True)
+            await asyncio.sleep(2)
+
+    async def _enrich_records(self, records, is_known, page):
+        """Yield records in original order fetching mirror data
+        concurrently.
+        """
+        tasks = []
+        stop_enriching = False
+        for record in records:
+            if is_known and not stop_enriching and is_known(record):
+                stop_enriching = True
+            task = None
+            if not stop_enriching and needs_mirror_data(record,
+                                                        self._filter):
+                task = asyncio.ensure_future(
+                    self._get_advanced_data(record.mirror, page))
+            tasks.append((record, task))
+        try:
+            for record, task in tasks:
+                if task:
+                    try:
+                        data = await task
+                    except exc.CaptchaError:
+                        raise
+                    except Exception:
+                        err_msg = 'Exception during getting mirror data'
+                        _log.exception(err_msg)
+                        raise exc.ScraperError(err_msg)
+                    apply_mirror_data(record, data)
+                yield record
+        finally:
+            for _, task in tasks:
+                if task and not task.done():
+                    task.cancel()
+
+    async def _get_advanced_data(self, mirror_id, page):
+        """Get advanced data from Zone-H mirror page.
+
+        Captcha on mirror page is solved for the archive `page` the record
+        was found on.
+        """
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                client = await self._pool.acquire()
+                try:
+                    mirror_page = await client.get_mirror_page(mirror_id)
+                    if mirror_page.type in PageType.CHALLENGES:
+                        attempt += 1
+                        await self._resolve_challenge(
+                            client, mirror_page.type, page, attempt)
+                        continue
+                finally:
+                    self._pool.release(client)
+            with _MIRROR_PARSE.time():
+                return self._parser.get_advanced_data(mirror_page.text)
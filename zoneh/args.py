@@ -0,0 +1,55 @@
+"""Bot command arguments module."""
+
+import re
+
+from zoneh.exceptions import CommandArgsError
+from zoneh.iso3166 import COUNTRY_DICT
+
+_DATE_REGEX = re.compile(r'^\d{4}[-/]\d{2}[-/]\d{2}$')
+
+
+def parse_args(text):
+    """Parse `key=value` arguments following command in message text.
+
+    Return list of (key, value) tuples with lowercased keys.
+    """
+    pairs = []
+    for arg in text.split()[1:]:
+        key, sep, value = arg.partition('=')
+        if not sep or not key or not value:
+            raise CommandArgsError(f'Invalid argument "{arg}", use key=value')
+        pairs.append((key.lower(), value))
+    return pairs
+
+
+def parse_seconds(text, default, maximum):
+    """Parse optional number of seconds following command in message text."""
+    args = text.split()[1:]
+    if not args:
+        return default
+    value = ' '.join(args)
+    if not value.isdigit() or not 0 < int(value) <= maximum:
+        raise CommandArgsError(f'Invalid duration "{value}", use number of '
+                               f'seconds from 1 to {maximum}')
+    return int(value)
+
+
+def parse_date(value):
+    """Normalize date to Zone-H `YYYY/MM/DD` format."""
+    if not _DATE_REGEX.match(value):
+        raise CommandArgsError(f'Invalid date "{value}", use YYYY-MM-DD')
+    return value.replace('-', '/')
+
+
+def parse_country(value):
+    """Convert country code to lowercased country name as shown by Zone-H."""
+    return COUNTRY_DICT.get(value.upper(), value).lower()
+
+
+def choose(key, value, choices):
+    """Check that value is one of choices."""
+    value = value.lower()
+    if value not in choices:
+        raise CommandArgsError(f'Invalid {key} "{value}", '
+                               f'choose from {sorted(choices)}')
+    return value
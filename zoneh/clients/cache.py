@@ -0,0 +1,89 @@
+"""Archive page cache module."""
+
+import hashlib
+import logging
+import re
+from threading import Lock
+
+from zoneh.const import TBL_ID
+
+_TABLE_REGEX = re.compile(
+    rf'''<table[^>]*id\s*=\s*["']?{TBL_ID}\b.*?</table>'''.encode(),
+    re.DOTALL | re.IGNORECASE)
+
+
+class PageCache:
+    """Remember validators and records table hashes of archive pages.
+
+    Allows to find out that archive page hasn't changed since the last
+    fetch either by HTTP conditional request or by comparing hash of the
+    records table region, ignoring the rest of the page like ads or
+    counters.
+
+    State of fetched page is compared with the saved one but is saved only
+    with `save()` after its records are processed, so crawl failed in the
+    middle of the page fetches it again instead of skipping it.
+    """
+
+    def __init__(self):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._lock = Lock()
+        self._entries = {}
+        self._fetched = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} hits:{self.hits} ' \
+               f'misses:{self.misses}>'
+
+    def get_headers(self, url):
+        """Return conditional request headers for the page URL."""
+        entry = self._entries.get(url)
+        headers = {}
+        if entry:
+            etag, last_modified, _ = entry
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def is_unchanged(self, url, status_code, headers, content):
+        """Check whether page is unchanged since its state was saved."""
+        if status_code == 304:
+            return self._count(url, True)
+
+        match = _TABLE_REGEX.search(content)
+        if not match:
+            return False
+        digest = hashlib.blake2b(match.group(), digest_size=16).digest()
+        with self._lock:
+            entry = self._entries.get(url)
+            is_unchanged = entry is not None and entry[2] == digest
+            self._fetched[url] = (headers.get('ETag'),
+                                  headers.get('Last-Modified'),
+                                  digest)
+        return self._count(url, is_unchanged)
+
+    def save(self, urls):
+        """Save state of the last fetch of pages whose records are
+        processed.
+        """
+        with self._lock:
+            for url in urls:
+                entry = self._fetched.pop(url, None)
+                if entry is not None:
+                    self._entries[url] = entry
+
+    def _count(self, url, is_hit):
+        with self._lock:
+            if is_hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._log.debug('Page cache %s for %s (hits: %s, misses: %s)',
+                        'hit' if is_hit else 'miss', url, self.hits,
+                        self.misses)
+        return is_hit
@@ -0,0 +1,131 @@
+"""Zone-H identity pool module."""
+
+import logging
+from contextlib import contextmanager
+from threading import Lock
+
+import zoneh.exceptions as exc
+from zoneh.clients.cache import PageCache
+from zoneh.clients.zoneh import ZoneHAPI
+from zoneh.const import CAPTCHA_TIMEOUT, COOKIES_FILE, MAX_PAGE_RETRIES
+from zoneh.managers.captcha import captcha_manager
+from zoneh.metrics import IDENTITIES_AVAILABLE
+
+
+class IdentityPool:
+    """Pool of Zone-H identities scheduling requests between them.
+
+    Every request takes the identity expected to be free the soonest by
+    its in-flight requests and current request rate. Identity with
+    pending captcha is quarantined until the captcha is solved, requests
+    wait only when all identities are quarantined.
+    """
+
+    def __init__(self, apis, captcha_timeout=CAPTCHA_TIMEOUT):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._apis = list(apis)
+        self._captcha_timeout = captcha_timeout
+        self._in_flight = [0] * len(self._apis)
+        self._next = 0
+        self._lock = Lock()
+        IDENTITIES_AVAILABLE.set_function(self.count_available)
+
+    @classmethod
+    def from_config(cls, conf):
+        """Create identities from `identities` list of `zoneh` config
+        section, single default identity when the list is empty.
+        """
+        page_cache = PageCache()
+        captcha_timeout = conf.get('captcha_timeout', CAPTCHA_TIMEOUT)
+        identities = conf.get('identities') or []
+        if not identities:
+            return cls([ZoneHAPI(conf, page_cache=page_cache)],
+                       captcha_timeout)
+
+        apis = []
+        for num, identity in enumerate(identities):
+            name = identity.get('name', f'identity{num}')
+            apis.append(ZoneHAPI(
+                conf, name=name,
+                cookie_file=identity.get('cookie_file',
+                                         f'{COOKIES_FILE}_{name}'),
+                proxy=identity.get('proxy'),
+                page_cache=page_cache))
+        names = [api.name for api in apis]
+        if len(set(names)) != len(names):
+            raise exc.ConfigError(f'Identity names must be unique: {names}')
+        return cls(apis, captcha_timeout)
+
+    def __len__(self):
+        return len(self._apis)
+
+    def __iter__(self):
+        return iter(self._apis)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} identities:{len(self)} ' \
+               f'available:{self.count_available()}>'
+
+    @property
+    def page_cache(self):
+        """Archive page cache shared by identities."""
+        return self._apis[0].page_cache
+
+    @property
+    def max_attempts(self):
+        """Number of challenged fetches of one page before giving up."""
+        return MAX_PAGE_RETRIES * len(self._apis)
+
+    def count_available(self):
+        """Count identities without pending captcha."""
+        return sum(not captcha_manager.is_pending(api) for api in self._apis)
+
+    def take(self):
+        """Take identity for one request or return None if all of them are
+        quarantined.
+        """
+        with self._lock:
+            best, best_wait = None, None
+            for offset in range(len(self._apis)):
+                # Start after the last taken one to spread ties evenly.
+                index = (self._next + offset) % len(self._apis)
+                api = self._apis[index]
+                if captcha_manager.is_pending(api):
+                    continue
+                wait = (self._in_flight[index] + 1) / api.limiter.rate
+                if best is None or wait < best_wait:
+                    best, best_wait = index, wait
+            if best is None:
+                return None
+            self._in_flight[best] += 1
+            self._next = best + 1
+            return self._apis[best]
+
+    def release(self, api):
+        """Return identity taken with `take()`."""
+        with self._lock:
+            self._in_flight[self._apis.index(api)] -= 1
+
+    def wait(self):
+        """Block until any identity is out of quarantine."""
+        if not captcha_manager.wait(self._apis, self._captcha_timeout):
+            err_msg = 'Captcha was not solved in time, no identity is ' \
+                      'available'
+            self._log.warning(err_msg)
+            raise exc.CaptchaError(err_msg)
+
+    @contextmanager
+    def acquire(self):
+        """Take identity with initialized cookies for one request, wait
+        while all identities are quarantined.
+        """
+        api = self.take()
+        while api is None:
+            self.wait()
+            api = self.take()
+        try:
+            api.init_cookies()
+            yield api
+        finally:
+            self.release(api)
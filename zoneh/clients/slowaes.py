@@ -0,0 +1,181 @@
+"""slowAES cookie challenge solver module.
+
+Pre-login page sets `ZHE` cookie with
+`toHex(slowAES.decrypt(c, 2, a, b))` where `a`, `b` and `c` are key, iv
+and ciphertext given as `toNumbers("hex")`. Decryption is reimplemented
+here to avoid evaluating slowAES library with js2py.
+"""
+
+import re
+from functools import lru_cache
+
+import zoneh.exceptions as exc
+
+_BLOCK_SIZE = 16
+_MODE_CBC = 2
+
+_TO_NUMBERS_REGEX = re.compile(
+    r'(\w+)\s*=\s*toNumbers\(\s*["\']([0-9a-fA-F]*)["\']\s*\)')
+_DECRYPT_REGEX = re.compile(
+    r'toHex\(\s*slowAES\.decrypt\(\s*(\w+)\s*,\s*(\d+)\s*,\s*(\w+)\s*,'
+    r'\s*(\w+)\s*\)\s*\)')
+
+
+def _xtime(byte):
+    byte <<= 1
+    return byte ^ 0x11b if byte & 0x100 else byte
+
+
+def _mul(a, b):
+    """Multiply two numbers in AES Galois field."""
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a = _xtime(a)
+        b >>= 1
+    return result
+
+
+def _make_sboxes():
+    """Generate AES S-box and its inverse."""
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        p = p ^ _xtime(p)
+        q ^= (q << 1) & 0xff
+        q ^= (q << 2) & 0xff
+        q ^= (q << 4) & 0xff
+        if q & 0x80:
+            q ^= 0x09
+        x = q
+        for shift in range(1, 5):
+            x ^= ((q << shift) | (q >> (8 - shift))) & 0xff
+        sbox[p] = x ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    inv_sbox = [0] * 256
+    for i, value in enumerate(sbox):
+        inv_sbox[value] = i
+    return sbox, inv_sbox
+
+
+_SBOX, _INV_SBOX = _make_sboxes()
+_MUL9, _MUL11, _MUL13, _MUL14 = (
+    [_mul(i, n) for i in range(256)] for n in (9, 11, 13, 14))
+# State is a flat list of 16 bytes in column order.
+_INV_SHIFT_ROWS = [0, 13, 10, 7, 4, 1, 14, 11, 8, 5, 2, 15, 12, 9, 6, 3]
+
+
+def _expand_key(key):
+    """Expand 16, 24 or 32 byte key into list of 16 byte round keys."""
+    key_words = len(key) // 4
+    rounds = key_words + 6
+    words = [list(key[i:i + 4]) for i in range(0, len(key), 4)]
+    rcon = 1
+    for i in range(key_words, 4 * (rounds + 1)):
+        word = list(words[i - 1])
+        if i % key_words == 0:
+            word = word[1:] + word[:1]
+            word = [_SBOX[b] for b in word]
+            word[0] ^= rcon
+            rcon = _xtime(rcon)
+        elif key_words > 6 and i % key_words == 4:
+            word = [_SBOX[b] for b in word]
+        words.append([a ^ b for a, b in zip(words[i - key_words], word)])
+    return [sum(words[i:i + 4], []) for i in range(0, len(words), 4)]
+
+
+def _decrypt_block(block, round_keys):
+    """Decrypt one 16 byte block."""
+    state = [b ^ k for b, k in zip(block, round_keys[-1])]
+    for round_key in reversed(round_keys[1:-1]):
+        state = [_INV_SBOX[state[i]] ^ k
+                 for i, k in zip(_INV_SHIFT_ROWS, round_key)]
+        mixed = []
+        for col in range(0, _BLOCK_SIZE, 4):
+            a0, a1, a2, a3 = state[col:col + 4]
+            mixed += [
+                _MUL14[a0] ^ _MUL11[a1] ^ _MUL13[a2] ^ _MUL9[a3],
+                _MUL9[a0] ^ _MUL14[a1] ^ _MUL11[a2] ^ _MUL13[a3],
+                _MUL13[a0] ^ _MUL9[a1] ^ _MUL14[a2] ^ _MUL11[a3],
+                _MUL11[a0] ^ _MUL13[a1] ^ _MUL9[a2] ^ _MUL14[a3]]
+        state = mixed
+    return [_INV_SBOX[state[i]] ^ k
+            for i, k in zip(_INV_SHIFT_ROWS, round_keys[0])]
+
+
+def _unpad(data):
+    """Strip padding the way slowAES `unpadBytesOut` does.
+
+    Single block output is never unpadded.
+    """
+    if len(data) <= _BLOCK_SIZE:
+        return data
+    pad_byte = None
+    pad_count = 0
+    for byte in reversed(data[-(_BLOCK_SIZE + 1):]):
+        if byte > _BLOCK_SIZE:
+            break
+        if pad_byte is None:
+            pad_byte = byte
+        if byte != pad_byte:
+            pad_count = 0
+            break
+        pad_count += 1
+        if pad_count == pad_byte:
+            break
+    return data[:len(data) - pad_count]
+
+
+def decrypt_cbc(ciphertext, key, iv):
+    """Decrypt data in CBC mode, same as `slowAES.decrypt(c, 2, key, iv)`."""
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f'Invalid key size {len(key)}')
+    if len(iv) != _BLOCK_SIZE or len(ciphertext) % _BLOCK_SIZE:
+        raise ValueError('IV and ciphertext must be multiple of 16 bytes')
+    round_keys = _expand_key(key)
+    plaintext = []
+    prev = list(iv)
+    for start in range(0, len(ciphertext), _BLOCK_SIZE):
+        block = list(ciphertext[start:start + _BLOCK_SIZE])
+        plaintext += [b ^ p for b, p in
+                      zip(_decrypt_block(block, round_keys), prev)]
+        prev = block
+    return bytes(_unpad(plaintext))
+
+
+def parse_challenge(js_funcs):
+    """Parse key, iv and ciphertext hex strings from challenge script.
+
+    Raise `CookiesChallengeError` when script does not match.
+    """
+    numbers = dict(_TO_NUMBERS_REGEX.findall(js_funcs))
+    match = _DECRYPT_REGEX.search(js_funcs)
+    if not match:
+        raise exc.CookiesChallengeError('slowAES.decrypt call not found')
+    cipher_var, mode, key_var, iv_var = match.groups()
+    if int(mode) != _MODE_CBC:
+        raise exc.CookiesChallengeError(f'Unsupported slowAES mode {mode}')
+    try:
+        return numbers[cipher_var], numbers[key_var], numbers[iv_var]
+    except KeyError as err:
+        raise exc.CookiesChallengeError(f'Variable {err} not found')
+
+
+@lru_cache(maxsize=32)
+def _solve(cipher_hex, key_hex, iv_hex):
+    try:
+        return decrypt_cbc(bytes.fromhex(cipher_hex), bytes.fromhex(key_hex),
+                           bytes.fromhex(iv_hex)).hex()
+    except ValueError as err:
+        raise exc.CookiesChallengeError(str(err))
+
+
+def solve_challenge(js_funcs):
+    """Compute cookie value from challenge script.
+
+    Results are cached by key, iv and ciphertext.
+    """
+    return _solve(*parse_challenge(js_funcs))
@@ -3,158 +3,422 @@
 import logging
 import os
 import pickle
+import time
+from collections import namedtuple
+from http.cookiejar import http2time
 from io import BytesIO
+from threading import RLock, Timer
+from urllib.parse import urlsplit
 
-import js2py
 import requests
 
 from zoneh.const import (
-    TMP_DIR, MIRROR_URL, BASE_URL, HEADERS, COOKIES_JS_NAME, ARCHIVE_TYPES,
-    COOKIES_JS_URL, CAPTCHA_URL, HZ_URL, Http
+    MIRROR_URL, BASE_URL, HEADERS, COOKIES_JS_NAME, ARCHIVE_TYPES,
+    COOKIES_JS_URL, CAPTCHA_URL, HZ_URL, RATE_LIMIT, COOKIES_FILE,
+    COOKIES_REFRESH_MARGIN, COOKIES_RETRY_DELAY, DEFAULT_IDENTITY, Http,
+    PageType, RequestKind
 )
 import zoneh.exceptions as exc
-from zoneh.conf import get_config
+from zoneh.clients.cache import PageCache
+from zoneh.clients.slowaes import solve_challenge
+from zoneh.metrics import (
+    COOKIES_REFRESH, REQUEST_DURATION, REQUEST_RATE, REQUESTS
+)
+from zoneh.parsers.classifier import classify_page
 from zoneh.parsers.htmlparser import HTMLParser
-from zoneh.utils import get_random_ua, get_captcha_number, Singleton
+from zoneh.ratelimit import AdaptiveRateLimiter
+from zoneh.useragents import UserAgentPool
+from zoneh.utils import get_captcha_number
+
+_COOKIE_ATTRS = ('expires', 'path')
+
+Page = namedtuple('Page', ('text', 'type'))
+
+
+def classify_response(headers, content):
+    """Classify fetched response, content other than HTML is not looked
+    into.
+    """
+    if 'html' not in headers.get('Content-Type', ''):
+        return PageType.UNKNOWN
+    return classify_page(content)
+
+
+def is_penalized(status_code, page_type, kind):
+    """Check whether response means that Zone-H wants us to slow down.
 
-_CONF = get_config()
+    Challenge page is a penalty only when it comes instead of archive or
+    mirror page, pre-login page is expected when solving the challenge.
+    """
+    if status_code == 429 or status_code >= 500:
+        return True
+    return kind in RequestKind.CRAWL and page_type in PageType.CHALLENGES
+
+
+def make_headers(base_url):
+    """Return request headers with `Host` of the base URL."""
+    return dict(HEADERS, Host=urlsplit(base_url).netloc)
+
+
+def observe_request(kind, status, start):
+    """Count Zone-H request and observe its latency."""
+    REQUESTS.labels(kind, status).inc()
+    REQUEST_DURATION.labels(kind).observe(time.monotonic() - start)
+
+
+def create_limiter(conf):
+    """Create adaptive rate limiter for Zone-H requests from `zoneh`
+    config section.
+    """
+    conf = dict(RATE_LIMIT, **conf.get('rate_limit', {}))
+    return AdaptiveRateLimiter(rate=conf['initial_rate'],
+                               min_rate=conf['min_rate'],
+                               max_rate=conf['max_rate'],
+                               increase=conf['increase'],
+                               decrease=conf['decrease'],
+                               capacity=conf['burst'])
 
 
 class Cookies:
-    """Class to manage Zone-H session cookies."""
+    """Class to manage Zone-H session cookies.
+
+    Challenge cookie is stored with its expiry time, stale cookie file is
+    detected without requests and the cookie is refreshed in background
+    shortly before it expires.
+    """
 
-    def __init__(self, api, session):
+    def __init__(self, api, session, cookie_file=COOKIES_FILE):
         """Class constructor."""
         self._api = api
         self._session = session
         self._parser = HTMLParser()
-        self._cookie_file = None
+        self._cookie_file = cookie_file
+        self._lock = RLock()
+        self._timer = None
         self._log = logging.getLogger(self.__class__.__name__)
 
     def init_cookies(self, force=False):
         """Init cookies."""
-        if force:
-            self._purge_cookies()
-            self._initialize_cookies()
-        elif not self._session.cookies:
-            self._initialize_cookies()
+        with self._lock:
+            if force:
+                self._purge_cookies()
+                self._initialize_cookies()
+            elif not self._is_fresh(self._get_challenge_cookie(
+                    self._session.cookies)):
+                self._initialize_cookies()
 
     def _initialize_cookies(self):
         """Really init cookies."""
         self._log.debug('Initializing cookies')
-        self._cookie_file = f'{TMP_DIR}zoneh_cookiejar'
         if not self._load_cookies():
             self._prepare_cookies()
+        self._schedule_refresh()
+
+    @staticmethod
+    def _get_challenge_cookie(jar):
+        """Return challenge cookie from the jar or None."""
+        for cookie in jar:
+            if cookie.name == COOKIES_JS_NAME:
+                return cookie
+        return None
+
+    @staticmethod
+    def _is_fresh(cookie):
+        """Check that cookie exists and won't expire soon."""
+        if cookie is None:
+            return False
+        return cookie.expires is None or \
+            cookie.expires - COOKIES_REFRESH_MARGIN > time.time()
 
     def _load_cookies(self):
-        """Load cookies from the file."""
-        if os.path.isfile(self._cookie_file) and \
-                os.stat(self._cookie_file).st_size > 0:
+        """Load cookies from the file if challenge cookie is still fresh."""
+        if not os.path.isfile(self._cookie_file) or \
+                os.stat(self._cookie_file).st_size == 0:
+            return False
+        try:
             with open(self._cookie_file, 'rb') as fd:
-                self._session.cookies.update(pickle.load(fd))
-            self._log.info('Cookies from %s loaded', self._cookie_file)
-            return True
-        return False
+                data = pickle.load(fd)
+        except Exception:
+            self._log.exception('Failed to load cookies from %s',
+                                self._cookie_file)
+            return False
+        # Older cookie files stored only the cookie jar.
+        if isinstance(data, dict):
+            jar, user_agent = data['cookies'], data.get('user_agent')
+        else:
+            jar, user_agent = data, None
+        if not self._is_fresh(self._get_challenge_cookie(jar)):
+            self._log.info('Cookies from %s are stale', self._cookie_file)
+            return False
+
+        if user_agent:
+            self._api.set_user_agent(user_agent)
+        for cookie in jar:
+            # Older cookie files stored cookie attributes as cookies.
+            if cookie.name not in _COOKIE_ATTRS:
+                self._session.cookies.set_cookie(cookie)
+        self._log.info('Cookies from %s loaded', self._cookie_file)
+        return True
 
     def _purge_cookies(self):
-        """Purge cookies file."""
+        """Purge cookies and cookies file."""
         self._log.info('Purging cookies')
+        self._cancel_refresh()
+        self._session.cookies.clear()
         with open(self._cookie_file, 'w'):
             pass
 
     def _save_cookies(self):
         """Save cookies to the file."""
         with open(self._cookie_file, 'wb') as fd:
-            pickle.dump(self._session.cookies, fd)
+            pickle.dump({'cookies': self._session.cookies,
+                         'user_agent': self._api.user_agent}, fd)
         self._log.info('Cookies saved to %s', self._cookie_file)
 
-    def _validate_cookies(self, cookies):
-        """Validate cookies with API call."""
-        self._session.cookies = requests.utils.cookiejar_from_dict(cookies)
-        text = self._api._request(HZ_URL.format(url=BASE_URL)).text
-        return not self._parser.is_prelogin(text)
+    def _validate_cookies(self, cookie):
+        """Set challenge cookie and validate it with API call."""
+        self._session.cookies.set_cookie(cookie)
+        res = self._api._request(HZ_URL.format(url=self._api.base_url),
+                                 kind=RequestKind.PRELOGIN)
+        return res.page_type != PageType.PRELOGIN
 
     def _prepare_cookies(self):
-        """Prepare cookies."""
-        cookies = self._get_cookies()
-        if self._validate_cookies(cookies):
+        """Prepare cookies.
+
+        New challenge cookie starts new session with new User-Agent.
+        """
+        self._api.rotate_user_agent()
+        solver = 'none'
+        try:
+            cookie, solver = self._get_cookies()
+            is_valid = self._validate_cookies(cookie)
+        except Exception:
+            COOKIES_REFRESH.labels(solver, 'error').inc()
+            raise
+        if is_valid:
+            COOKIES_REFRESH.labels(solver, 'ok').inc()
             self._save_cookies()
         else:
-            # TODO: raise something
-            pass
+            COOKIES_REFRESH.labels(solver, 'rejected').inc()
+            self._log.error('Zone-H rejected solved challenge cookie')
+
+    def _schedule_refresh(self, delay=None):
+        """Schedule background challenge cookie refresh before it expires."""
+        self._cancel_refresh()
+        if delay is None:
+            cookie = self._get_challenge_cookie(self._session.cookies)
+            if cookie is None or cookie.expires is None:
+                return
+            delay = max(0, cookie.expires - COOKIES_REFRESH_MARGIN -
+                        time.time())
+        self._log.debug('Cookies refresh in %.0fs', delay)
+        self._timer = Timer(delay, self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_refresh(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _refresh(self):
+        """Refresh challenge cookie in background."""
+        self._log.info('Refreshing cookies before expiry')
+        with self._lock:
+            try:
+                self._prepare_cookies()
+            except Exception:
+                self._log.exception('Failed to refresh cookies, retry in %ss',
+                                    COOKIES_RETRY_DELAY)
+                self._schedule_refresh(COOKIES_RETRY_DELAY)
+                return
+            self._schedule_refresh()
 
     def _get_cookies(self):
-        """Generate cookies by evaluating js-functions from Zone-H website."""
-        preload_page = self._api._request(BASE_URL).text
-        js_aes_slow = self._api._request(COOKIES_JS_URL).text
+        """Generate challenge cookie by solving slowAES challenge from
+        Zone-H website.
 
-        js_funcs, cookies = self._parser.parse_cookies(preload_page)
-        value = js2py.eval_js('\n'.join([js_aes_slow, js_funcs]))
-        cookies[COOKIES_JS_NAME] = value
-        return cookies
+        Fall back to evaluating js-functions with slowAES library when
+        challenge can't be parsed. Return cookie and name of used solver.
+        """
+        preload_page = self._api._request(self._api.base_url,
+                                          kind=RequestKind.PRELOGIN).text
+        js_funcs, attrs = self._parser.parse_cookies(preload_page)
+        try:
+            value, solver = solve_challenge(js_funcs), 'native'
+        except exc.CookiesChallengeError as err:
+            self._log.warning('Failed to solve cookies challenge natively: '
+                              '%s, falling back to js2py', err)
+            value, solver = self._eval_js(js_funcs), 'js2py'
+        expires = http2time(attrs['expires']) if 'expires' in attrs else None
+        return requests.cookies.create_cookie(
+            COOKIES_JS_NAME, value, path=attrs.get('path', '/'),
+            expires=expires), solver
 
+    def _eval_js(self, js_funcs):
+        """Evaluate js-functions with slowAES library from Zone-H website."""
+        import js2py
 
-class ZoneHAPI(metaclass=Singleton):
-    """Zone-H API class."""
+        js_aes_slow = self._api._request(self._api.rebase(COOKIES_JS_URL),
+                                         kind=RequestKind.SCRIPT).text
+        return js2py.eval_js('\n'.join([js_aes_slow, js_funcs]))
 
-    def __init__(self):
-        """Class constructor."""
+
+class ZoneHAPI:
+    """Zone-H API class.
+
+    One instance is one identity: session with its own cookies,
+    User-Agent, optional proxy and request rate limiter.
+    """
+
+    def __init__(self, conf, name=DEFAULT_IDENTITY, cookie_file=COOKIES_FILE,
+                 proxy=None, page_cache=None, base_url=BASE_URL):
+        """Class constructor.
+
+        `conf` is `zoneh` config section. `page_cache` can be shared by
+        identities crawling the same pages. `base_url` allows to run
+        against local stand-in server.
+        """
+        self.name = name
+        self.proxy = proxy
+        self.base_url = base_url.rstrip('/')
         self._session = requests.Session()
-        self._session.headers.update(HEADERS)
-        self._cookies = Cookies(self, self._session)
-        self._random_ua = _CONF['zoneh']['random_ua']
-        self._parser = HTMLParser()
+        self._session.headers.update(make_headers(self.base_url))
+        if proxy:
+            self._session.proxies.update({'http': proxy, 'https': proxy})
+        self._cookies = Cookies(self, self._session, cookie_file)
+        self._ua_pool = UserAgentPool() if conf['random_ua'] else None
+        self._limiter = create_limiter(conf)
+        REQUEST_RATE.labels(name).set_function(lambda: self._limiter.rate)
+        self._page_cache = page_cache or PageCache()
         self._log = logging.getLogger(self.__class__.__name__)
+        self.rotate_user_agent()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} identity:{self.name} ' \
+               f'rate:{self._limiter.rate:.4f}/s>'
+
+    @property
+    def rate(self):
+        """Current Zone-H request rate in requests per second."""
+        return self._limiter.rate
+
+    @property
+    def user_agent(self):
+        """User-Agent of the session."""
+        return self._session.headers['User-Agent']
+
+    def set_user_agent(self, user_agent):
+        """Set User-Agent sent with all requests of the session."""
+        self._session.headers['User-Agent'] = user_agent
+        self._log.info('Identity "%s" uses User-Agent: %s', self.name,
+                       user_agent)
+
+    def rotate_user_agent(self):
+        """Pick new session User-Agent from the pool if enabled in config.
+
+        User-Agent is sticky and changes only together with challenge
+        cookie, so it stays the same during the session.
+        """
+        if self._ua_pool:
+            self.set_user_agent(self._ua_pool.choice())
+
+    @property
+    def limiter(self):
+        """Rate limiter shared by all Zone-H requests."""
+        return self._limiter
+
+    @property
+    def cookies(self):
+        """Session cookies as dict."""
+        return self._session.cookies.get_dict()
+
+    def update_cookies(self, cookies):
+        """Update session cookies with ones set by another client."""
+        self._session.cookies.update(cookies)
 
     def init_cookies(self, force=False):
         """Init cookies."""
         self._cookies.init_cookies(force=force)
 
+    @property
+    def page_cache(self):
+        """Archive page cache with hit/miss counters."""
+        return self._page_cache
+
+    def rebase(self, url):
+        """Point Zone-H URL (template) to the base URL."""
+        return self.base_url + url[len(BASE_URL):]
+
+    def page_url(self, page_num, type_):
+        """Return URL of archive page, it is the page cache key."""
+        return self.rebase(ARCHIVE_TYPES[type_]['page']).format(
+            page_num=page_num)
+
     def get_page(self, page_num, type_):
-        """Get Zone-H html-page for parsing by its type."""
-        page_url = ARCHIVE_TYPES[type_]['page']
-        return self._request(page_url.format(page_num=page_num)).text
+        """Get Zone-H html-page for parsing by its type.
+
+        Return None when page is unchanged since its state was saved in
+        page cache.
+        """
+        url = self.page_url(page_num, type_)
+        res = self._request(url, kind=RequestKind.ARCHIVE,
+                            headers=self._page_cache.get_headers(url))
+        if self._page_cache.is_unchanged(url, res.status_code, res.headers,
+                                         res.content):
+            return None
+        return Page(res.text, res.page_type)
 
     def get_mirror_page(self, mirror_id):
         """Get Zone-H mirror html-page."""
-        return self._request(MIRROR_URL.format(mirror_id=mirror_id)).text
+        url = self.rebase(MIRROR_URL).format(mirror_id=mirror_id)
+        res = self._request(url, kind=RequestKind.MIRROR)
+        return Page(res.text, res.page_type)
 
     def get_captcha_img(self):
         """Get captcha image."""
-        url = CAPTCHA_URL.format(captcha_num=get_captcha_number())
-        return BytesIO(self._request(url).content)
+        url = self.rebase(CAPTCHA_URL).format(
+            captcha_num=get_captcha_number())
+        return BytesIO(self._request(url, kind=RequestKind.CAPTCHA).content)
 
     def solve_captcha(self, text, page):
         """Solve captcha by posting captcha text."""
         self._log.info('Solving captcha with text "%s", page %s', text, page)
         self._log.debug('Cookies: %s', self._session.cookies.get_dict())
-        url = ARCHIVE_TYPES[page[0]]['page'].format(page_num=page[1])
-        res = self._request(method=Http.POST, url=url, data={'captcha': text})
-        return not self._parser.is_captcha(res.content)
+        url = self.page_url(page[1], page[0])
+        res = self._request(method=Http.POST, url=url, data={'captcha': text},
+                            kind=RequestKind.CAPTCHA_SOLVE)
+        return res.page_type != PageType.CAPTCHA
 
-    def _request(self, url, method=Http.GET, data=None):
+    def _request(self, url, method=Http.GET, data=None, headers=None,
+                 kind=RequestKind.ARCHIVE):
         """General request method."""
         self._log.debug('%s: %s %s', method, url, data)
-        self._randomize_ua_header()
+        self._limiter.acquire()
+        res = None
+        start = time.monotonic()
         try:
-            res = self._session.request(method, url=url, data=data)
-            self._verify_result(res)
+            res = self._session.request(method, url=url, data=data,
+                                        headers=headers)
+            observe_request(kind, res.status_code, start)
+            self._verify_result(res, kind)
         except Exception:
+            if res is None:
+                observe_request(kind, 'error', start)
+            self._limiter.on_penalty()
             err_msg = 'Issue with request to Zone-H'
             self._log.exception(err_msg)
             raise exc.ZoneHError(err_msg)
         return res
 
-    @staticmethod
-    def _verify_result(result):
-        """Verify `requests` result."""
-        # TODO: verify result.
-        return result
+    def _verify_result(self, result, kind):
+        """Verify `requests` result and adapt request rate to it.
 
-    def _randomize_ua_header(self):
-        """Update headers with random User-Agent before API call."""
-        if self._random_ua:
-            headers = HEADERS
-            headers['User-Agent'] = get_random_ua()
-            self._log.debug('Random UA: %s', headers['User-Agent'])
-            self._session.headers.update(headers)
+        Result is classified once, its `page_type` is reused by callers.
+        """
+        result.page_type = classify_response(result.headers, result.content)
+        if is_penalized(result.status_code, result.page_type, kind):
+            self._limiter.on_penalty()
+        else:
+            self._limiter.on_success()
+        return result
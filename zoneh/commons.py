@@ -4,12 +4,13 @@ from threading import Thread
 
 
 class CommonThread(Thread):
-    """Common (base) thread class with run trigger."""
+    """Common (base) thread class with run and stop triggers."""
 
-    def __init__(self):
+    def __init__(self, name=None):
         """Class constructor."""
-        super().__init__()
+        super().__init__(name=name)
         self._run_trigger = None
+        self._stop_trigger = None
 
     def run(self):
         """Run thread."""
@@ -17,9 +18,19 @@ class CommonThread(Thread):
             raise ValueError('Run trigger cannot be None')
         self._run()
 
-    def add_run_trigger(self, run_trigger):
-        """Add thread run trigger for execution control from thread manager."""
+    def add_run_trigger(self, run_trigger, stop_trigger):
+        """Add thread run and stop triggers for execution control from
+        thread manager.
+        """
         self._run_trigger = run_trigger
+        self._stop_trigger = stop_trigger
+
+    def stop(self):
+        """Wake up thread blocked on anything except stop trigger."""
+
+    def _take_a_nap(self, seconds):
+        """Sleep until timeout or stop, return True if stopped."""
+        return self._stop_trigger.wait(seconds)
 
     def _run(self):
         """Real thread run method."""
@@ -3,13 +3,10 @@
 import os
 import sys
 
-from zoneh.conf import get_config
-
-_CONF = get_config()
-
 LOG_LEVELS = {'CRITICAL', 'ERROR', 'WARNING', 'INFO', 'DEBUG'}
 
 MAX_DEQUE_ITEMS = 10000
+PUSH_QUEUE_SIZE = 1000
 
 
 class FilterType:
@@ -17,6 +14,96 @@ class FilterType:
     COUNTRY = 'countries'
     DOMAIN = 'domains'
     NOTIFIER = 'notifiers'
+    KEYWORD = 'keywords'
+    NETWORK = 'networks'
+
+
+class PageType:
+    """Fetched Zone-H page types."""
+    RECORDS = 'records'
+    CAPTCHA = 'captcha'
+    PRELOGIN = 'prelogin'
+    UNKNOWN = 'unknown'
+    CHALLENGES = frozenset((CAPTCHA, PRELOGIN))
+
+
+class ParserBackend:
+    """HTML parser backend names."""
+    SOUP = 'soup'
+    STREAM = 'stream'
+    LXML = 'lxml'
+    ALL = frozenset((SOUP, STREAM, LXML))
+
+
+class Engine:
+    """Scraping engine names."""
+    THREADS = 'threads'
+    ASYNCIO = 'asyncio'
+    ALL = frozenset((THREADS, ASYNCIO))
+
+
+class PushItemType:
+    """Push queue item types."""
+    RECORD = 'record'
+    CAPTCHA = 'captcha'
+
+
+class ExportFormat:
+    """Records export formats."""
+    CSV = 'csv'
+    JSONL = 'jsonl'
+    ALL = frozenset((CSV, JSONL))
+
+
+class Compression:
+    """Records export compression types."""
+    NONE = 'none'
+    GZIP = 'gzip'
+    ZIP = 'zip'
+    ALL = frozenset((NONE, GZIP, ZIP))
+
+
+class EvictionPolicy:
+    """Seen records index eviction policies."""
+    FIFO = 'fifo'
+    LRU = 'lru'
+    ALL = frozenset((FIFO, LRU))
+
+
+class RequestKind:
+    """Zone-H request kinds for metrics."""
+    ARCHIVE = 'archive'
+    MIRROR = 'mirror'
+    CAPTCHA = 'captcha'
+    CAPTCHA_SOLVE = 'captcha_solve'
+    PRELOGIN = 'prelogin'
+    SCRIPT = 'script'
+    # Requests which get challenge page only when Zone-H slows us down.
+    CRAWL = frozenset((ARCHIVE, MIRROR))
+
+
+class CaptchaEvent:
+    """Captcha lifecycle events for metrics."""
+    REQUESTED = 'requested'
+    SENT = 'sent'
+    SOLVED = 'solved'
+    FAILED = 'failed'
+    TIMEOUT = 'timeout'
+
+
+class ThreadName:
+    """Names (prefixes for executors) of scraping and delivery threads."""
+    PROCESSOR = 'Processor'
+    PUSHER = 'Pusher'
+    ASYNC_ENGINE = 'Async engine'
+    ARCHIVE = 'Archive'
+    MIRROR = 'Mirror'
+    ALL = frozenset((PROCESSOR, PUSHER, ASYNC_ENGINE, ARCHIVE, MIRROR))
+
+
+# Seconds to wait for every thread to finish on shutdown before closing
+# record stores.
+THREAD_STOP_TIMEOUT = 30
 
 
 class _HTTPMethods:
@@ -86,6 +173,32 @@ MIRROR_PAGE_MAP = {
                    'server': _M_DEFACES}}
 
 START_PAGE = 1
+MIRROR_WORKERS = 2
+
+# Requests per second. Initial rate is one request per ~9 seconds. Raising
+# the limits increases the risk of getting perm banned by Zone-H's
+# anti-DDoS logic.
+RATE_LIMIT = {'initial_rate': 0.11,
+              'min_rate': 0.02,
+              'max_rate': 0.25,
+              'increase': 0.002,
+              'decrease': 0.5,
+              'burst': 1}
+
+# Telegram delivery. Telegram allows about one message per second to the
+# same chat and 30 messages per second overall. Records are packed into one
+# message up to `batch_size` records and switched to one-line digest when
+# more than `digest_threshold` records wait in the push queue.
+TELEGRAM_MAX_MSG_LEN = 4096
+DELIVERY = {'batch_size': 5,
+            'digest_threshold': 50,
+            'chat_rate': 1.0,
+            'global_rate': 30.0}
+
+# Seconds scraper waits for captcha to be solved before giving up the
+# crawl, and how many times page is refetched after captcha or pre-login.
+CAPTCHA_TIMEOUT = 600
+MAX_PAGE_RETRIES = 3
 
 HZ_URL = '{url}?hz=1'
 COOKIES_JS_URL = f'{BASE_URL}/z.js'
@@ -103,3 +216,39 @@ HEADERS = {'Host': HOST,
            'Accept-Language': 'en-US,en;q=0.9'}
 
 TMP_DIR = f'{os.getenv("Temp")}\\' if sys.platform == 'win32' else '/tmp/'
+SEEN_DB_FILE = f'{TMP_DIR}zoneh_seen.db'
+COOKIES_FILE = f'{TMP_DIR}zoneh_cookiejar'
+
+RECORD_DB_FILE = f'{TMP_DIR}zoneh_records.db'
+STORE_BATCH_SIZE = 100
+STORE_FLUSH_INTERVAL = 5
+STORE_OPTIMIZE_INTERVAL = 3600
+SEARCH_LIMIT = 20
+
+# Records export is kept in memory up to this size and spooled to disk
+# afterwards.
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Challenge cookie is refreshed in background this many seconds before it
+# expires, failed refresh is retried after delay.
+COOKIES_REFRESH_MARGIN = 300
+COOKIES_RETRY_DELAY = 60
+
+# Name of the only identity when no identities are configured, it keeps
+# cookies in `COOKIES_FILE`.
+DEFAULT_IDENTITY = 'default'
+
+METRICS = {'enabled': False,
+           'host': '127.0.0.1',
+           'port': 9100}
+METRICS_PATH = '/metrics'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Sampling profiler interval in seconds and limits of /profile and /mem
+# commands.
+PROFILE_INTERVAL = 0.01
+PROFILE_SECONDS = 30
+PROFILE_MAX_SECONDS = 600
+PROFILE_TOP = 15
+MEM_TRACE_SECONDS = 10
+PROFILE_FILENAME = 'zoneh.pstats'
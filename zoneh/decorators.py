@@ -3,11 +3,8 @@
 from functools import wraps
 
 import zoneh.exceptions as exc
-from zoneh.utils import get_lock
 from zoneh.utils import is_generator
 
-_lock = get_lock()
-
 
 def authorization_check(func):
     """Check that user is authorized to interact with bot."""
@@ -25,14 +22,14 @@ def authorization_check(func):
 
 
 def lock(func):
-    """Thread locking decorator.
+    """Thread locking decorator for methods guarded by instance `_lock`.
 
     Caution: can create deadlock.
     """
     @wraps(func)
-    def wrapper(*args, **kwargs):
-        with _lock:
-            return func(*args, **kwargs)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return func(self, *args, **kwargs)
 
     return wrapper
 
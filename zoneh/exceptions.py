@@ -14,6 +14,10 @@ class ConfigError(ZoneHError):
     pass
 
 
+class FilterExpressionError(ConfigError):
+    pass
+
+
 class ProcessorError(ZoneHError):
     pass
 
@@ -40,3 +44,15 @@ class HTMLParserCookiesError(HTMLParserError):
 
 class CaptchaError(ZoneHError):
     pass
+
+
+class CookiesChallengeError(ZoneHError):
+    pass
+
+
+class CommandArgsError(ZoneHError):
+    pass
+
+
+class ExportError(CommandArgsError):
+    pass
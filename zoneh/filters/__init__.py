@@ -1,7 +1,11 @@
 from .country import CountryFilter
 from .domain import DomainFilter
+from .keyword import KeywordFilter
+from .network import NetworkFilter
 from .notifier import NotifierFilter
 
 __all__ = ['CountryFilter',
            'DomainFilter',
+           'KeywordFilter',
+           'NetworkFilter',
            'NotifierFilter']
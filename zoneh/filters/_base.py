@@ -2,13 +2,27 @@ import logging
 
 
 class BaseFilter:
+    """Match record `FIELD` against set of values with `OPERATOR`.
+
+    `COST` is relative match cost, cheaper filters are checked first.
+    """
+
     TYPE = None
+    FIELD = None
+    OPERATOR = '='
+    COST = 1
 
-    def __init__(self):
+    def __init__(self, values):
         self._log = logging.getLogger(self.__class__.__name__)
+        self.values = self._normalize(values)
 
     def __repr__(self):
-        return f'<{self.__class__.__name__} type:{self.TYPE}>'
+        return f'<{self.__class__.__name__} type:{self.TYPE} ' \
+               f'values:{len(self.values)}>'
+
+    @staticmethod
+    def _normalize(values):
+        return frozenset(values)
 
     def match(self, record):
         raise NotImplementedError
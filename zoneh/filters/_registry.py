@@ -6,7 +6,7 @@ class FilterRegistry(type):
 
     def __new__(mcs, name, bases, attrs):
         new_cls = type.__new__(mcs, name, bases, attrs)
-        mcs.REGISTRY[new_cls.TYPE] = new_cls()
+        mcs.REGISTRY[new_cls.TYPE] = new_cls
         return new_cls
 
     @classmethod
@@ -14,5 +14,9 @@ class FilterRegistry(type):
         return copy.copy(mcs.REGISTRY)
 
     @classmethod
-    def get_instances(mcs):
-        return list(mcs.REGISTRY.values())
+    def get_filter_class(mcs, field, operator):
+        """Get filter class handling field with operator or None."""
+        for filter_cls in mcs.REGISTRY.values():
+            if (filter_cls.FIELD, filter_cls.OPERATOR) == (field, operator):
+                return filter_cls
+        return None
@@ -1,21 +1,18 @@
-from zoneh.conf import get_config
 from zoneh.const import FilterType
 from zoneh.filters._base import BaseFilter
 from zoneh.filters._registry import FilterRegistry
 from zoneh.iso3166 import COUNTRY_DICT
 
-_CONF = get_config()
-
 
 class CountryFilter(BaseFilter, metaclass=FilterRegistry):
 
     TYPE = FilterType.COUNTRY
+    FIELD = 'country'
 
-    def __init__(self):
-        super().__init__()
-        _countries = _CONF['zoneh']['filters']['countries']
-        self._countries = frozenset(COUNTRY_DICT[x] for x in _countries)
-        self.is_empty = bool(self._countries)
+    @staticmethod
+    def _normalize(values):
+        """Map ISO 3166-1 alpha-2 codes to Zone-H country names."""
+        return frozenset(COUNTRY_DICT.get(x.upper(), x) for x in values)
 
     def match(self, record):
-        return record['country'] in self._countries
+        return record.country in self.values
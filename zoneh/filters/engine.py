@@ -2,30 +2,68 @@
 
 import logging
 
-from zoneh.conf import get_config
 from zoneh.filters._registry import FilterRegistry
+from zoneh.filters.expression import (
+    IP_FIELD, URL_FIELDS, combine_any, compile_expression, compile_filter
+)
+from zoneh.filters.watchlist import load_watchlists
 
-_CONF = get_config()
+
+def _match_all(record):
+    return True
 
 
 class FilterEngine:
-    """Record Filter Engine."""
+    """Record Filter Engine.
+
+    Filters are compiled once into single predicate. `expression` from
+    config takes precedence over per-type filter lists, which match when
+    any of the non-empty lists matches. Watchlist files are referenced in
+    expression by name, watchlists named after filter type extend its
+    list.
+    """
 
-    def __init__(self):
+    def __init__(self, conf, watchlists_conf=None):
+        """Class constructor.
+
+        `conf` is `filters` config section, `watchlists_conf` is
+        `watchlists` one.
+        """
         self._log = logging.getLogger(self.__class__.__name__)
-        self._registry = FilterRegistry
-        self._is_active = self._get_active_state()
-        self._log.info('Initializing %s with filters %s', repr(self),
-                       self._registry.get_instances())
+        watchlists = load_watchlists(watchlists_conf or {})
+        self._expression = conf.get('expression')
+        if self._expression:
+            predicate, self.fields = compile_expression(self._expression,
+                                                        watchlists)
+        else:
+            predicate, self.fields = self._compile_lists(conf, watchlists)
+        self._is_active = predicate is not None
+        self.match = predicate.match if predicate else _match_all
+        self._log.info('Initializing %r', self)
 
     def __repr__(self):
-        return f'<{self.__class__.__name__} is_active:{self._is_active}'
+        return f'<{self.__class__.__name__} is_active:{self._is_active} ' \
+               f'expression:{self._expression} fields:{sorted(self.fields)}>'
+
+    @property
+    def needs_url(self):
+        """Whether filter needs full defaced URL of truncated records."""
+        return bool(self.fields & URL_FIELDS)
 
-    def _get_active_state(self):
-        return any([f.is_empty for f in self._registry.REGISTRY.values()])
+    @property
+    def needs_ip(self):
+        """Whether filter needs IP address from mirror page of each record."""
+        return IP_FIELD in self.fields
 
-    def match(self, record):
-        """Check whether record matches any of the configured filters."""
-        if not self._is_active:
-            return True
-        return any([f.match(record) for f in self._registry.REGISTRY.values()])
+    @staticmethod
+    def _compile_lists(conf, watchlists):
+        filters = []
+        for type_, filter_cls in FilterRegistry.get_registry().items():
+            filter_ = filter_cls(conf.get(type_, []) +
+                                 watchlists.get(type_, []))
+            if filter_.values:
+                filters.append(filter_)
+        if not filters:
+            return None, set()
+        return combine_any(map(compile_filter, filters)), \
+            {filter_.FIELD for filter_ in filters}
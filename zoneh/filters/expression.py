@@ -0,0 +1,362 @@
+"""Filter expression module.
+
+Expression combines record field conditions with `and`, `or`, `not` and
+parentheses, e.g.
+`country = BR and (domain suffix .gov.br or notifier ~ "(?i)^brb")`.
+
+Operators: `=` equality, `!=` inequality, `~` regex search, `suffix`,
+`contains` case-insensitive substring and `in` network (`ip` only).
+Fields are record fields, `domain`, the host name of `defaced_url` and
+`ip` from mirror page. Values with spaces, parentheses, quotes or `=!~`
+are quoted with `"` or `'`. Value `@name` stands for all entries of
+watchlist `name`, e.g. `domain suffix @gov_domains`.
+
+Expression is compiled once into nested closures. Operands of `and` and
+`or` are reordered by their cost and conditions other than regex on the
+same field joined with `or` are merged into one lookup.
+"""
+
+import re
+
+from zoneh.exceptions import FilterExpressionError
+from zoneh.filters._registry import FilterRegistry
+from zoneh.filters.matchers import AhoCorasick
+from zoneh.parsers.record import ArchiveRecord
+from zoneh.utils import get_domain
+
+_TOKEN_REGEX = re.compile(r'''\s*(?:
+    (?P<paren>[()])
+    |(?P<op>!=|=|~)
+    |"(?P<dquoted>[^"]*)"
+    |'(?P<squoted>[^']*)'
+    |(?P<word>[^\s()"'=!~]+)
+)''', re.VERBOSE)
+
+_AND, _OR, _NOT = 'and', 'or', 'not'
+_SUFFIX, _CONTAINS, _IN = 'suffix', 'contains', 'in'
+_OPERATORS = frozenset(['=', '!=', '~', _SUFFIX, _CONTAINS, _IN])
+_MERGEABLE = frozenset(['=', _SUFFIX, _CONTAINS, _IN])
+_WATCHLIST_PREFIX = '@'
+DOMAIN_FIELD = 'domain'
+IP_FIELD = 'ip'
+FIELDS = frozenset(ArchiveRecord.FIELDS + (DOMAIN_FIELD, IP_FIELD))
+# Fields which need full defaced URL of truncated records.
+URL_FIELDS = frozenset([DOMAIN_FIELD, 'defaced_url'])
+
+_COST_EQ = 1
+_COST_SUFFIX = 2
+_COST_CONTAINS = 3
+_COST_REGEX = 5
+
+
+class _Token:
+    """Expression token."""
+
+    __slots__ = ('kind', 'value', 'pos')
+
+    def __init__(self, kind, value, pos):
+        self.kind = kind
+        self.value = value
+        self.pos = pos
+
+
+class _Term:
+    """Single `field operator value` condition."""
+
+    def __init__(self, field, operator, value):
+        self.field = field
+        self.operator = operator
+        self.values = [value]
+
+
+class _Node:
+    """`and`, `or` or `not` of child nodes."""
+
+    def __init__(self, operator, children):
+        self.operator = operator
+        self.children = children
+
+
+class _Predicate:
+    """Compiled record predicate with match cost."""
+
+    __slots__ = ('match', 'cost')
+
+    def __init__(self, match, cost):
+        self.match = match
+        self.cost = cost
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_REGEX.match(text, pos)
+        if not match or match.end() == pos:
+            raise FilterExpressionError(
+                f'Unexpected character at {pos} in filter expression '
+                f'"{text}"')
+        kind = match.lastgroup
+        token = _Token(kind, match.group(kind), match.start(kind))
+        if kind in ('dquoted', 'squoted'):
+            token.kind = 'value'
+        tokens.append(token)
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser of filter expression.
+
+    expr := and_expr ('or' and_expr)*
+    and_expr := not_expr ('and' not_expr)*
+    not_expr := 'not' not_expr | '(' expr ')' | FIELD OPERATOR VALUE
+    """
+
+    def __init__(self, text):
+        self._text = text
+        self._tokens = _tokenize(text)
+        self._pos = 0
+
+    def parse(self):
+        if not self._tokens:
+            self._error('Empty filter expression')
+        node = self._parse_or()
+        if self._peek():
+            self._error('Unexpected token', self._peek())
+        return node
+
+    def _error(self, message, token=None):
+        where = f' "{token.value}" at {token.pos}' if token else ''
+        raise FilterExpressionError(
+            f'{message}{where} in filter expression "{self._text}"')
+
+    def _peek(self):
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+        return None
+
+    def _next(self, expected):
+        token = self._peek()
+        if token is None:
+            self._error(f'Expected {expected}, got end of expression')
+        self._pos += 1
+        return token
+
+    def _accept_word(self, word):
+        token = self._peek()
+        if token and token.kind == 'word' and token.value.lower() == word:
+            self._pos += 1
+            return True
+        return False
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._accept_word(_OR):
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else _Node(_OR, children)
+
+    def _parse_and(self):
+        children = [self._parse_not()]
+        while self._accept_word(_AND):
+            children.append(self._parse_not())
+        return children[0] if len(children) == 1 else _Node(_AND, children)
+
+    def _parse_not(self):
+        if self._accept_word(_NOT):
+            return _Node(_NOT, [self._parse_not()])
+        token = self._next('condition')
+        if token.kind == 'paren' and token.value == '(':
+            node = self._parse_or()
+            closing = self._next('")"')
+            if closing.value != ')' or closing.kind != 'paren':
+                self._error('Expected ")"', closing)
+            return node
+        return self._parse_term(token)
+
+    def _parse_term(self, field):
+        if field.kind != 'word' or field.value not in FIELDS:
+            self._error('Unknown field', field)
+        operator = self._next('operator')
+        op_value = operator.value.lower()
+        if operator.kind not in ('op', 'word') or op_value not in _OPERATORS:
+            self._error('Unknown operator', operator)
+        if op_value == _IN and field.value != IP_FIELD:
+            self._error(f'Operator "{_IN}" is supported only for '
+                        f'"{IP_FIELD}" field', operator)
+        value = self._next('value')
+        if value.kind not in ('word', 'value'):
+            self._error('Expected value', value)
+        if op_value == '~':
+            try:
+                re.compile(value.value)
+            except re.error as err:
+                self._error(f'Invalid regex ({err})', value)
+        return _Term(field.value, op_value, value.value)
+
+
+def parse(text):
+    """Parse expression text into syntax tree.
+
+    Raise `FilterExpressionError` on syntax errors.
+    """
+    return _simplify(_Parser(text).parse())
+
+
+def _simplify(node):
+    """Flatten nested `and`/`or`, merge `=` and `suffix` terms joined with
+    `or` and turn `!=` into `not =`.
+    """
+    if isinstance(node, _Term):
+        if node.operator == '!=':
+            node.operator = '='
+            return _Node(_NOT, [node])
+        return node
+
+    children = []
+    for child in map(_simplify, node.children):
+        if isinstance(child, _Node) and child.operator == node.operator \
+                and node.operator != _NOT:
+            children.extend(child.children)
+        else:
+            children.append(child)
+
+    if node.operator == _OR:
+        merged = {}
+        for child in list(children):
+            if isinstance(child, _Term) and child.operator in _MERGEABLE:
+                key = (child.field, child.operator)
+                if key in merged:
+                    merged[key].values.extend(child.values)
+                    children.remove(child)
+                else:
+                    merged[key] = child
+    node.children = children
+    return children[0] if len(children) == 1 and node.operator != _NOT \
+        else node
+
+
+def get_fields(node):
+    """Get set of record fields used in expression."""
+    if isinstance(node, _Term):
+        return {node.field}
+    return set().union(*map(get_fields, node.children))
+
+
+def compile_filter(filter_):
+    """Compile registered filter instance to predicate."""
+    return _Predicate(filter_.match, filter_.COST)
+
+
+def _get_getter(field):
+    """Get function returning field value of record as string."""
+    if field == DOMAIN_FIELD:
+        return lambda record: get_domain(record.defaced_url)
+
+    def getter(record):
+        value = getattr(record, field)
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return '' if value is None else str(value)
+    return getter
+
+
+def _expand_values(term, watchlists):
+    """Replace watchlist references with watchlist entries."""
+    if term.operator == '~':
+        return term.values
+    values = []
+    for value in term.values:
+        if not value.startswith(_WATCHLIST_PREFIX):
+            values.append(value)
+            continue
+        name = value[len(_WATCHLIST_PREFIX):]
+        if name not in watchlists:
+            raise FilterExpressionError(
+                f'Unknown watchlist "{name}" in filter expression')
+        values.extend(watchlists[name])
+    return values
+
+
+def _compile_term(term, watchlists):
+    values = _expand_values(term, watchlists)
+    filter_cls = FilterRegistry.get_filter_class(term.field, term.operator)
+    if filter_cls:
+        return compile_filter(filter_cls(values))
+
+    getter = _get_getter(term.field)
+    if term.operator == '=':
+        values = frozenset(values)
+        return _Predicate(lambda record: getter(record) in values, _COST_EQ)
+    if term.operator == _SUFFIX:
+        suffixes = tuple(values)
+        return _Predicate(lambda record: getter(record).endswith(suffixes),
+                          _COST_SUFFIX)
+    if term.operator == _CONTAINS:
+        contains = AhoCorasick(values).match
+        return _Predicate(lambda record: contains(getter(record)),
+                          _COST_CONTAINS)
+    search = re.compile(values[0]).search
+    return _Predicate(lambda record: search(getter(record)) is not None,
+                      _COST_REGEX)
+
+
+def combine_any(predicates):
+    """Combine predicates with short-circuiting `or`, cheapest first."""
+    return _combine(_OR, predicates)
+
+
+def combine_all(predicates):
+    """Combine predicates with short-circuiting `and`, cheapest first."""
+    return _combine(_AND, predicates)
+
+
+def _combine(operator, predicates):
+    predicates = sorted(predicates, key=lambda pred: pred.cost)
+    cost = sum(pred.cost for pred in predicates)
+    funcs = [pred.match for pred in predicates]
+    if len(funcs) == 1:
+        return predicates[0]
+    if len(funcs) == 2:
+        first, second = funcs
+        if operator == _AND:
+            return _Predicate(
+                lambda record: first(record) and second(record), cost)
+        return _Predicate(
+            lambda record: first(record) or second(record), cost)
+
+    if operator == _AND:
+        def match(record):
+            for func in funcs:
+                if not func(record):
+                    return False
+            return True
+    else:
+        def match(record):
+            for func in funcs:
+                if func(record):
+                    return True
+            return False
+    return _Predicate(match, cost)
+
+
+def _compile(node, watchlists):
+    if isinstance(node, _Term):
+        return _compile_term(node, watchlists)
+    predicates = [_compile(child, watchlists) for child in node.children]
+    if node.operator == _NOT:
+        func = predicates[0].match
+        return _Predicate(lambda record: not func(record),
+                          predicates[0].cost)
+    return _combine(node.operator, predicates)
+
+
+def compile_expression(text, watchlists=None):
+    """Compile expression text into predicate.
+
+    `watchlists` maps watchlist names to lists of entries. Return tuple of
+    predicate and set of used record fields.
+    """
+    tree = parse(text)
+    return _compile(tree, watchlists or {}), get_fields(tree)
@@ -0,0 +1,18 @@
+from zoneh.const import FilterType
+from zoneh.filters._base import BaseFilter
+from zoneh.filters._registry import FilterRegistry
+from zoneh.filters.matchers import AhoCorasick
+
+
+class KeywordFilter(BaseFilter, metaclass=FilterRegistry):
+    TYPE = FilterType.KEYWORD
+    FIELD = 'defaced_url'
+    OPERATOR = 'contains'
+    COST = 3
+
+    @staticmethod
+    def _normalize(values):
+        return AhoCorasick(values)
+
+    def match(self, record):
+        return self.values.match(record.defaced_url)
@@ -0,0 +1,173 @@
+"""Watchlist matchers module.
+
+Matchers are built once from watchlist entries and match a key in time
+proportional to the key length regardless of the watchlist size.
+"""
+
+import ipaddress
+import socket
+
+_SUBDOMAINS = 1
+_DOMAIN = 2
+
+# Marks CIDR tree node covered by inserted network.
+_COVERED = True
+
+
+class SuffixTrie:
+    """Domain suffix trie keyed by reversed domain labels.
+
+    Suffix `go.id` matches `go.id` and all its subdomains, suffix with
+    leading dot `.go.id` matches subdomains only.
+    """
+
+    def __init__(self, suffixes=()):
+        """Class constructor."""
+        self._root = {}
+        self._len = 0
+        for suffix in suffixes:
+            self.add(suffix)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, suffix):
+        suffix = suffix.strip().lower()
+        kind = _SUBDOMAINS if suffix.startswith('.') else _DOMAIN
+        labels = suffix.strip('.').split('.')
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        # Label can't be None so it is safe to keep terminal mark under it.
+        if None not in node:
+            self._len += 1
+        node[None] = max(node.get(None, 0), kind)
+
+    def match(self, domain):
+        """Check whether domain ends with any of the suffixes."""
+        labels = domain.split('.')
+        left = len(labels)
+        node = self._root
+        for label in reversed(labels):
+            node = node.get(label)
+            if node is None:
+                return False
+            left -= 1
+            kind = node.get(None)
+            if kind is not None and (left or kind == _DOMAIN):
+                return True
+        return False
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton for case-insensitive substring search."""
+
+    def __init__(self, keywords=()):
+        """Class constructor."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+        for keyword in keywords:
+            self._add(keyword.lower())
+        self._build()
+
+    def __len__(self):
+        return sum(self._out)
+
+    def _add(self, keyword):
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(False)
+            state = next_state
+        self._out[state] = True
+
+    def _build(self):
+        """Compute failure links breadth first."""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._out[next_state] = self._out[next_state] or \
+                    self._out[fail]
+
+    def match(self, text):
+        """Check whether text contains any of the keywords."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                return True
+        return False
+
+
+class CidrTree:
+    """Binary radix tree of IPv4 and IPv6 networks."""
+
+    def __init__(self, networks=()):
+        """Class constructor."""
+        self._roots = {socket.AF_INET: [None, None],
+                       socket.AF_INET6: [None, None]}
+        self._len = 0
+        for network in networks:
+            self.add(network)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, network):
+        network = ipaddress.ip_network(network.strip(), strict=False)
+        address = int(network.network_address)
+        max_len = network.max_prefixlen
+        family = socket.AF_INET if network.version == 4 else socket.AF_INET6
+        node = self._roots[family]
+        for depth in range(network.prefixlen):
+            if node is _COVERED:
+                break
+            bit = (address >> (max_len - depth - 1)) & 1
+            if depth == network.prefixlen - 1:
+                node[bit] = _COVERED
+                break
+            if node[bit] is None:
+                node[bit] = [None, None]
+            node = node[bit]
+        else:
+            # Zero length prefix covers the whole address family.
+            self._roots[family] = _COVERED
+        self._len += 1
+
+    def match(self, ip):
+        """Check whether IP address belongs to any of the networks."""
+        # inet_pton is much faster than ipaddress.ip_address().
+        for family in (socket.AF_INET, socket.AF_INET6):
+            try:
+                packed = socket.inet_pton(family, ip)
+                break
+            except OSError:
+                continue
+        else:
+            return False
+        node = self._roots[family]
+        value = int.from_bytes(packed, 'big')
+        shift = len(packed) * 8
+        while node is not _COVERED:
+            if node is None:
+                return False
+            shift -= 1
+            node = node[(value >> shift) & 1]
+        return True
@@ -0,0 +1,22 @@
+from zoneh.const import FilterType
+from zoneh.exceptions import ConfigError
+from zoneh.filters._base import BaseFilter
+from zoneh.filters._registry import FilterRegistry
+from zoneh.filters.matchers import CidrTree
+
+
+class NetworkFilter(BaseFilter, metaclass=FilterRegistry):
+    TYPE = FilterType.NETWORK
+    FIELD = 'ip'
+    OPERATOR = 'in'
+    COST = 3
+
+    @staticmethod
+    def _normalize(values):
+        try:
+            return CidrTree(values)
+        except ValueError as err:
+            raise ConfigError(f'Invalid network filter: {err}')
+
+    def match(self, record):
+        return bool(record.ip) and self.values.match(record.ip)
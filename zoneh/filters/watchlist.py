@@ -0,0 +1,27 @@
+"""Watchlist module."""
+
+import logging
+
+from zoneh.exceptions import ConfigError
+
+_log = logging.getLogger(__name__)
+
+
+def load_watchlist(path):
+    """Read watchlist entries from text file.
+
+    One entry per line, empty lines and lines starting with `#` are skipped.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as fd:
+            entries = [line.strip() for line in fd]
+    except OSError as err:
+        raise ConfigError(f'Failed to read watchlist {path}: {err}')
+    entries = [x for x in entries if x and not x.startswith('#')]
+    _log.info('Loaded %d entries from watchlist %s', len(entries), path)
+    return entries
+
+
+def load_watchlists(conf):
+    """Load watchlists from `{name: path}` config."""
+    return {name: load_watchlist(path) for name, path in conf.items()}
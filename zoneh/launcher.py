@@ -3,33 +3,35 @@ import logging
 from telegram.ext import CommandHandler, Filters, MessageHandler, Updater
 
 import zoneh.const as const
-from zoneh.conf import get_config
+from zoneh.metrics import MetricsServer
 from zoneh.zoneh import ZoneHBot
 
-_CONF = get_config()
-
 
 class ZBotLauncher:
     """Bot launcher."""
 
-    def __init__(self):
+    def __init__(self, conf):
         """Class constructor."""
         self._log = logging.getLogger(self.__class__.__name__)
+        self._conf = conf
 
-        log_level = self._get_int_log_level(_CONF['log_level'])
+        log_level = self._get_int_log_level(conf['log_level'])
         logging.getLogger().setLevel(log_level)
 
-        self._bot = ZoneHBot(stop_polling=self._stop_polling)
+        self._bot = ZoneHBot(conf, stop_polling=self._stop_polling)
         self._updater = Updater(bot=self._bot)
         self._welcome_sent = False
+        self._metrics_server = None
         self._setup_commands()
 
     def run(self):
-        """Run bot."""
+        """Run bot until /stop command or stop signal."""
         self._log.info('Starting %s bot', self._updater.bot.first_name)
+        self._start_metrics_server()
         self._send_welcome_message()
         self._updater.start_polling()
         self._updater.idle()
+        self._bot.shutdown()
 
     def _send_welcome_message(self):
         """Send welcome message to the user."""
@@ -37,8 +39,24 @@ class ZBotLauncher:
             self._updater.bot.send_welcome_message()
             self._welcome_sent = True
 
+    def _start_metrics_server(self):
+        """Start metrics HTTP endpoint if enabled in config."""
+        conf = dict(const.METRICS,
+                    **self._conf['zoneh'].get('metrics', {}))
+        if not conf['enabled']:
+            return
+        try:
+            self._metrics_server = MetricsServer(conf['host'], conf['port'])
+        except OSError:
+            self._log.exception('Failed to start metrics server on %s:%s',
+                                conf['host'], conf['port'])
+            return
+        self._metrics_server.start()
+
     def _stop_polling(self):
         """Stops bot and exits application."""
+        if self._metrics_server:
+            self._metrics_server.stop()
         self._updater.stop()
         self._updater.is_idle = False
 
@@ -50,6 +68,11 @@ class ZBotLauncher:
         dispatcher.add_handler(CommandHandler('stop', ZoneHBot.cmd_stop))
         dispatcher.add_handler(CommandHandler('run', ZoneHBot.cmd_run))
         dispatcher.add_handler(CommandHandler('csv', ZoneHBot.make_csv))
+        dispatcher.add_handler(CommandHandler('search', ZoneHBot.cmd_search))
+        dispatcher.add_handler(CommandHandler('stats', ZoneHBot.cmd_stats))
+        dispatcher.add_handler(
+            CommandHandler('profile', ZoneHBot.cmd_profile))
+        dispatcher.add_handler(CommandHandler('mem', ZoneHBot.cmd_mem))
         dispatcher.add_handler(
             MessageHandler(Filters.text, ZoneHBot.solve_captcha))
         dispatcher.add_error_handler(ZoneHBot.error_handler)
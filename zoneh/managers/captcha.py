@@ -1,50 +1,167 @@
 """Captcha manager module."""
 
 import logging
+from collections import OrderedDict
+from threading import Condition
 
-from zoneh.captcha import captcha
-from zoneh.clients.zoneh import ZoneHAPI
+from zoneh.captcha import Captcha
+from zoneh.const import CAPTCHA_TIMEOUT, CaptchaEvent
 from zoneh.decorators import lock
-from zoneh.parsers.htmlparser import HTMLParser
+from zoneh.metrics import CAPTCHA_EVENTS
 from zoneh.utils import Singleton
 
 
 class CaptchaManager(metaclass=Singleton):
-    """Captcha manager class."""
+    """Coordinate pending captchas of Zone-H sessions.
 
-    def __init__(self, captcha_):
+    Captcha is keyed by API client (identity session) it blocks. Identity
+    with pending captcha is quarantined by identity pool, scrapers park on
+    condition only when all identities wait for captcha to be solved in
+    the telegram chat or wait times out, delivery keeps working.
+    """
+
+    def __init__(self):
         """Class constructor."""
         self._log = logging.getLogger(self.__class__.__name__)
-        self._api = ZoneHAPI()
-        self._captcha = captcha_
-        self._parser = HTMLParser()
+        self._lock = Condition()
+        self._pending = OrderedDict()
+        # Sessions whose captcha image is being fetched.
+        self._requesting = set()
+        self._subscribers = []
+        self._interrupts = 0
+
+    def subscribe(self, callback):
+        """Subscribe callback called when captcha needs to be sent."""
+        self._subscribers.append(callback)
+
+    def _notify(self):
+        """Notify subscribers that captcha needs to be sent."""
+        for callback in self._subscribers:
+            callback()
+
+    @property
+    def has_pending(self):
+        return bool(self._pending)
+
+    def is_pending(self, api):
+        """Check whether API client session waits for captcha."""
+        return api in self._pending or api in self._requesting
+
+    def request(self, api, type_, page_num):
+        """Register captcha for API client session.
+
+        Captcha is shared by all archives crawled with the client, only
+        the first request fetches the image. Image is fetched without
+        holding the lock, session counts as pending meanwhile.
+        """
+        with self._lock:
+            if self.is_pending(api):
+                self._log.debug('Captcha is already pending: %r',
+                                self._pending.get(api))
+                return
+            self._requesting.add(api)
+        try:
+            image = api.get_captcha_img()
+        except Exception:
+            with self._lock:
+                self._requesting.discard(api)
+                self._lock.notify_all()
+            raise
+        with self._lock:
+            self._requesting.discard(api)
+            self._pending[api] = Captcha(api, (type_, page_num), image)
+            self._lock.notify_all()
+        CAPTCHA_EVENTS.labels(CaptchaEvent.REQUESTED).inc()
+        self._notify()
+
+    def wait(self, apis, timeout=CAPTCHA_TIMEOUT):
+        """Block until any of API client sessions has no pending captcha.
+
+        Return False on timeout or interrupt.
+        """
+        with self._lock:
+            interrupts = self._interrupts
+            self._lock.wait_for(
+                lambda: self._any_free(apis) or
+                self._interrupts != interrupts, timeout)
+            if self._any_free(apis):
+                return True
+            if self._interrupts == interrupts:
+                CAPTCHA_EVENTS.labels(CaptchaEvent.TIMEOUT).inc()
+            return False
+
+    def _any_free(self, apis):
+        return not all(map(self.is_pending, apis))
+
+    @lock
+    def interrupt(self):
+        """Wake up all waiters, e.g. on shutdown."""
+        self._interrupts += 1
+        self._lock.notify_all()
+
+    @lock
+    def take_unsent(self):
+        """Mark pending captchas as sent and return them."""
+        captchas = [c for c in self._pending.values() if not c.is_sent]
+        for captcha in captchas:
+            captcha.is_sent = True
+            captcha.image.seek(0)
+        return captchas
 
     @lock
-    def init_captcha(self, type_, page_num):
-        """Init captcha object."""
-        captcha.is_active = True
-        captcha.page = (type_, page_num)
-        captcha.image = self._api.get_captcha_img()
+    def mark_sent(self, captcha, message_id):
+        """Remember telegram message the captcha was sent with."""
+        captcha.message_id = message_id
+        CAPTCHA_EVENTS.labels(CaptchaEvent.SENT).inc()
 
     @lock
-    def solve_captcha(self, captcha_text):
-        """Solve captcha."""
-        self._log.info('Solving captcha with text "%s"', captcha_text)
-        self._captcha.is_sent = False
-        if not self._api.solve_captcha(captcha_text, captcha.page):
+    def mark_unsent(self, captcha):
+        """Mark captcha as not sent after failed send attempt."""
+        captcha.is_sent = False
+
+    def solve_captcha(self, captcha_text, message_id=None):
+        """Solve captcha replied to message or the oldest pending one.
+
+        Return None if there is no pending captcha.
+        """
+        captcha = self._find(message_id)
+        if captcha is None:
+            return None
+
+        self._log.info('Solving captcha %r with text "%s"', captcha,
+                       captcha_text)
+        if not captcha.api.solve_captcha(captcha_text, captcha.page):
             self._log.info('Captcha not solved')
-            self._update_captcha()
+            CAPTCHA_EVENTS.labels(CaptchaEvent.FAILED).inc()
+            self._update_captcha(captcha)
             return False
 
         self._log.info('Captcha solved')
-        self._captcha.reset()
+        CAPTCHA_EVENTS.labels(CaptchaEvent.SOLVED).inc()
+        with self._lock:
+            self._pending.pop(captcha.api, None)
+            self._lock.notify_all()
         return True
 
-    def _update_captcha(self):
+    @lock
+    def _find(self, message_id):
+        """Find pending captcha by telegram message id, fall back to the
+        oldest one.
+        """
+        for captcha in self._pending.values():
+            if message_id is not None and captcha.message_id == message_id:
+                return captcha
+        return next(iter(self._pending.values()), None)
+
+    def _update_captcha(self, captcha):
         """Update captcha after failed solve attempt."""
         self._log.info('Updating captcha')
-        self._captcha.image = self._api.get_captcha_img()
-        self._captcha.failed_attempts += 1
+        image = captcha.api.get_captcha_img()
+        with self._lock:
+            captcha.image = image
+            captcha.failed_attempts += 1
+            captcha.is_sent = False
+        self._notify()
 
 
-captcha_manager = CaptchaManager(captcha)
+captcha_manager = CaptchaManager()
@@ -16,14 +16,28 @@ class ThreadManager:
 
         self._should_run = Event()
         self._should_run.set()
+        self._should_stop = Event()
 
     def start_threads(self):
         """Start threads."""
         for thread in self._threads:
-            thread.add_run_trigger(run_trigger=self._should_run)
+            thread.add_run_trigger(run_trigger=self._should_run,
+                                   stop_trigger=self._should_stop)
             thread.start()
             self._running_threads.append(thread)
 
     def stop_threads(self):
         """Stop threads."""
         self._should_run.clear()
+        self._should_stop.set()
+        for thread in self._running_threads:
+            thread.stop()
+
+    def join_threads(self, timeout=None):
+        """Wait for stopped threads to finish, `timeout` is per thread.
+
+        Return False if any of them is still alive.
+        """
+        for thread in self._running_threads:
+            thread.join(timeout)
+        return not any(thread.is_alive() for thread in self._running_threads)
@@ -0,0 +1,345 @@
+"""Metrics module.
+
+Minimal Prometheus-style counters, gauges and histograms exposed in text
+format over local HTTP endpoint. Updating a metric costs a lock and an
+addition, label children are cached, so instrumentation stays on in
+production.
+"""
+
+import logging
+import math
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+
+from zoneh.const import METRICS_CONTENT_TYPE, METRICS_PATH
+
+# Seconds, from fast page parsing to slow Zone-H responses.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"'
+                     for name, value in zip(names, values))
+    return f'{{{pairs}}}'
+
+
+class _CounterChild:
+    __slots__ = ('_lock', '_value')
+
+    def __init__(self):
+        self._lock = Lock()
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self._value
+
+
+class _GaugeChild:
+    __slots__ = ('_lock', '_value', '_func')
+
+    def __init__(self):
+        self._lock = Lock()
+        self._value = 0
+        self._func = None
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, func):
+        """Compute gauge value with `func` at exposition time."""
+        self._func = func
+
+    def samples(self, name, labels):
+        yield name, labels, self._func() if self._func else self._value
+
+
+class _Timer:
+    """Context manager observing elapsed time."""
+
+    __slots__ = ('_observe', '_start')
+
+    def __init__(self, observe):
+        self._observe = observe
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._observe(time.monotonic() - self._start)
+
+
+class _HistogramChild:
+    __slots__ = ('_lock', '_bounds', '_counts', '_sum')
+
+    def __init__(self, bounds):
+        self._lock = Lock()
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self):
+        """Observe duration of `with` block."""
+        return _Timer(self.observe)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self._bounds + (math.inf,), counts):
+            cumulative += count
+            yield f'{name}_bucket', labels + (('le', bound),), cumulative
+        yield f'{name}_sum', labels, total
+        yield f'{name}_count', labels, cumulative
+
+
+class _Metric:
+    """Metric family with optional labels.
+
+    Metric without labels proxies its single child, labeled metric
+    returns children with `labels()`.
+    """
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Class constructor."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Get child metric for label values."""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'Expected labels {self.labelnames}, '
+                                 f'got {values}')
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def collect(self):
+        """Yield lines of metric family in text exposition format."""
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.TYPE}'
+        for values, child in sorted(self._children.items()):
+            labels = tuple(zip(self.labelnames, values))
+            for name, sample_labels, value in child.samples(self.name,
+                                                             labels):
+                names = [label for label, _ in sample_labels]
+                label_values = [_format_value(x) if label == 'le' else x
+                                for label, x in sample_labels]
+                yield f'{name}{_format_labels(names, label_values)} ' \
+                      f'{_format_value(value)}'
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    TYPE = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set_function(self, func):
+        self._default.set_function(func)
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        """Class constructor."""
+        self._bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+class MetricsRegistry:
+    """Registry of metric families."""
+
+    def __init__(self):
+        """Class constructor."""
+        self._metrics = {}
+        self._lock = Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def expose(self):
+        """Return all metrics in text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _register(metric_cls, *args, **kwargs):
+    return REGISTRY.register(metric_cls(*args, **kwargs))
+
+
+REQUESTS = _register(
+    Counter, 'zoneh_requests_total', 'Zone-H requests.',
+    ('kind', 'status'))
+REQUEST_DURATION = _register(
+    Histogram, 'zoneh_request_duration_seconds',
+    'Zone-H request latency.', ('kind',))
+PAGE_PARSE_DURATION = _register(
+    Histogram, 'zoneh_page_parse_duration_seconds',
+    'Zone-H page parsing time.', ('page',))
+RECORDS = _register(
+    Counter, 'zoneh_records_total',
+    'Processed records by stage: scraped, matched, pushed and dropped.',
+    ('stage',))
+PUSH_QUEUE_DEPTH = _register(
+    Gauge, 'zoneh_push_queue_depth', 'Items waiting for delivery.')
+REQUEST_RATE = _register(
+    Gauge, 'zoneh_request_rate', 'Current Zone-H request rate, req/s.',
+    ('identity',))
+IDENTITIES_AVAILABLE = _register(
+    Gauge, 'zoneh_identities_available',
+    'Zone-H identities without pending captcha.')
+CAPTCHA_EVENTS = _register(
+    Counter, 'zoneh_captcha_events_total',
+    'Captcha events: requested, sent, solved, failed and timeout.',
+    ('event',))
+COOKIES_REFRESH = _register(
+    Counter, 'zoneh_cookies_refresh_total',
+    'Challenge cookie refreshes by solver and result.',
+    ('solver', 'result'))
+TELEGRAM_SEND_DURATION = _register(
+    Histogram, 'zoneh_telegram_send_duration_seconds',
+    'Telegram send latency including rate limiting wait.', ('method',))
+TELEGRAM_FLOOD_WAITS = _register(
+    Counter, 'zoneh_telegram_flood_waits_total',
+    'Telegram flood control RetryAfter errors.')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format_, *args):
+        pass
+
+
+class MetricsServer:
+    """Serve metrics over HTTP in a daemon thread."""
+
+    def __init__(self, host, port, registry=REGISTRY):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        handler = type('MetricsHandler', (_MetricsHandler,),
+                       {'registry': registry})
+        self._server = _ThreadingHTTPServer((host, port), handler)
+        self._thread = Thread(target=self._server.serve_forever,
+                              name='Metrics server', daemon=True)
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        self._thread.start()
+        self._log.info('Serving metrics on http://%s:%s%s',
+                       *self.address, METRICS_PATH)
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,36 @@
+"""HTML parser backends package."""
+
+import logging
+
+from zoneh.const import ParserBackend
+from zoneh.exceptions import ConfigError
+
+_log = logging.getLogger(__name__)
+
+
+def get_backend(name=ParserBackend.LXML):
+    """Return HTML parser backend instance by name.
+
+    Fall back to BeautifulSoup backend when lxml is not installed.
+    """
+    if name not in ParserBackend.ALL:
+        err_msg = f'Unknown parser backend "{name}", ' \
+                  f'choose from {ParserBackend.ALL}'
+        _log.error(err_msg)
+        raise ConfigError(err_msg)
+
+    if name == ParserBackend.LXML:
+        try:
+            from zoneh.parsers.backends.libxml import LxmlBackend
+            return LxmlBackend()
+        except ImportError:
+            _log.warning('lxml is not installed, falling back to "%s" '
+                         'parser backend', ParserBackend.SOUP)
+            name = ParserBackend.SOUP
+
+    if name == ParserBackend.STREAM:
+        from zoneh.parsers.backends.stream import StreamBackend
+        return StreamBackend()
+
+    from zoneh.parsers.backends.soup import SoupBackend
+    return SoupBackend()
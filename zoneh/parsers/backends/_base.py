@@ -0,0 +1,69 @@
+"""Base HTML parser backend module."""
+
+import logging
+
+
+class Cell:
+    """Minimal extract of an HTML element needed by the parsers.
+
+    `text` is the concatenated text of the element, `has_img`/`img_title`
+    describe its first image, `href` is the link of its first anchor and
+    `next_link` is the text of the first anchor following its first
+    `strong` sibling (archive pagination).
+    """
+
+    __slots__ = ('text', 'has_img', 'img_title', 'href', 'next_link')
+
+    def __init__(self, text='', has_img=False, img_title=None, href=None,
+                 next_link=None):
+        """Class constructor."""
+        self.text = text
+        self.has_img = has_img
+        self.img_title = img_title
+        self.href = href
+        self.next_link = next_link
+
+    def __repr__(self):
+        return f'<Cell {self.text.strip()[:30]!r}>'
+
+
+class MirrorItem:
+    """Mirror page `li` element with its nested metadata fields."""
+
+    __slots__ = ('text', 'fields')
+
+    def __init__(self, text='', fields=None):
+        """Class constructor."""
+        self.text = text
+        self.fields = fields if fields is not None else {}
+
+    def __repr__(self):
+        return f'<MirrorItem {self.text.strip()[:30]!r}>'
+
+
+class BaseBackend:
+    """Base HTML parser backend."""
+
+    NAME = None
+
+    def __init__(self):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} name:{self.NAME}>'
+
+    def get_table_rows(self, page, table_id):
+        """Return rows of `Cell` lists of the table with given id.
+
+        Return None when table is not found.
+        """
+        raise NotImplementedError
+
+    def get_mirror_items(self, page, li_class, field_classes):
+        """Return `MirrorItem` list for `li` elements with given class."""
+        raise NotImplementedError
+
+    def get_last_script(self, page):
+        """Return text of the last `script` element or None."""
+        raise NotImplementedError
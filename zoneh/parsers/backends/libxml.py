@@ -0,0 +1,21 @@
+"""lxml HTML parser backend module."""
+
+from lxml import etree
+
+from zoneh.const import ParserBackend
+from zoneh.parsers.backends.stream import StopParsing, StreamBackend
+
+
+class LxmlBackend(StreamBackend):
+    """Streaming backend feeding libxml2 parser events to the targets."""
+
+    NAME = ParserBackend.LXML
+
+    def _parse(self, page, target):
+        parser = etree.HTMLParser(target=target)
+        try:
+            parser.feed(page)
+            parser.close()
+        except (StopParsing, etree.XMLSyntaxError):
+            pass
+        return target.result()
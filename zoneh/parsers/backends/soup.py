@@ -0,0 +1,52 @@
+"""BeautifulSoup HTML parser backend module."""
+
+from bs4 import BeautifulSoup
+
+from zoneh.const import ParserBackend
+from zoneh.parsers.backends._base import BaseBackend, Cell, MirrorItem
+
+
+class HtmlSoup(BeautifulSoup):
+    def __init__(self, page):
+        """Class constructor."""
+        super().__init__(page, 'html.parser')
+
+
+class SoupBackend(BaseBackend):
+    """Full DOM backend built on BeautifulSoup with `html.parser`."""
+
+    NAME = ParserBackend.SOUP
+
+    def get_table_rows(self, page, table_id):
+        table = HtmlSoup(page).find('table', attrs={'id': table_id})
+        if not table:
+            return None
+        return [[self._make_cell(col) for col in row.find_all('td')]
+                for row in table.find_all('tr')]
+
+    def get_mirror_items(self, page, li_class, field_classes):
+        items = []
+        for elem in HtmlSoup(page).find_all('li', {'class': li_class}):
+            fields = {}
+            for class_ in field_classes:
+                inner = elem.find('li', {'class': class_})
+                if inner:
+                    fields[class_] = self._make_cell(inner)
+            items.append(MirrorItem(elem.text, fields))
+        return items
+
+    def get_last_script(self, page):
+        scripts = HtmlSoup(page).find_all('script')
+        return scripts[-1].string if scripts else None
+
+    @staticmethod
+    def _make_cell(elem):
+        img = elem.find('img')
+        link = elem.find('a')
+        strong = elem.find('strong')
+        next_link = strong.find_next_sibling('a') if strong else None
+        return Cell(text=elem.text,
+                    has_img=bool(img),
+                    img_title=img.get('title') if img else None,
+                    href=link.get('href') if link else None,
+                    next_link=next_link.text if next_link else None)
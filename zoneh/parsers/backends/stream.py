@@ -0,0 +1,291 @@
+"""Streaming HTML parser backend module.
+
+Pages are tokenized into start/end/data events which are handled by small
+targets extracting only the needed elements, no DOM tree is built.
+Targets follow lxml parser target interface and are shared with
+`LxmlBackend`.
+"""
+
+from html.parser import HTMLParser as _StdHTMLParser
+
+from zoneh.const import ParserBackend
+from zoneh.parsers.backends._base import BaseBackend, Cell, MirrorItem
+
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img',
+                        'input', 'link', 'meta', 'param', 'source', 'track',
+                        'wbr'))
+
+
+class StopParsing(Exception):
+    """Raised by target when everything needed is extracted."""
+    pass
+
+
+def _has_class(attrs, class_):
+    return class_ in (attrs.get('class') or '').split()
+
+
+class _CellBuilder:
+    """Collect `Cell` data of a single element from parser events."""
+
+    __slots__ = ('depth', '_parts', '_has_img', '_img_title', '_seen_link',
+                 '_href', '_strong_depth', '_sibling_depth', '_link_depth',
+                 '_link_parts')
+
+    def __init__(self, depth):
+        """Class constructor."""
+        self.depth = depth
+        self._parts = []
+        self._has_img = False
+        self._img_title = None
+        self._seen_link = False
+        self._href = None
+        self._strong_depth = None
+        self._sibling_depth = None
+        self._link_depth = None
+        self._link_parts = None
+
+    def start(self, tag, attrs, depth):
+        if tag == 'img' and not self._has_img:
+            self._has_img = True
+            self._img_title = attrs.get('title')
+        elif tag == 'a':
+            if not self._seen_link:
+                self._seen_link = True
+                self._href = attrs.get('href')
+            if self._link_parts is None and depth == self._sibling_depth:
+                self._link_depth = depth
+                self._link_parts = []
+        elif tag == 'strong' and self._strong_depth is None:
+            self._strong_depth = depth
+
+    def end(self, tag, depth):
+        if tag == 'strong' and depth == self._strong_depth \
+                and self._link_parts is None:
+            self._sibling_depth = depth
+        elif tag == 'a' and depth == self._link_depth:
+            self._link_depth = None
+            self._sibling_depth = None
+        elif self._sibling_depth is not None and depth < self._sibling_depth:
+            self._sibling_depth = None
+
+    def data(self, data):
+        self._parts.append(data)
+        if self._link_depth is not None:
+            self._link_parts.append(data)
+
+    def build(self):
+        next_link = None if self._link_parts is None \
+            else ''.join(self._link_parts)
+        return Cell(text=''.join(self._parts),
+                    has_img=self._has_img,
+                    img_title=self._img_title,
+                    href=self._href,
+                    next_link=next_link)
+
+
+class _Target:
+    """Base event target keeping stack of open elements."""
+
+    def __init__(self):
+        """Class constructor."""
+        self._stack = []
+
+    def start(self, tag, attrs):
+        depth = len(self._stack)
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
+        self.handle_start(tag, attrs, depth)
+
+    def end(self, tag):
+        if tag not in self._stack:
+            return
+        while True:
+            closed = self._stack.pop()
+            self.handle_end(closed, len(self._stack))
+            if closed == tag:
+                break
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        return self.result()
+
+    def handle_start(self, tag, attrs, depth):
+        pass
+
+    def handle_end(self, tag, depth):
+        pass
+
+    def result(self):
+        raise NotImplementedError
+
+
+class TableTarget(_Target):
+    """Collect rows of cells of the table with given id."""
+
+    def __init__(self, table_id):
+        """Class constructor."""
+        super().__init__()
+        self._table_id = table_id
+        self._table_depth = None
+        self._rows = None
+        self._row = None
+        self._cell = None
+
+    def handle_start(self, tag, attrs, depth):
+        if self._cell is not None:
+            self._cell.start(tag, attrs, depth)
+        elif self._table_depth is None:
+            if tag == 'table' and attrs.get('id') == self._table_id:
+                self._table_depth = depth
+                self._rows = []
+        elif tag == 'tr':
+            self._row = []
+        elif tag == 'td' and self._row is not None:
+            self._cell = _CellBuilder(depth)
+
+    def handle_end(self, tag, depth):
+        if self._cell is not None:
+            if depth == self._cell.depth:
+                self._row.append(self._cell.build())
+                self._cell = None
+            else:
+                self._cell.end(tag, depth)
+        elif tag == 'tr' and self._row is not None:
+            self._rows.append(self._row)
+            self._row = None
+        elif tag == 'table' and depth == self._table_depth:
+            raise StopParsing
+
+    def data(self, data):
+        if self._cell is not None:
+            self._cell.data(data)
+
+    def result(self):
+        return self._rows
+
+
+class MirrorTarget(_Target):
+    """Collect `li` elements with given class and their nested fields."""
+
+    def __init__(self, li_class, field_classes):
+        """Class constructor."""
+        super().__init__()
+        self._li_class = li_class
+        self._field_classes = field_classes
+        self._items = []
+        self._open = []
+        self._field = None
+
+    def handle_start(self, tag, attrs, depth):
+        if self._field is not None:
+            self._field[1].start(tag, attrs, depth)
+        elif tag == 'li':
+            if _has_class(attrs, self._li_class):
+                item = MirrorItem()
+                self._items.append(item)
+                self._open.append((depth, item, []))
+            elif self._open:
+                for class_ in self._field_classes:
+                    if _has_class(attrs, class_) and \
+                            class_ not in self._open[-1][1].fields:
+                        self._field = (class_, _CellBuilder(depth))
+                        break
+
+    def handle_end(self, tag, depth):
+        if self._field is not None:
+            class_, builder = self._field
+            if depth == builder.depth:
+                self._open[-1][1].fields[class_] = builder.build()
+                self._field = None
+            else:
+                builder.end(tag, depth)
+        elif self._open and depth == self._open[-1][0]:
+            _, item, parts = self._open.pop()
+            item.text = ''.join(parts)
+
+    def data(self, data):
+        for _, _, parts in self._open:
+            parts.append(data)
+        if self._field is not None:
+            self._field[1].data(data)
+
+    def result(self):
+        return self._items
+
+
+class ScriptTarget(_Target):
+    """Collect text of the last `script` element."""
+
+    def __init__(self):
+        """Class constructor."""
+        super().__init__()
+        self._parts = None
+        self._last = None
+
+    def handle_start(self, tag, attrs, depth):
+        if tag == 'script':
+            self._parts = []
+
+    def handle_end(self, tag, depth):
+        if tag == 'script' and self._parts is not None:
+            self._last = ''.join(self._parts) or None
+            self._parts = None
+
+    def data(self, data):
+        if self._parts is not None:
+            self._parts.append(data)
+
+    def result(self):
+        return self._last
+
+
+class _TargetParser(_StdHTMLParser):
+    """Standard library tokenizer feeding events to the target."""
+
+    def __init__(self, target):
+        """Class constructor."""
+        super().__init__(convert_charrefs=True)
+        self._target = target
+
+    def handle_starttag(self, tag, attrs):
+        self._target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self._target.start(tag, dict(attrs))
+        self._target.end(tag)
+
+    def handle_endtag(self, tag):
+        self._target.end(tag)
+
+    def handle_data(self, data):
+        self._target.data(data)
+
+
+class StreamBackend(BaseBackend):
+    """Pure Python streaming backend on top of `html.parser` tokenizer."""
+
+    NAME = ParserBackend.STREAM
+
+    def get_table_rows(self, page, table_id):
+        return self._parse(page, TableTarget(table_id))
+
+    def get_mirror_items(self, page, li_class, field_classes):
+        return self._parse(page, MirrorTarget(li_class, field_classes))
+
+    def get_last_script(self, page):
+        return self._parse(page, ScriptTarget())
+
+    def _parse(self, page, target):
+        """Feed page to the target and return its result."""
+        if isinstance(page, bytes):
+            page = page.decode('utf-8', 'replace')
+        parser = _TargetParser(target)
+        try:
+            parser.feed(page)
+            parser.close()
+        except StopParsing:
+            pass
+        return target.result()
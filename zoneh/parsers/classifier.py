@@ -0,0 +1,49 @@
+"""Page classifier module.
+
+Fetched pages are classified once with cheap marker lookups instead of
+parsing them to find out what Zone-H has returned.
+"""
+
+import re
+
+from zoneh.const import CAPTCHA_ID, PRELOGIN_CONDITION, TBL_ID, PageType
+
+
+def _compile_markers(pattern):
+    """Compile marker pattern for both str and bytes pages."""
+    return re.compile(pattern), re.compile(pattern.encode())
+
+
+_RECORDS_MARKERS = _compile_markers(rf'''id\s*=\s*["']?{TBL_ID}\b''')
+_CAPTCHA_MARKERS = _compile_markers(rf'''id\s*=\s*["']?{CAPTCHA_ID}\b''')
+_PRELOGIN_MARKERS = _compile_markers(re.escape(PRELOGIN_CONDITION))
+
+
+def _search(markers, page):
+    return markers[isinstance(page, bytes)].search(page) is not None
+
+
+def is_records_page(page):
+    """Check whether page contains archive records table."""
+    return _search(_RECORDS_MARKERS, page)
+
+
+def is_captcha_page(page):
+    """Check whether page contains captcha image."""
+    return _search(_CAPTCHA_MARKERS, page)
+
+
+def is_prelogin_page(page):
+    """Check whether page is a pre-login cookies challenge."""
+    return _search(_PRELOGIN_MARKERS, page)
+
+
+def classify_page(page):
+    """Classify fetched page returning one of `PageType` values."""
+    if is_records_page(page):
+        return PageType.RECORDS
+    if is_captcha_page(page):
+        return PageType.CAPTCHA
+    if is_prelogin_page(page):
+        return PageType.PRELOGIN
+    return PageType.UNKNOWN
@@ -1,9 +1,9 @@
 """FormattedRecord module."""
 
+import html
 import inspect
 
 from zoneh.const import MIRROR_URL, MASS_DEFACEMENT_URL, REDEFACEMENT_URL
-from zoneh.utils import get_func_name
 
 
 class Record:
@@ -12,7 +12,7 @@ class Record:
     def __init__(self, record):
         """Class constructor.
 
-        Represent Zone-H table row as record object.
+        Represent Zone-H table row `ArchiveRecord` as record object.
         """
         self._record = record
 
@@ -24,45 +24,49 @@ class Record:
 
     @property
     def date(self):
-        return self._record[get_func_name()]
+        return self._record.date
 
     @property
     def notifier(self):
-        return self._record[get_func_name()]
+        return self._record.notifier
 
     @property
     def homepage_defacement(self):
-        return self._record[get_func_name()]
+        return self._record.homepage_defacement
 
     @property
     def mass_defacement(self):
-        ipaddr = self._record[get_func_name()]
+        ipaddr = self._record.mass_defacement
         return MASS_DEFACEMENT_URL.format(ip=ipaddr) if ipaddr else 'False'
 
     @property
     def redefacement(self):
-        domain = self._record[get_func_name()]
+        domain = self._record.redefacement
         return REDEFACEMENT_URL.format(domain=domain) if domain else 'False'
 
     @property
     def country(self):
-        return self._record[get_func_name()]
+        return self._record.country
 
     @property
     def special(self):
-        return self._record[get_func_name()]
+        return self._record.special
 
     @property
     def defaced_url(self):
-        return self._record[get_func_name()]
+        return self._record.defaced_url
 
     @property
     def os(self):
-        return self._record[get_func_name()]
+        return self._record.os
+
+    @property
+    def archives(self):
+        return ', '.join(self._record.archives)
 
     @property
     def mirror(self):
-        mirror_id = self._record[get_func_name()]
+        mirror_id = self._record.mirror
         return MIRROR_URL.format(mirror_id=mirror_id)
 
 
@@ -81,16 +85,40 @@ class FormattedRecord(Record):
 
     def format(self):
         """Format record object."""
+        esc = html.escape
         message = f"""<pre>Record #{self._rec_num}
-                      Date: {self.date}
-                      Notifier: {self.notifier}
-                      Homepage Defacement: {self.homepage_defacement}
-                      Mass Defacement: {self.mass_defacement}
-                      Redefacement: {self.redefacement}
-                      Country: {self.country}
-                      Special: {self.special}
-                      URL: {self.defaced_url}
-                      OS: {self.os}
-                      Mirror: {self.mirror}
+                      Date: {esc(str(self.date))}
+                      Notifier: {esc(self.notifier)}
+                      Homepage Defacement: {esc(str(self.homepage_defacement))}
+                      Mass Defacement: {esc(self.mass_defacement)}
+                      Redefacement: {esc(self.redefacement)}
+                      Country: {esc(str(self.country))}
+                      Special: {esc(str(self.special))}
+                      URL: {esc(self.defaced_url)}
+                      OS: {esc(str(self.os))}
+                      Archives: {esc(self.archives)}
+                      Mirror: {esc(self.mirror)}
                       </pre>"""
         return inspect.cleandoc(message)
+
+
+class DigestRecord(Record):
+    """One-line record representation used when push queue is backed up."""
+
+    def __init__(self, record, rec_num=None):
+        """Class constructor."""
+        super().__init__(record)
+        self._rec_num = rec_num
+        self.data = self.format()
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return self.__str__()
+
+    def format(self):
+        """Format record object."""
+        return f'#{self._rec_num} {self.date} {html.escape(self.notifier)} ' \
+               f'{self.country} <a href="{self.mirror}">' \
+               f'{html.escape(self.defaced_url)}</a>'
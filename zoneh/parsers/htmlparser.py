@@ -2,22 +2,20 @@
 
 import logging
 import re
-from collections import OrderedDict
-
-from bs4 import BeautifulSoup
 
 from zoneh.const import (
-    CAPTCHA_ID, COOKIES_JS_REGEX, MIRROR_LI_CLASS, MIRROR_PAGE_MAP,
-    PRELOGIN_CONDITION, TBL_ID, TBL_MAP, TBL_PAGE_NUMS_ROW_ID, TBL_SKIP_ROWS
+    COOKIES_JS_REGEX, MIRROR_LI_CLASS, MIRROR_PAGE_MAP, TBL_ID, TBL_MAP,
+    TBL_PAGE_NUMS_ROW_ID, TBL_SKIP_ROWS, ParserBackend
 )
 from zoneh.decorators import content_handler
-from zoneh.utils import Singleton
+from zoneh.parsers.backends import get_backend
+from zoneh.parsers.classifier import is_captcha_page, is_prelogin_page
+from zoneh.parsers.record import ArchiveRecord
 
 
-class HtmlSoup(BeautifulSoup):
-    def __init__(self, page):
-        """Class constructor."""
-        super().__init__(page, 'html.parser')
+_MIRROR_FIELD_CLASSES = tuple(sorted(
+    {cls for meta in MIRROR_PAGE_MAP.values() for key, cls in meta.items()
+     if key != 'index'}))
 
 
 class ColumnParser:
@@ -43,11 +41,11 @@ class ColumnParser:
 
     @classmethod
     def country(cls, data):
-        return data.find('img').get('title') if data.find('img') else ''
+        return data.img_title if data.has_img else ''
 
     @classmethod
     def special(cls, data):
-        return bool(data.find('img'))
+        return data.has_img
 
     @classmethod
     def defaced_url(cls, data):
@@ -59,20 +57,19 @@ class ColumnParser:
 
     @classmethod
     def mirror(cls, data):
-        return int(data.find('a').get('href').rsplit('/', 1)[1])
+        return int(data.href.rsplit('/', 1)[1])
 
     @classmethod
     def __split_path(cls, data):
-        path = data.find('a')
-        return path.get('href').split('=')[-1] if path else None
+        return data.href.split('=')[-1] if data.href else None
 
 
 class MirrorPageParser:
-    def __init__(self, page):
+    def __init__(self, page, backend):
         """Class constructor."""
         self._log = logging.getLogger(self.__class__.__name__)
-        self._soup = HtmlSoup(page)
-        self._elems = self._soup.find_all('li', {'class': MIRROR_LI_CLASS})
+        self._elems = backend.get_mirror_items(page, MIRROR_LI_CLASS,
+                                               _MIRROR_FIELD_CLASSES)
 
     def get_mirror_data(self):
         data = {}
@@ -94,45 +91,50 @@ class MirrorPageParser:
     @staticmethod
     def _get_notifier(inner):
         _class = MIRROR_PAGE_MAP['metadata_1']['notifier']
-        return inner.find('li', {'class': _class}).text.rsplit(' ', 1)[-1]
+        return inner.fields[_class].text.rsplit(' ', 1)[-1]
 
     @staticmethod
     def _get_url(inner):
         _class = MIRROR_PAGE_MAP['metadata_1']['defaced_url_full']
-        return inner.find('li', {'class': _class}).text.rsplit(' ')[-1]
+        return inner.fields[_class].text.rsplit(' ')[-1]
 
     @staticmethod
     def _get_ip_and_country(inner):
         _class = MIRROR_PAGE_MAP['metadata_1']['ip_and_country']
-        li = inner.find('li', {'class': _class})
-        ip = li.text.rstrip().rsplit(' ', 1)[-1]
-        country = li.img.get('title') if li.img else ''
+        field = inner.fields[_class]
+        ip = field.text.rstrip().rsplit(' ', 1)[-1]
+        country = field.img_title if field.has_img else ''
         return ip, country
 
     @staticmethod
     def _get_os(inner):
         _class = MIRROR_PAGE_MAP['metadata_2']['os']
-        return inner.find('li', {'class': _class}).text.split(' ')[-1]
+        return inner.fields[_class].text.split(' ')[-1]
 
     @staticmethod
     def _get_server(inner):
         _class = MIRROR_PAGE_MAP['metadata_2']['server']
-        return inner.find('li', {'class': _class}).text.split(' ')[-1]
+        return inner.fields[_class].text.split(' ')[-1]
 
 
-class HTMLParser(metaclass=Singleton):
-    def __init__(self):
+class HTMLParser:
+    def __init__(self, backend=None):
         """Class constructor."""
         self._log = logging.getLogger(self.__class__.__name__)
-        self._rev_map = {v: getattr(ColumnParser, k) for k, v in
-                         TBL_MAP.items()}
+        self._backend = backend or get_backend()
+        self._columns = tuple(getattr(ColumnParser, name) for name in
+                              sorted(TBL_MAP, key=TBL_MAP.get))
+        self._log.debug('Using %s', self._backend)
 
-    @staticmethod
-    def parse_cookies(page):
-        cookies = {}
-        soup = HtmlSoup(page)
+    @classmethod
+    def from_config(cls, conf):
+        """Create parser with backend set in `zoneh` config section."""
+        return cls(get_backend(conf.get('parser_backend',
+                                        ParserBackend.LXML)))
 
-        js_script = soup.find_all('script')[-1].string
+    def parse_cookies(self, page):
+        cookies = {}
+        js_script = self._backend.get_last_script(page)
         if not js_script:
             # TODO
             pass
@@ -151,37 +153,32 @@ class HTMLParser(metaclass=Singleton):
 
     @content_handler
     def get_records(self, page):
-        soup = HtmlSoup(page)
-        table = soup.find('table', attrs={'id': TBL_ID})
-        next_page = self.get_next_page(table)
-        rows = table.find_all('tr')
+        rows = self._backend.get_table_rows(page, TBL_ID)
+        next_page = self.get_next_page(rows)
         start_slice, end_slice = TBL_SKIP_ROWS
 
-        for row in rows[start_slice:end_slice]:
-            record = OrderedDict()
-            cols = row.find_all('td')
-            for index, col in enumerate(cols):
-                record[self._rev_map[index].__name__] = \
-                    self._rev_map[index](col)
+        for cols in rows[start_slice:end_slice]:
+            if len(cols) != len(self._columns):
+                self._log.warning('Skipping archive row with %d columns '
+                                  'instead of %d', len(cols),
+                                  len(self._columns))
+                continue
+            record = ArchiveRecord(*[parse(col) for parse, col in
+                                     zip(self._columns, cols)])
             yield record, next_page
 
+    def get_advanced_data(self, page):
+        return MirrorPageParser(page, self._backend).get_mirror_data()
+
     @staticmethod
-    def get_advanced_data(page):
-        return MirrorPageParser(page).get_mirror_data()
+    def get_next_page(rows):
+        col = rows[TBL_PAGE_NUMS_ROW_ID][0]
+        return int(col.next_link) if col.next_link else None
 
     @staticmethod
-    def get_next_page(table):
-        row = table.find_all('tr')[TBL_PAGE_NUMS_ROW_ID]
-        col = row.find('td')
-        next_page = col.find('strong').find_next_sibling('a')
-        return int(next_page.text) if next_page else None
-
-    def is_captcha(self, page):
-        self._log.debug('Parsing page for captcha')
-        # self._log.debug(page)
-        page = HtmlSoup(page)
-        return bool(page.find('img', attrs={'id': CAPTCHA_ID}))
+    def is_captcha(page):
+        return is_captcha_page(page)
 
     @staticmethod
     def is_prelogin(page):
-        return PRELOGIN_CONDITION in page
+        return is_prelogin_page(page)
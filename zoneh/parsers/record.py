@@ -0,0 +1,85 @@
+"""Archive record module."""
+
+
+class ArchiveRecord:
+    """Compact Zone-H archive table row.
+
+    Fields follow `TBL_MAP` column order, `archives` lists archive types
+    the record was seen in. Records are equal and hashed by mirror id and
+    support read-only mapping access for filters and exports.
+    """
+
+    FIELDS = ('date', 'notifier', 'homepage_defacement', 'mass_defacement',
+              'redefacement', 'country', 'special', 'defaced_url', 'os',
+              'mirror')
+    KEYS = FIELDS + ('archives',)
+    # IP address is known only for records with fetched mirror page.
+    __slots__ = KEYS + ('ip',)
+
+    def __init__(self, date, notifier, homepage_defacement, mass_defacement,
+                 redefacement, country, special, defaced_url, os, mirror):
+        """Class constructor."""
+        self.date = date
+        self.notifier = notifier
+        self.homepage_defacement = homepage_defacement
+        self.mass_defacement = mass_defacement
+        self.redefacement = redefacement
+        self.country = country
+        self.special = special
+        self.defaced_url = defaced_url
+        self.os = os
+        self.mirror = mirror
+        self.archives = []
+        self.ip = None
+
+    def __repr__(self):
+        return f'<ArchiveRecord mirror:{self.mirror} url:{self.defaced_url}>'
+
+    def __eq__(self, other):
+        if not isinstance(other, ArchiveRecord):
+            return NotImplemented
+        return self.mirror == other.mirror
+
+    def __hash__(self):
+        return hash(self.mirror)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create record from dict with record fields."""
+        record = cls(*[data[field] for field in cls.FIELDS])
+        archives = data.get('archives') or []
+        if isinstance(archives, str):
+            archives = archives.split(',')
+        record.archives = list(archives)
+        return record
+
+    def add_archive(self, archive):
+        """Tag record with archive type it was seen in."""
+        if archive not in self.archives:
+            self.archives.append(archive)
+
+    def keys(self):
+        return self.KEYS
+
+    def values(self):
+        return tuple(getattr(self, key) for key in self.KEYS)
+
+    def items(self):
+        return tuple(zip(self.KEYS, self.values()))
+
+    def to_dict(self):
+        """Convert record to plain dict suitable for CSV and JSON."""
+        data = dict(self.items())
+        data['archives'] = ','.join(self.archives)
+        return data
@@ -1,37 +1,24 @@
 """CSV processor module."""
 
 import csv
-import io
 import logging
 
+from zoneh.parsers.record import ArchiveRecord
+
 
 class CsvProcessor:
-    """CSV data processor class."""
+    """CSV data processor class.
+
+    Write records as CSV rows to text file object, header is written once.
+    """
 
-    def __init__(self):
+    def __init__(self, fd):
         """Class constructor."""
         self._log = logging.getLogger(self.__class__.__name__)
-        self._csv_fd = io.StringIO()
+        self._writer = csv.DictWriter(fd, fieldnames=ArchiveRecord.KEYS,
+                                      dialect='excel')
+        self._writer.writeheader()
 
     def write(self, record):
         """Write record to CSV object."""
-        headers = []
-        writer = None
-
-        if not headers:
-            headers = list(record.keys())
-            writer = csv.DictWriter(self._csv_fd, fieldnames=headers,
-                                    dialect='excel')
-            writer.writeheader()
-        writer.writerow(record)
-
-    def get_data(self):
-        """Get CSV data."""
-        try:
-            return io.BytesIO(self._csv_fd.getvalue().encode('utf-8'))
-        finally:
-            self._clear()
-
-    def _clear(self):
-        """Clear existing CSV file descriptor."""
-        self._csv_fd = io.StringIO()
+        self._writer.writerow(record.to_dict())
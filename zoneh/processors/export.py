@@ -0,0 +1,162 @@
+"""Export processor module."""
+
+import gzip
+import io
+import logging
+import zipfile
+from tempfile import SpooledTemporaryFile
+
+from zoneh.args import choose, parse_args, parse_country, parse_date
+from zoneh.const import EXPORT_SPOOL_SIZE, Compression, ExportFormat
+from zoneh.exceptions import ExportError
+from zoneh.processors.csv import CsvProcessor
+from zoneh.processors.jsonl import JsonlProcessor
+
+_WRITERS = {ExportFormat.CSV: CsvProcessor,
+            ExportFormat.JSONL: JsonlProcessor}
+_EXTENSIONS = {Compression.NONE: '',
+               Compression.GZIP: '.gz',
+               Compression.ZIP: '.zip'}
+
+
+class ExportOptions:
+    """Export format, compression and record filter.
+
+    Parsed from `key=value` command arguments:
+    `format=csv|jsonl compress=none|gzip|zip from=YYYY-MM-DD to=YYYY-MM-DD
+    country=FR,BR notifier=name1,name2`.
+    """
+
+    def __init__(self, fmt=ExportFormat.CSV, compression=Compression.NONE,
+                 date_from=None, date_to=None, countries=None,
+                 notifiers=None):
+        """Class constructor."""
+        self.fmt = fmt
+        self.compression = compression
+        self.date_from = date_from
+        self.date_to = date_to
+        self.countries = frozenset(countries or ())
+        self.notifiers = frozenset(notifiers or ())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} format:{self.fmt} ' \
+               f'compression:{self.compression} from:{self.date_from} ' \
+               f'to:{self.date_to} countries:{sorted(self.countries)} ' \
+               f'notifiers:{sorted(self.notifiers)}>'
+
+    @property
+    def filename(self):
+        return f'records.{self.fmt}{_EXTENSIONS[self.compression]}'
+
+    @classmethod
+    def from_text(cls, text):
+        """Create options from command message text."""
+        kwargs = {}
+        for key, value in parse_args(text):
+            if key == 'format':
+                kwargs['fmt'] = choose(key, value, ExportFormat.ALL)
+            elif key == 'compress':
+                kwargs['compression'] = choose(key, value, Compression.ALL)
+            elif key in ('from', 'to'):
+                kwargs[f'date_{key}'] = parse_date(value)
+            elif key == 'country':
+                kwargs['countries'] = [parse_country(x)
+                                       for x in value.split(',')]
+            elif key == 'notifier':
+                kwargs['notifiers'] = [x.lower() for x in value.split(',')]
+            else:
+                raise ExportError(f'Unknown argument "{key}"')
+        return cls(**kwargs)
+
+    def match(self, record):
+        """Check whether record passes export filter."""
+        if self.date_from and record.date < self.date_from:
+            return False
+        if self.date_to and record.date > self.date_to:
+            return False
+        if self.countries and record.country.lower() not in self.countries:
+            return False
+        if self.notifiers and record.notifier.lower() not in self.notifiers:
+            return False
+        return True
+
+
+class RecordExporter:
+    """Stream records into spooled temporary file.
+
+    Data stays in memory up to `EXPORT_SPOOL_SIZE` bytes and is rolled
+    over to disk afterwards.
+    """
+
+    def __init__(self, options):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._options = options
+
+    def export(self, records):
+        """Write matching records, return file object and records count.
+
+        Returned file object is positioned at start and should be closed by
+        caller.
+        """
+        spool = SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+        count = 0
+        try:
+            with self._open(spool) as raw:
+                text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                writer = _WRITERS[self._options.fmt](text)
+                for record in records:
+                    if self._options.match(record):
+                        writer.write(record)
+                        count += 1
+                text.flush()
+                text.detach()
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        self._log.info('Exported %d records with %r', count, self._options)
+        return spool, count
+
+    def _open(self, spool):
+        """Open binary stream writing to spool with configured compression."""
+        compression = self._options.compression
+        if compression == Compression.GZIP:
+            return gzip.GzipFile(fileobj=spool, mode='wb')
+        if compression == Compression.ZIP:
+            return _ZipMember(spool, f'records.{self._options.fmt}')
+        return _Unclosed(spool)
+
+
+class _ZipMember:
+    """Context manager of single member zip archive written to file object."""
+
+    def __init__(self, fileobj, name):
+        self._zip = zipfile.ZipFile(fileobj, mode='w',
+                                    compression=zipfile.ZIP_DEFLATED)
+        self._member = None
+        self._name = name
+
+    def __enter__(self):
+        self._member = self._zip.open(self._name, mode='w')
+        return self._member
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._member.close()
+        self._zip.close()
+
+
+class _Unclosed(io.BufferedIOBase):
+    """Context manager of file object which is not closed on exit."""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self._fileobj.write(data)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
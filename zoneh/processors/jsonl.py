@@ -0,0 +1,21 @@
+"""JSON Lines processor module."""
+
+import json
+import logging
+
+
+class JsonlProcessor:
+    """JSON Lines data processor class.
+
+    Write records as one JSON object per line to text file object.
+    """
+
+    def __init__(self, fd):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._fd = fd
+
+    def write(self, record):
+        """Write record as JSON line."""
+        self._fd.write(json.dumps(record.to_dict(), ensure_ascii=False))
+        self._fd.write('\n')
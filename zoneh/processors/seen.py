@@ -0,0 +1,146 @@
+"""Seen records index module."""
+
+import logging
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+
+from zoneh.const import MAX_DEQUE_ITEMS, EvictionPolicy
+from zoneh.exceptions import ProcessorError
+
+
+class SeenRecords:
+    """Bounded hash-indexed store of already processed records.
+
+    Records are keyed by mirror id, optionally combined with a secondary
+    record field, which gives O(1) membership checks. When the store is full
+    the oldest (FIFO) or the least recently seen (LRU) record is evicted.
+    Iteration yields records in insertion order.
+    """
+
+    PRIMARY_KEY = 'mirror'
+
+    def __init__(self, maxlen=MAX_DEQUE_ITEMS, secondary_key=None,
+                 eviction=EvictionPolicy.FIFO):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        if eviction not in EvictionPolicy.ALL:
+            err_msg = f'Unknown eviction policy "{eviction}", ' \
+                      f'choose from {EvictionPolicy.ALL}'
+            self._log.error(err_msg)
+            raise ProcessorError(err_msg)
+
+        self._maxlen = maxlen
+        self._secondary_key = secondary_key
+        self._is_lru = eviction == EvictionPolicy.LRU
+        self._records = OrderedDict()
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} size:{len(self)} ' \
+               f'maxlen:{self._maxlen}>'
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, record):
+        return self.get(record) is not None
+
+    def get(self, record):
+        """Return already stored record with the same key or None."""
+        key = self._make_key(record)
+        with self._lock:
+            stored = self._records.get(key)
+            if stored is not None and self._is_lru:
+                self._records.move_to_end(key)
+            return stored
+
+    def __iter__(self):
+        """Iterate over a snapshot of records in insertion order."""
+        with self._lock:
+            records = list(self._records.values())
+        return iter(records)
+
+    def add(self, record):
+        """Add record to the index evicting the oldest one if full."""
+        key = self._make_key(record)
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            while len(self._records) > self._maxlen:
+                self._records.popitem(last=False)
+
+    def _make_key(self, record):
+        """Make index key from record."""
+        if self._secondary_key is None:
+            return record[self.PRIMARY_KEY]
+        return record[self.PRIMARY_KEY], record[self._secondary_key]
+
+
+class SeenMirrorStore:
+    """Persistent append-only store of seen mirror ids per archive type.
+
+    Backed by SQLite in WAL mode so every added id survives a crash or
+    restart and opening the store costs milliseconds regardless of size.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS seen_mirrors (
+            archive TEXT NOT NULL,
+            mirror_id INTEGER NOT NULL,
+            PRIMARY KEY (archive, mirror_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS seen_mirrors_mirror_id
+            ON seen_mirrors (mirror_id)"""
+
+    def __init__(self, path):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self._SCHEMA)
+        self._conn.commit()
+        self._log.info('Seen mirrors store opened at %s', path)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} path:{self._path}>'
+
+    def contains(self, archive, mirror_id):
+        """Check whether mirror id was already seen in the archive."""
+        with self._lock:
+            cur = self._conn.execute(
+                'SELECT 1 FROM seen_mirrors WHERE archive = ? AND mirror_id = ?',
+                (archive, mirror_id))
+            return cur.fetchone() is not None
+
+    def add(self, archive, mirror_id):
+        """Persist seen mirror id."""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO seen_mirrors (archive, mirror_id) '
+                'VALUES (?, ?)', (archive, mirror_id))
+            self._conn.commit()
+
+    def get_archives(self, mirror_id):
+        """Return archive types the mirror id was seen in."""
+        with self._lock:
+            cur = self._conn.execute(
+                'SELECT archive FROM seen_mirrors WHERE mirror_id = ?',
+                (mirror_id,))
+            return [row[0] for row in cur.fetchall()]
+
+    def last_mirror_id(self, archive):
+        """Return the highest seen mirror id for the archive or None."""
+        with self._lock:
+            cur = self._conn.execute(
+                'SELECT MAX(mirror_id) FROM seen_mirrors WHERE archive = ?',
+                (archive,))
+            return cur.fetchone()[0]
+
+    def close(self):
+        """Close database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,244 @@
+"""Record store module."""
+
+import logging
+import sqlite3
+import time
+from threading import Lock
+
+from zoneh.args import parse_args, parse_country, parse_date
+from zoneh.const import (
+    SEARCH_LIMIT, STORE_BATCH_SIZE, STORE_FLUSH_INTERVAL,
+    STORE_OPTIMIZE_INTERVAL
+)
+from zoneh.exceptions import CommandArgsError
+from zoneh.parsers.record import ArchiveRecord
+from zoneh.utils import get_domain
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    mirror INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    notifier TEXT NOT NULL COLLATE NOCASE,
+    homepage_defacement INTEGER NOT NULL,
+    mass_defacement TEXT,
+    redefacement TEXT,
+    country TEXT NOT NULL COLLATE NOCASE,
+    special INTEGER NOT NULL,
+    defaced_url TEXT NOT NULL,
+    domain_rev TEXT NOT NULL,
+    os TEXT NOT NULL,
+    archives TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_notifier ON records (notifier);
+CREATE INDEX IF NOT EXISTS records_country ON records (country);
+CREATE INDEX IF NOT EXISTS records_domain_rev ON records (domain_rev);
+CREATE INDEX IF NOT EXISTS records_date ON records (date);
+CREATE TABLE IF NOT EXISTS counters (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+"""
+_INSERT = 'INSERT OR IGNORE INTO records VALUES ' \
+          '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+_UPDATE_ARCHIVES = 'UPDATE records SET archives = ? WHERE mirror = ?'
+_INIT_COUNTER = 'INSERT OR IGNORE INTO counters VALUES (?, ?, 0)'
+_INCR_COUNTER = 'UPDATE counters SET count = count + 1 ' \
+                'WHERE kind = ? AND key = ?'
+_COUNTER_KINDS = ('notifier', 'country', 'date')
+_TOTAL = ('total', '')
+_STATS_ORDER = (('notifier', 'count'), ('country', 'count'), ('date', 'key'))
+
+
+def reverse_domain(domain):
+    """Reverse domain labels order so that suffix becomes prefix.
+
+    Trailing dot keeps label boundary, `.go.id` suffix is `id.go.` prefix.
+    """
+    return '.'.join(reversed(domain.strip('.').split('.'))) + '.'
+
+
+class SearchQuery:
+    """Record store search criteria.
+
+    Parsed from `key=value` command arguments: `notifier=name country=BR
+    domain=.go.id from=YYYY-MM-DD to=YYYY-MM-DD mirror=id limit=N`.
+    """
+
+    def __init__(self, notifier=None, country=None, domain=None,
+                 date_from=None, date_to=None, mirror=None,
+                 limit=SEARCH_LIMIT):
+        """Class constructor."""
+        self.notifier = notifier
+        self.country = country
+        self.domain = domain
+        self.date_from = date_from
+        self.date_to = date_to
+        self.mirror = mirror
+        self.limit = limit
+
+    @classmethod
+    def from_text(cls, text):
+        """Create query from command message text."""
+        kwargs = {}
+        for key, value in parse_args(text):
+            if key in ('notifier', 'domain'):
+                kwargs[key] = value.lower()
+            elif key == 'country':
+                kwargs[key] = parse_country(value)
+            elif key in ('from', 'to'):
+                kwargs[f'date_{key}'] = parse_date(value)
+            elif key in ('mirror', 'limit'):
+                if not value.isdigit():
+                    raise CommandArgsError(f'Invalid {key} "{value}"')
+                kwargs[key] = int(value)
+            else:
+                raise CommandArgsError(f'Unknown argument "{key}"')
+        if not kwargs.keys() - {'limit'}:
+            raise CommandArgsError('At least one search criteria is needed')
+        return cls(**kwargs)
+
+    def to_sql(self):
+        """Return WHERE clause and its parameters."""
+        clauses, params = [], []
+        if self.mirror is not None:
+            clauses.append('mirror = ?')
+            params.append(self.mirror)
+        if self.notifier:
+            clauses.append('notifier = ?')
+            params.append(self.notifier)
+        if self.country:
+            clauses.append('country = ?')
+            params.append(self.country)
+        if self.domain:
+            # Domain suffix is a prefix of reversed domain, '/' follows '.'
+            # so the range covers all strings starting with the prefix.
+            prefix = reverse_domain(self.domain)
+            clauses.append('domain_rev >= ? AND domain_rev < ?')
+            params += [prefix, prefix[:-1] + '/']
+        if self.date_from:
+            clauses.append('date >= ?')
+            params.append(self.date_from)
+        if self.date_to:
+            clauses.append('date <= ?')
+            params.append(self.date_to)
+        return ' AND '.join(clauses) or '1', params
+
+
+class RecordStore:
+    """Persistent indexed store of all scraped records.
+
+    Records are buffered and written in batched transactions. Aggregated
+    counters are maintained on write so that stats don't scan the table.
+    """
+
+    def __init__(self, path, batch_size=STORE_BATCH_SIZE,
+                 flush_interval=STORE_FLUSH_INTERVAL):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._lock = Lock()
+        self._pending = {}
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._flushed = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        self._optimize()
+        self._log.info('Record store opened at %s', path)
+
+    def add(self, record):
+        """Buffer record for writing, flush if batch is full."""
+        with self._lock:
+            self._pending[record.mirror] = record
+            if len(self._pending) >= self._batch_size or \
+                    time.monotonic() - self._flushed >= self._flush_interval:
+                self._flush()
+
+    def flush(self):
+        """Write buffered records."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._flushed = time.monotonic()
+        if not self._pending:
+            return
+        records = list(self._pending.values())
+        self._pending.clear()
+        with self._conn:
+            for record in records:
+                self._write(record)
+        self._log.debug('Flushed %d records to store', len(records))
+        if self._flushed - self._optimized >= STORE_OPTIMIZE_INTERVAL:
+            self._optimize()
+
+    def _optimize(self):
+        """Refresh index statistics so that query planner picks the most
+        selective index.
+        """
+        self._optimized = time.monotonic()
+        self._conn.execute('PRAGMA optimize')
+
+    def _write(self, record):
+        """Insert new record updating counters, update archives of known."""
+        domain = get_domain(record.defaced_url)
+        archives = ','.join(record.archives)
+        cursor = self._conn.execute(_INSERT, (
+            record.mirror, record.date, record.notifier,
+            record.homepage_defacement, record.mass_defacement,
+            record.redefacement, record.country, record.special,
+            record.defaced_url, reverse_domain(domain), record.os, archives))
+        if not cursor.rowcount:
+            self._conn.execute(_UPDATE_ARCHIVES, (archives, record.mirror))
+            return
+        counters = [_TOTAL] + [(kind, getattr(record, kind).lower())
+                               for kind in _COUNTER_KINDS]
+        self._conn.executemany(_INIT_COUNTER, counters)
+        self._conn.executemany(_INCR_COUNTER, counters)
+
+    def search(self, query):
+        """Return newest records matching query."""
+        where, params = query.to_sql()
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                f'SELECT {", ".join(ArchiveRecord.FIELDS)}, archives '
+                f'FROM records WHERE {where} ORDER BY mirror DESC LIMIT ?',
+                params + [query.limit]).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def stats(self, top=5):
+        """Return total records count, top notifiers and countries and
+        records count of the latest dates.
+        """
+        with self._lock:
+            self._flush()
+            total = self._conn.execute(
+                'SELECT count FROM counters WHERE kind = ? AND key = ?',
+                _TOTAL).fetchone()
+            tops = {kind: self._conn.execute(
+                f'SELECT key, count FROM counters WHERE kind = ? '
+                f'ORDER BY {order} DESC LIMIT ?', (kind, top)).fetchall()
+                for kind, order in _STATS_ORDER}
+        return (total[0] if total else 0), tops
+
+    def close(self):
+        """Flush buffered records and close store."""
+        with self._lock:
+            self._flush()
+            self._optimize()
+            self._conn.close()
+
+    @staticmethod
+    def _to_record(row):
+        """Create record from table row."""
+        record = ArchiveRecord(*row[:-1])
+        record.homepage_defacement = bool(record.homepage_defacement)
+        record.special = bool(record.special)
+        for archive in filter(None, row[-1].split(',')):
+            record.add_archive(archive)
+        return record
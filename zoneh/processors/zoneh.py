@@ -1,16 +1,143 @@
 """Processor module."""
 
+import json
 import logging
-from collections import deque
-from threading import Event
+from threading import Lock
 
-from zoneh.const import MAX_DEQUE_ITEMS
+from zoneh.clients.pool import IdentityPool
+from zoneh.const import (
+    ARCHIVE_TYPES, MAX_DEQUE_ITEMS, PUSH_QUEUE_SIZE, RECORD_DB_FILE,
+    SEEN_DB_FILE, EvictionPolicy
+)
+from zoneh.exceptions import ConfigError
+from zoneh.filters.engine import FilterEngine
+from zoneh.metrics import PUSH_QUEUE_DEPTH, RECORDS
+from zoneh.processors.seen import SeenMirrorStore, SeenRecords
+from zoneh.processors.store import RecordStore
+from zoneh.queues import PushQueue
+
+_SCRAPED = RECORDS.labels('scraped')
+_MATCHED = RECORDS.labels('matched')
 
 
 class ZonehProcessor:
-    def __init__(self):
-        """Class constructor."""
+    """Shared record processing state used by scraping engines."""
+
+    def __init__(self, conf):
+        """Class constructor.
+
+        `conf` is `zoneh` config section, it is passed on to scraping
+        engines.
+        """
         self._log = logging.getLogger(self.__class__.__name__)
-        self.push_queue = deque()
-        self.temp_queue = deque(maxlen=MAX_DEQUE_ITEMS)
-        self._processor_on = Event()
+        self.conf = conf
+        self.push_queue = PushQueue(
+            self.conf.get('push_queue_size', PUSH_QUEUE_SIZE))
+        PUSH_QUEUE_DEPTH.set_function(self.push_queue.__len__)
+        self.seen_records = self._create_seen_records()
+        self.seen_store = self._create_seen_store()
+        self.record_store = self._create_record_store()
+        self.arch_types = self._get_archive_types()
+        self.identities = IdentityPool.from_config(self.conf)
+        self.filter_engine = FilterEngine(self.conf['filters'],
+                                          self.conf.get('watchlists', {}))
+        self._lock = Lock()
+
+    def _create_seen_records(self):
+        """Create seen records index from config."""
+        conf = self.conf.get('seen_index', {})
+        return SeenRecords(
+            maxlen=conf.get('max_items', MAX_DEQUE_ITEMS),
+            secondary_key=conf.get('secondary_key'),
+            eviction=conf.get('eviction', EvictionPolicy.FIFO))
+
+    def _create_seen_store(self):
+        """Create persistent seen mirrors store if not disabled in config."""
+        path = self.conf.get('seen_db', SEEN_DB_FILE)
+        return SeenMirrorStore(path) if path else None
+
+    def _create_record_store(self):
+        """Create record store if not disabled in config."""
+        path = self.conf.get('record_db', RECORD_DB_FILE)
+        return RecordStore(path) if path else None
+
+    def _get_archive_types(self):
+        """Get list of archive types to crawl from config."""
+        arch_types = self.conf['archive']
+        if isinstance(arch_types, str):
+            arch_types = [arch_types]
+        unknown = set(arch_types) - set(ARCHIVE_TYPES)
+        if not arch_types or unknown:
+            err_msg = f'Invalid archive types {arch_types}, ' \
+                      f'choose from {list(ARCHIVE_TYPES)}'
+            self._log.error(err_msg)
+            raise ConfigError(err_msg)
+        return list(dict.fromkeys(arch_types))
+
+    def log_last_mirror_ids(self):
+        """Log last known mirror id of each archive."""
+        if self.seen_store:
+            for arch_type in self.arch_types:
+                self._log.info('Last known mirror id in "%s" archive: %s',
+                               arch_type,
+                               self.seen_store.last_mirror_id(arch_type))
+
+    def flush(self):
+        """Write records buffered by record store."""
+        if self.record_store:
+            self.record_store.flush()
+
+    def close(self):
+        """Flush buffered records and close record and seen mirrors
+        stores.
+        """
+        for store in (self.record_store, self.seen_store):
+            if store:
+                store.close()
+
+    def is_seen(self, record, arch_type):
+        """Check whether record was already processed in the archive,
+        even before restart.
+        """
+        known = self.seen_records.get(record)
+        if known is not None and arch_type in known.archives:
+            return True
+        return self.seen_store is not None and self.seen_store.contains(
+            arch_type, record.mirror)
+
+    def process_record(self, record, arch_type):
+        """Process pulled record.
+
+        Record which was already seen in another archive is not pushed
+        again, the known one is tagged with the archive instead.
+        """
+        _SCRAPED.inc()
+        if self._log.isEnabledFor(logging.DEBUG):
+            self._log.debug(json.dumps(record.to_dict()))
+        with self._lock:
+            known = self._get_known_record(record)
+            if known is not None:
+                known.add_archive(arch_type)
+            else:
+                record.add_archive(arch_type)
+                self.seen_records.add(record)
+            if self.seen_store:
+                self.seen_store.add(arch_type, record.mirror)
+        if self.record_store:
+            self.record_store.add(record if known is None else known)
+        if known is None and self.filter_engine.match(record):
+            _MATCHED.inc()
+            self.push_queue.put_record(record)
+
+    def _get_known_record(self, record):
+        """Return record if it was seen in any archive, even before restart."""
+        known = self.seen_records.get(record)
+        if known is not None or not self.seen_store:
+            return known
+        archives = self.seen_store.get_archives(record.mirror)
+        if not archives:
+            return None
+        for archive in archives:
+            record.add_archive(archive)
+        self.seen_records.add(record)
+        return record
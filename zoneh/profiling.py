@@ -0,0 +1,176 @@
+"""Profiling module.
+
+cProfile can't be attached to already running threads, so bot threads are
+profiled by sampling their stacks with `sys._current_frames()`. Samples
+are aggregated in cProfile stats format and can be loaded with `pstats`
+or viewed with tools like snakeviz, sample counts are shown as calls.
+"""
+
+import linecache
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from zoneh.const import PROFILE_INTERVAL, PROFILE_TOP, ThreadName
+
+# Stack top frames of threads blocked waiting for work. Such samples are
+# skipped, otherwise idle time dominates the report. Idle executor worker
+# blocks in C `SimpleQueue.get`, so its top Python frame is `_worker`.
+_IDLE_FRAMES = frozenset((('threading.py', 'wait'),
+                          ('threading.py', 'wait_for'),
+                          ('queue.py', 'get'),
+                          ('selectors.py', 'select'),
+                          ('thread.py', '_worker')))
+
+
+def get_bot_threads():
+    """Return scraping and delivery threads of the bot."""
+    return [thread for thread in threading.enumerate()
+            if thread.name.startswith(tuple(ThreadName.ALL))]
+
+
+def _func_key(code):
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _is_idle(frame):
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """Wall clock sampling profiler of a set of threads."""
+
+    def __init__(self, get_threads=get_bot_threads,
+                 interval=PROFILE_INTERVAL):
+        """Class constructor.
+
+        `get_threads` is called on every sample so threads started during
+        profiling, e.g. by executors, are sampled too.
+        """
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._get_threads = get_threads
+        self._interval = interval
+        self._self_time = {}
+        self._total_time = {}
+        self._callers = {}
+        self.samples = 0
+        self.idle_samples = 0
+        self.stats = {}
+
+    def run(self, seconds):
+        """Sample threads for given number of seconds."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self._sample()
+            time.sleep(self._interval)
+        self._log.info('Collected %d samples, %d idle', self.samples,
+                       self.idle_samples)
+        return self
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for thread in self._get_threads():
+            frame = frames.get(thread.ident)
+            if frame is None:
+                continue
+            if _is_idle(frame):
+                self.idle_samples += 1
+                continue
+            self.samples += 1
+            self._add_stack(frame)
+
+    def _add_stack(self, frame):
+        key = _func_key(frame.f_code)
+        self._self_time[key] = self._self_time.get(key, 0) + 1
+        seen = set()
+        while frame is not None:
+            # Recursive function is counted once per sample.
+            if key not in seen:
+                seen.add(key)
+                self._total_time[key] = self._total_time.get(key, 0) + 1
+            caller = frame.f_back
+            if caller is None:
+                break
+            caller_key = _func_key(caller.f_code)
+            callers = self._callers.setdefault(key, {})
+            callers[caller_key] = callers.get(caller_key, 0) + 1
+            frame, key = caller, caller_key
+
+    def create_stats(self):
+        """Build cProfile compatible stats, used by `pstats.Stats`."""
+        interval = self._interval
+        self.stats = {}
+        for key, total in self._total_time.items():
+            self_time = self._self_time.get(key, 0)
+            callers = {caller: (count, count, 0.0, count * interval)
+                       for caller, count in self._callers.get(key,
+                                                              {}).items()}
+            self.stats[key] = (total, total, self_time * interval,
+                               total * interval, callers)
+
+    def dump_stats(self):
+        """Return stats marshalled as `pstats` file content."""
+        self.create_stats()
+        return marshal.dumps(self.stats)
+
+    def format_report(self, limit=PROFILE_TOP):
+        """Return text report of the hottest functions by self and
+        cumulative time.
+        """
+        if not self.samples:
+            return f'No busy samples ({self.idle_samples} idle)'
+        lines = [f'{self.samples} samples, {self.idle_samples} idle, '
+                 f'{self._interval * 1000:g} ms interval']
+        for title, counts in (('Self time', self._self_time),
+                              ('Cumulative time', self._total_time)):
+            lines.append(f'\n{title}:')
+            # Thread bootstrap frames are in every stack.
+            top = sorted(((key, count) for key, count in counts.items()
+                          if key[0] != threading.__file__),
+                         key=lambda item: item[1], reverse=True)[:limit]
+            for (filename, lineno, name), count in top:
+                lines.append(f'{count / self.samples:6.1%} {name} '
+                             f'({os.path.basename(filename)}:{lineno})')
+        return '\n'.join(lines)
+
+
+def trace_memory(seconds):
+    """Return tracemalloc snapshot.
+
+    When tracemalloc isn't already tracing (e.g. with PYTHONTRACEMALLOC),
+    it is started for `seconds` so snapshot holds allocations made during
+    that window and still alive, and stopped afterwards.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.take_snapshot()
+    tracemalloc.start()
+    try:
+        time.sleep(seconds)
+        return tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+
+def format_memory_report(snapshot, limit=PROFILE_TOP):
+    """Return text report of the top allocations by source line."""
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+    stats = snapshot.statistics('lineno')
+    total = sum(stat.size for stat in stats)
+    lines = [f'Traced: {total / 1024:.1f} KiB in '
+             f'{sum(stat.count for stat in stats)} blocks']
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        lines.append(f'{stat.size / 1024:8.1f} KiB {stat.count:6} '
+                     f'{os.path.basename(frame.filename)}:{frame.lineno} '
+                     f'{source[:60]}')
+    return '\n'.join(lines)
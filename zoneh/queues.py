@@ -0,0 +1,91 @@
+"""Queues module."""
+
+import time
+from collections import deque, namedtuple
+from threading import Condition
+
+from zoneh.const import PushItemType
+
+PushItem = namedtuple('PushItem', ('type', 'enqueued', 'payload'))
+
+
+class PushQueue:
+    """Bounded blocking queue handing records over from processor to pusher.
+
+    Consumer is woken up on put instead of polling. Captcha notifications
+    jump the queue and ignore the bound. Closing the queue wakes up all
+    blocked producers and consumers.
+    """
+
+    def __init__(self, maxsize):
+        """Class constructor."""
+        self._items = deque()
+        self._maxsize = maxsize
+        self._cond = Condition()
+        self._closed = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} items:{len(self._items)} ' \
+               f'maxsize:{self._maxsize} closed:{self._closed}>'
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put_record(self, record):
+        """Put record, block while queue is full.
+
+        Return False if queue was closed and record was dropped.
+        """
+        with self._cond:
+            while len(self._items) >= self._maxsize and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return False
+            self._items.append(
+                PushItem(PushItemType.RECORD, time.monotonic(), record))
+            self._cond.notify_all()
+            return True
+
+    def put_captcha(self):
+        """Notify consumer that captcha needs to be sent."""
+        with self._cond:
+            self._items.appendleft(
+                PushItem(PushItemType.CAPTCHA, time.monotonic(), None))
+            self._cond.notify_all()
+
+    def put_back(self, items):
+        """Return items taken with `get_all()` to the head of the queue,
+        e.g. after failed delivery. The bound is ignored.
+        """
+        with self._cond:
+            self._items.extendleft(reversed(items))
+            self._cond.notify_all()
+
+    def get_all(self, timeout=None):
+        """Block until queue is not empty and take all its items.
+
+        Return empty list on timeout or when queue is closed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed,
+                                       timeout) or self._closed:
+                return []
+            items = list(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+            return items
+
+    def close(self):
+        """Close queue waking up everyone blocked on it."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        """Reopen closed queue for the next run."""
+        with self._cond:
+            self._closed = False
@@ -0,0 +1,117 @@
+"""Rate limiting module."""
+
+import asyncio
+import logging
+import time
+from threading import Lock
+
+from zoneh.utils import shallow_sleep
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Tokens are refilled continuously at `rate` tokens per second up to
+    `capacity`. Time spent in the request itself counts towards refill.
+    """
+
+    def __init__(self, rate, capacity=1):
+        """Class constructor."""
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._lock = Lock()
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} rate:{self._rate:.4f}/s>'
+
+    @property
+    def rate(self):
+        """Current rate in tokens per second."""
+        return self._rate
+
+    def acquire(self):
+        """Block until token is available and take it."""
+        wait = self.reserve()
+        while wait:
+            shallow_sleep(wait)
+            wait = self.reserve()
+
+    async def acquire_async(self):
+        """Wait in event loop until token is available and take it."""
+        wait = self.reserve()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self.reserve()
+
+    def reserve(self):
+        """Take token if available, otherwise return seconds to wait."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self._rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """Token bucket with AIMD rate control.
+
+    Rate grows additively while responses are clean and is cut
+    multiplicatively when Zone-H answers with captcha or pre-login page.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, increase, decrease,
+                 capacity=1):
+        """Class constructor."""
+        super().__init__(rate, capacity)
+        self._min_rate = float(min_rate)
+        self._max_rate = float(max_rate)
+        self._increase = float(increase)
+        self._decrease = float(decrease)
+
+    def on_success(self):
+        """Slowly speed up after clean response."""
+        with self._lock:
+            self._refill()
+            self._rate = min(self._max_rate, self._rate + self._increase)
+
+    def on_penalty(self):
+        """Back off sharply after captcha, pre-login page or error."""
+        with self._lock:
+            self._refill()
+            self._rate = max(self._min_rate, self._rate * self._decrease)
+            self._tokens = min(self._tokens, 0.0)
+        self._log.info('Backing off, rate is %.4f requests/s (one per %.1fs)',
+                       self._rate, 1 / self._rate)
+
+
+class TelegramRateLimiter:
+    """Pace outgoing Telegram messages with per-chat and global buckets.
+
+    Limiter is owned by the pusher sending the messages.
+    """
+
+    def __init__(self, chat_rate, global_rate):
+        """Class constructor."""
+        self._lock = Lock()
+        self._chat_rate = chat_rate
+        self._chats = {}
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+
+    def acquire(self, chat_id):
+        """Block until message can be sent to the chat."""
+        with self._lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = self._chats[chat_id] = TokenBucket(self._chat_rate)
+        bucket.acquire()
+        self._global.acquire()
@@ -2,65 +2,181 @@
 
 import logging
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import zoneh.exceptions as exc
-from zoneh.captcha import captcha
-from zoneh.clients.zoneh import ZoneHAPI
-from zoneh.conf import get_config
-from zoneh.const import START_PAGE
+from zoneh.const import MIRROR_WORKERS, START_PAGE, PageType, ThreadName
 from zoneh.managers.captcha import captcha_manager
+from zoneh.metrics import PAGE_PARSE_DURATION
 from zoneh.parsers.htmlparser import HTMLParser
-from zoneh.utils import get_lock, shallow_sleep, sleep_time
+from zoneh.utils import shallow_sleep
 
 _log = logging.getLogger(__name__)
-_CONF = get_config()
+_ARCHIVE_PARSE = PAGE_PARSE_DURATION.labels('archive')
+_MIRROR_PARSE = PAGE_PARSE_DURATION.labels('mirror')
+
+
+def needs_mirror_data(record, filter_engine):
+    """Check whether mirror page data is needed to filter record.
+
+    IP address is known only from mirror page, full URL is needed only for
+    truncated record URLs.
+    """
+    if filter_engine.needs_ip:
+        return True
+    url = record.defaced_url
+    return all([filter_engine.needs_url, '...' in url, '/' not in url])
+
+
+def apply_mirror_data(record, data):
+    """Update record with full URL and IP address from mirror page."""
+    record.defaced_url = data['defaced_url_full']
+    record.ip = data['ip']
+    return record
 
 
 class Scraper:
-    """Zone-H Website Scraper class."""
-
-    def __init__(self):
-        """Class constructor."""
-        self._api = ZoneHAPI()
-        self._parser = HTMLParser()
-        self._lock = get_lock()
-
-    def get_archive(self, type_, start=None):
-        """Get archive from Zone-H by given archive type."""
-        domains = _CONF['zoneh']['filters']['domains']
-        self._api.init_cookies()
-        page_queue = deque([start or START_PAGE])
-        while page_queue:
-            page_num = page_queue.pop()
-            html_page = self._api.get_page(page_num, type_)
-            next_page = None
+    """Zone-H Website Scraper class.
+
+    Archive and mirror pages are fetched with identities from the pool.
+    Identity hitting captcha is quarantined and the page is refetched
+    with another one.
+    """
+
+    def __init__(self, conf, pool, filter_engine):
+        """Class constructor.
+
+        `conf` is `zoneh` config section. `filter_engine` of the processor
+        tells which records need mirror page data.
+        """
+        self._pool = pool
+        self._parser = HTMLParser.from_config(conf)
+        self._filter = filter_engine
+        self._workers = conf.get('mirror_workers', MIRROR_WORKERS)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix=ThreadName.MIRROR)
+
+    def get_archive(self, type_, start=None, is_known=None):
+        """Get archive from Zone-H by given archive type.
+
+        `is_known` predicate marks record at which the caller stops
+        consuming, records starting from it are not enriched. Fetched
+        pages are saved in page cache only when the crawl reaches known
+        record or the end, so failed crawl is repeated in full.
+        """
+        page_num = start or START_PAGE
+        attempt = 0
+        fetched = []
+        while page_num:
+            with self._pool.acquire() as api:
+                url = api.page_url(page_num, type_)
+                html_page = api.get_page(page_num, type_)
+                if html_page and html_page.type in PageType.CHALLENGES:
+                    attempt += 1
+                    self._resolve_challenge(api, html_page.type,
+                                            (type_, page_num), attempt)
+                    continue
+            if html_page is None:
+                _log.info('Page %s of "%s" archive is unchanged, stop '
+                          'paging. %r', page_num, type_, self._pool.page_cache)
+                break
+            if html_page.type == PageType.UNKNOWN:
+                err_msg = f'Unknown page {page_num} of "{type_}" archive'
+                _log.error(err_msg)
+                raise exc.ScraperError(err_msg)
+
+            attempt = 0
+            fetched.append(url)
+            page = (type_, page_num)
             try:
-                for record, next_page in self._parser.get_records(html_page):
-                    url = record['defaced_url']
-                    if all([domains, '...' in url, '/' not in url]):
-                        data = self._get_advanced_data(record['mirror'])
-                        record['defaced_url'] = data['defaced_url_full']
-                        shallow_sleep(sleep_time())
+                with _ARCHIVE_PARSE.time():
+                    rows = list(self._parser.get_records(html_page.text))
+                page_num = rows[-1][1] if rows else None
+                for record in self._enrich_records(
+                        (record for record, _ in rows), is_known, page):
+                    if is_known and is_known(record):
+                        # Caller stops at it, records before are processed.
+                        self._pool.page_cache.save(fetched)
                     yield record
-            except exc.HTMLParserCaptchaRequest:
-                captcha_manager.init_captcha(type_, page_num)
-                while captcha.is_active:
-                    shallow_sleep(1)
-                yield from self.get_archive(type_, page_num)
-            except exc.HTMLParserCookiesError:
-                self._api.init_cookies(force=True)
-                shallow_sleep(2)
-                yield from self.get_archive(type_, page_num)
+            except exc.CaptchaError:
+                raise
             except Exception:
                 err_msg = 'Exception during getting record'
                 _log.exception(err_msg)
                 raise exc.ScraperError(err_msg)
+        self._pool.page_cache.save(fetched)
+
+    def _resolve_challenge(self, api, page_type, page, attempt):
+        """Request captcha quarantining the identity or renew its cookies
+        before refetching challenged page.
+        """
+        if attempt > self._pool.max_attempts:
+            err_msg = f'Page {page} is still challenged after ' \
+                      f'{self._pool.max_attempts} attempts'
+            _log.error(err_msg)
+            raise exc.ScraperError(err_msg)
+        if page_type == PageType.CAPTCHA:
+            _log.warning('Captcha request for %r', api)
+            captcha_manager.request(api, *page)
+        else:
+            _log.error('Pre-login page for %r. Need to set cookies', api)
+            api.init_cookies(force=True)
+            shallow_sleep(2)
+
+    def _enrich_records(self, records, is_known, page):
+        """Yield records in original order fetching mirror data concurrently.
+
+        At most `mirror_workers` mirror pages are fetched ahead of the
+        consumer to bound the number of in-flight requests.
+        """
+        window = deque()
+        in_flight = 0
+        stop_enriching = False
+        try:
+            for record in records:
+                if is_known and not stop_enriching and is_known(record):
+                    stop_enriching = True
+                future = None
+                if not stop_enriching and needs_mirror_data(record,
+                                                            self._filter):
+                    future = self._executor.submit(self._get_advanced_data,
+                                                   record.mirror, page)
+                    in_flight += 1
+                window.append((record, future))
+                while window and (window[0][1] is None or
+                                  in_flight >= self._workers):
+                    record, future = window.popleft()
+                    if future:
+                        in_flight -= 1
+                    yield self._apply_mirror_data(record, future)
+            while window:
+                yield self._apply_mirror_data(*window.popleft())
+        finally:
+            for _, future in window:
+                if future:
+                    future.cancel()
+
+    @staticmethod
+    def _apply_mirror_data(record, future):
+        """Update record with data from fetched mirror page."""
+        if future:
+            apply_mirror_data(record, future.result())
+        return record
 
-            if next_page:
-                page_queue.appendleft(next_page)
-            shallow_sleep(sleep_time())
+    def _get_advanced_data(self, mirror_id, page):
+        """Get advanced data from Zone-H mirror page.
 
-    def _get_advanced_data(self, mirror_id):
-        """Get advanced data from Zone-H mirror page."""
-        text = self._api.get_mirror_page(mirror_id)
-        return self._parser.get_advanced_data(text)
+        Captcha on mirror page is solved for the archive `page` the record
+        was found on.
+        """
+        attempt = 0
+        while True:
+            with self._pool.acquire() as api:
+                mirror_page = api.get_mirror_page(mirror_id)
+                if mirror_page.type in PageType.CHALLENGES:
+                    attempt += 1
+                    self._resolve_challenge(api, mirror_page.type, page,
+                                            attempt)
+                    continue
+            with _MIRROR_PARSE.time():
+                return self._parser.get_advanced_data(mirror_page.text)
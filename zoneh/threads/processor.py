@@ -1,63 +1,70 @@
 """Processor threads module."""
 
-import json
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from zoneh.commons import CommonThread
-from zoneh.conf import get_config
-from zoneh.filters.engine import FilterEngine
+from zoneh.const import ThreadName
+from zoneh.managers.captcha import captcha_manager
 from zoneh.scraper import Scraper
-from zoneh.utils import shallow_sleep
-
-CONF = get_config()
 
 
 class ProcessorThread(CommonThread):
-    """Processor Thread Class."""
+    """Processor Thread Class.
+
+    Crawls all configured archive types concurrently sharing one scraper
+    and one seen records index.
+    """
 
-    def __init__(self, push_queue, temp_queue):
+    def __init__(self, processor):
         """Class constructor."""
-        super().__init__()
+        super().__init__(name=ThreadName.PROCESSOR)
         self._log = logging.getLogger(self.__class__.__name__)
-        self._push_queue = push_queue
-        self._temp_queue = temp_queue
-        self._scraper = Scraper()
-        self._filter = FilterEngine()
-        self._arch_type = CONF['zoneh']['archive']
-        self._rescan_period = CONF['zoneh']['rescan_period']
+        self._processor = processor
+        self._scraper = Scraper(processor.conf, processor.identities,
+                                processor.filter_engine)
+        self._arch_types = processor.arch_types
+        self._rescan_period = processor.conf['rescan_period']
+
+    def stop(self):
+        """Wake up archive crawls waiting for captcha."""
+        captcha_manager.interrupt()
 
     def _run(self):
         """Real thread run method."""
-        while self._run_trigger.is_set():
+        self._processor.log_last_mirror_ids()
+        with ThreadPoolExecutor(max_workers=len(self._arch_types),
+                                thread_name_prefix=ThreadName.ARCHIVE) as pool:
+            while self._run_trigger.is_set():
+                futures = {arch_type: pool.submit(self._pull_records,
+                                                  arch_type)
+                           for arch_type in self._arch_types}
+                is_ok = self._wait_archives(futures)
+                self._processor.flush()
+                if not is_ok:
+                    self._take_a_nap(2)
+                    continue
+                self._take_a_nap(self._rescan_period)
+
+    def _wait_archives(self, futures):
+        """Wait for archives crawl, return False if any of them failed."""
+        is_ok = True
+        for arch_type, future in futures.items():
             try:
-                self._pull_records()
+                future.result()
             except Exception:
-                err_msg = 'Processor thread received error ' \
-                          'during handling scrape records'
-                self._log.exception(err_msg)
-                shallow_sleep(2)
-                continue
-            self._take_a_nap()
-
-    def _pull_records(self):
+                err_msg = 'Processor thread received error during ' \
+                          'handling scrape records of "%s" archive'
+                self._log.exception(err_msg, arch_type)
+                is_ok = False
+        return is_ok
+
+    def _pull_records(self, arch_type):
         """Pull records."""
-        for record in self._scraper.get_archive(type_=self._arch_type):
-            if not self._run_trigger.is_set() or record in self._temp_queue:
-                break
-            self._process_record(record)
-
-    def _process_record(self, record):
-        """Process pulled record."""
-        self._log.debug(json.dumps(record))
-        self._temp_queue.appendleft(record)
-        if self._filter.match(record):
-            self._push_queue.appendleft(record)
-
-    def _take_a_nap(self):
-        """Thread sleep."""
-        time_delta = int(time.time()) + self._rescan_period
-        while int(time.time()) < time_delta:
-            if not self._run_trigger.is_set():
+        is_seen = partial(self._processor.is_seen, arch_type=arch_type)
+        for record in self._scraper.get_archive(type_=arch_type,
+                                                is_known=is_seen):
+            if not self._run_trigger.is_set() or is_seen(record):
                 break
-            shallow_sleep(0.5)
+            self._processor.process_record(record, arch_type)
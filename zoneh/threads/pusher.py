@@ -1,61 +1,252 @@
 """Pusher threads module."""
 
 import logging
+import time
+from collections import deque
+from itertools import chain
 
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import BadRequest, NetworkError, RetryAfter
 
-from zoneh.captcha import captcha
 from zoneh.commons import CommonThread
-from zoneh.conf import get_config
-from zoneh.parsers.formatter import FormattedRecord
-from zoneh.utils import shallow_sleep, get_lock
+from zoneh.const import (
+    DELIVERY, TELEGRAM_MAX_MSG_LEN, PushItemType, ThreadName
+)
+from zoneh.managers.captcha import captcha_manager
+from zoneh.metrics import (
+    RECORDS, TELEGRAM_FLOOD_WAITS, TELEGRAM_SEND_DURATION
+)
+from zoneh.parsers.formatter import DigestRecord, FormattedRecord
+from zoneh.ratelimit import TelegramRateLimiter
+from zoneh.utils import shallow_sleep
 
-CONF = get_config()
+_PUSHED = RECORDS.labels('pushed')
+_DROPPED = RECORDS.labels('dropped')
+_SEND_MESSAGE = TELEGRAM_SEND_DURATION.labels('message')
+_SEND_PHOTO = TELEGRAM_SEND_DURATION.labels('photo')
 
 
-class PusherThread(CommonThread):
-    """Pusher Thread Class."""
+def pack_messages(items, get_text=str, sep='\n',
+                  max_len=TELEGRAM_MAX_MSG_LEN, max_items=None):
+    """Pack items into as few messages as possible.
+
+    Yield lists of items, texts of each list joined with `sep` fit into
+    `max_len`. Item with text longer than `max_len` is yielded alone.
+    """
+    chunk = []
+    chunk_len = 0
+    for item in items:
+        text_len = len(get_text(item))
+        new_len = chunk_len + len(sep) + text_len if chunk else text_len
+        if chunk and (new_len > max_len or len(chunk) == max_items):
+            yield chunk
+            chunk = []
+            new_len = text_len
+        chunk.append(item)
+        chunk_len = new_len
+    if chunk:
+        yield chunk
+
+
+class DeliveryStats:
+    """Delivery throughput and queue lag counters."""
 
-    def __init__(self, push_queue, update):
+    def __init__(self):
         """Class constructor."""
-        super().__init__()
+        self.records = 0
+        self.messages = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._send_time = 0.0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} records:{self.records} ' \
+               f'messages:{self.messages} ' \
+               f'throughput:{self.throughput:.2f} rec/s ' \
+               f'lag:{self.last_lag:.1f}s max lag:{self.max_lag:.1f}s>'
+
+    @property
+    def throughput(self):
+        """Records delivered per second spent on sending."""
+        return self.records / self._send_time if self._send_time else 0.0
+
+    def add(self, enqueued, send_time):
+        """Account delivered message with records enqueued at given times."""
+        self.records += len(enqueued)
+        self.messages += 1
+        self._send_time += send_time
+        self.last_lag = time.monotonic() - min(enqueued)
+        self.max_lag = max(self.max_lag, self.last_lag)
+
+
+class Pusher:
+    """Send captcha and pulled records to the telegram chat."""
+
+    def __init__(self, conf, push_queue, update):
+        """Class constructor.
+
+        `conf` is `zoneh` config section.
+        """
         self._log = logging.getLogger(self.__class__.__name__)
         self._update = update
-        self._lock = get_lock()
         self._push_queue = push_queue
+        self._rec_num = 0
+
+        conf = dict(DELIVERY, **conf.get('delivery', {}))
+        self._batch_size = conf['batch_size']
+        self._digest_threshold = conf['digest_threshold']
+        self._limiter = TelegramRateLimiter(conf['chat_rate'],
+                                            conf['global_rate'])
+        self.stats = DeliveryStats()
+
+    def stop(self):
+        """Stop pushing by closing push queue."""
+        self._push_queue.close()
+
+    def push_pending(self, timeout=None):
+        """Wait for captcha or records in push queue and send them.
+
+        Return False when push queue is closed. On network error records
+        which were not sent are put back to the queue and error is raised,
+        records Telegram rejects are dropped.
+        """
+        items = self._push_queue.get_all(timeout)
+        if self._push_queue.closed:
+            return False
+
+        records = [item for item in items
+                   if item.type == PushItemType.RECORD]
+        if len(records) != len(items):
+            try:
+                self._send_captcha()
+            except Exception:
+                self._push_queue.put_back(records)
+                self._push_queue.put_captcha()
+                raise
+        if records:
+            self._push_records(records)
+            self._log.info('Push queue drained: %r', self.stats)
+        return True
+
+    def _push_records(self, items):
+        """Format and send records.
+
+        Backed up queue is sent as one-line digest to catch up. Message
+        rejected by Telegram is resent record by record and the rejected
+        record is dropped, so it doesn't block the queue.
+        """
+        is_digest = len(items) > self._digest_threshold
+        formatter = DigestRecord if is_digest else FormattedRecord
+        batch_size = None if is_digest else self._batch_size
+
+        formatted = []
+        for item in items:
+            self._rec_num += 1
+            formatted.append((item, formatter(item.payload, self._rec_num)))
+
+        sep = '\n' if is_digest else '\n\n'
+        chunks = deque(pack_messages(
+            formatted, get_text=lambda item: item[1].data, sep=sep,
+            max_items=batch_size))
+        while chunks:
+            chunk = chunks.popleft()
+            try:
+                self._send_records(chunk, sep)
+            except BadRequest as err:
+                if len(chunk) > 1:
+                    self._log.warning('Telegram rejected %d records, '
+                                      'sending them one by one: %s',
+                                      len(chunk), err)
+                    chunks.extendleft([item] for item in reversed(chunk))
+                    continue
+                self._log.error('Telegram rejected record, dropping it: '
+                                '%s\n%s', err, chunk[0][1].data)
+                _DROPPED.inc()
+            except NetworkError:
+                unsent = [item for rest in chain([chunk], chunks)
+                          for item, _ in rest]
+                self._rec_num -= len(unsent)
+                self._push_queue.put_back(unsent)
+                self._log.error('Failed to send records, %d records are '
+                                'put back to push queue', len(unsent))
+                raise
+            except Exception:
+                self._log.exception('Failed to send records, dropping %d '
+                                    'records', len(chunk))
+                _DROPPED.inc(len(chunk))
+
+    def _send_records(self, items, sep):
+        """Send formatted records as one message.
+
+        Single record gets inline button to open its mirror.
+        """
+        reply_markup = None
+        if len(items) == 1 and isinstance(items[0][1], FormattedRecord):
+            keyboard = [[InlineKeyboardButton(
+                'Open mirror', url=items[0][1].mirror)]]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+        text = sep.join(rec.data for _, rec in items)
+
+        start = time.monotonic()
+        self._send(text, reply_markup, disable_web_page_preview=True)
+        send_time = time.monotonic() - start
+        self.stats.add([item.enqueued for item, _ in items], send_time)
+        _SEND_MESSAGE.observe(send_time)
+        _PUSHED.inc(len(items))
+
+    def _send(self, text, reply_markup, **kwargs):
+        """Send message respecting Telegram rate limits.
+
+        Message is resent until Telegram flood control lets it through or
+        push queue is closed.
+        """
+        while True:
+            self._limiter.acquire(self._update.message.chat_id)
+            try:
+                return self._update.message.reply_html(
+                    text, reply_markup=reply_markup, **kwargs)
+            except RetryAfter as err:
+                if self._push_queue.closed:
+                    raise
+                TELEGRAM_FLOOD_WAITS.inc()
+                self._log.warning('Telegram flood control, retry in %ss',
+                                  err.retry_after)
+                shallow_sleep(err.retry_after)
+
+    def _send_captcha(self):
+        """Send pending captcha images to the telegram chat."""
+        for captcha in captcha_manager.take_unsent():
+            self._log.info('Sending captcha image to telegram: %r', captcha)
+            try:
+                with _SEND_PHOTO.time():
+                    self._limiter.acquire(self._update.message.chat_id)
+                    message = self._update.message.reply_photo(
+                        photo=captcha.image, caption=captcha.caption)
+            except Exception:
+                captcha_manager.mark_unsent(captcha)
+                raise
+            captcha_manager.mark_sent(captcha, message.message_id)
+
+
+class PusherThread(CommonThread):
+    """Pusher Thread Class."""
+
+    def __init__(self, pusher):
+        """Class constructor."""
+        super().__init__(name=ThreadName.PUSHER)
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._pusher = pusher
+
+    def stop(self):
+        """Wake up pusher waiting for records."""
+        self._pusher.stop()
 
     def _run(self):
         """Real thread run method."""
-        rec_num = 0
         while self._run_trigger.is_set():
-            with self._lock:
-                self._log.debug('Captcha is active: %s', captcha.is_active)
-                self._log.debug('Captcha is sent: %s', captcha.is_sent)
-                if captcha.is_active and not captcha.is_sent:
-                    self._send_captcha(self._update)
-
-                while self._push_queue:
-                    try:
-                        record = self._push_queue.pop()
-                    except IndexError:
-                        pass
-
-                    rec_num += 1
-                    self._process_record(record, rec_num)
-                    shallow_sleep(1)
-            shallow_sleep(1)
-
-    def _send_captcha(self, update):
-        """Send captcha image to the telegram chat."""
-        self._log.info('Sending captcha image to telegram')
-        update.message.reply_photo(photo=captcha.image, caption=captcha.caption)
-        captcha.is_sent = True
-
-    def _process_record(self, record, rec_num):
-        """Process and send record."""
-        rec_formatted = FormattedRecord(record, rec_num)
-        keyboard = [[InlineKeyboardButton(
-            'Open mirror', url=rec_formatted.mirror)]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        self._update.message.reply_html(rec_formatted.data,
-                                        reply_markup=reply_markup)
+            try:
+                if not self._pusher.push_pending():
+                    break
+            except Exception:
+                self._log.exception('Pusher thread received error')
+                self._take_a_nap(1)
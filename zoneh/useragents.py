@@ -0,0 +1,76 @@
+"""Bundled User-Agent pool module.
+
+Desktop browser User-Agents weighted by rough market share. Bump
+`VERSION` when the list is updated.
+"""
+
+import random
+from array import array
+from bisect import bisect
+from itertools import accumulate
+
+VERSION = '2024.06'
+
+USER_AGENTS = (
+    (30, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+         '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'),
+    (14, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+         '(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'),
+    (9, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'),
+    (4, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'),
+    (3, 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'),
+    (9, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 Edg/126.0.0.0'),
+    (3, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36 Edg/125.0.0.0'),
+    (5, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) '
+        'Gecko/20100101 Firefox/127.0'),
+    (2, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:126.0) '
+        'Gecko/20100101 Firefox/126.0'),
+    (1, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:115.0) '
+        'Gecko/20100101 Firefox/115.0'),
+    (2, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:127.0) '
+        'Gecko/20100101 Firefox/127.0'),
+    (2, 'Mozilla/5.0 (X11; Linux x86_64; rv:127.0) '
+        'Gecko/20100101 Firefox/127.0'),
+    (1, 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:126.0) '
+        'Gecko/20100101 Firefox/126.0'),
+    (7, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
+        'AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 '
+        'Safari/605.1.15'),
+    (3, 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
+        'AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 '
+        'Safari/605.1.15'),
+    (2, 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36 '
+        'OPR/111.0.0.0'),
+)
+
+
+class UserAgentPool:
+    """Weighted User-Agent pool.
+
+    Agents and cumulative weights are kept in flat sequences, choice is a
+    binary search over weights and a tuple index.
+    """
+
+    def __init__(self, agents=USER_AGENTS):
+        """Class constructor."""
+        weights, self._agents = zip(*agents)
+        self._cum_weights = array('d', accumulate(weights))
+        self._total = self._cum_weights[-1]
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} version:{VERSION} ' \
+               f'agents:{len(self)}>'
+
+    def choice(self):
+        """Return random User-Agent according to weights."""
+        return self._agents[bisect(self._cum_weights,
+                                   random.random() * self._total)]
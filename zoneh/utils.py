@@ -4,13 +4,8 @@ import inspect
 import logging
 import secrets
 import time
-from threading import Lock
-
-from fake_useragent import UserAgent
 
 _log = logging.getLogger(__name__)
-_UA = UserAgent(cache=True)
-_LOCK = Lock()
 
 
 class Singleton(type):
@@ -37,35 +32,18 @@ def make_bold(text):
     return f'<b>{text}</b>'
 
 
-def get_func_name():
-    """Get function name."""
-    curframe = inspect.currentframe()
-    calframe = inspect.getouterframes(curframe, 2)
-    return calframe[1][3]
-
-
 def get_captcha_number():
     """Get random number for captcha URL."""
     return secrets.choice(range(1, 1001))
 
 
-def sleep_time():
-    """Lowering the values increases the risk of getting perm banned
-    by Zone-H's anti-DDoS logic.
-    """
-    return secrets.choice(range(7, 12))
-
-
 def is_generator(func):
     """Check whether object is generator."""
     return inspect.isgeneratorfunction(func)
 
 
-def get_random_ua():
-    """Get random User-Agent."""
-    return _UA.random
-
-
-def get_lock():
-    """Get thread lock."""
-    return _LOCK
+def get_domain(url):
+    """Get lowercased host name from defaced URL."""
+    host = url.split('://', 1)[-1].split('/', 1)[0].split(':', 1)[0]
+    # Zone-H truncates long URLs with '...'.
+    return host.rstrip('.').lower()
@@ -1,42 +1,49 @@
 """Zone-H module."""
 
 import logging
-from threading import Event, Thread
+from io import BytesIO
+from threading import Lock, Thread
 
 from telegram import Bot
 from telegram.utils.request import Request
 
 import zoneh.exceptions as exc
-from zoneh.captcha import captcha
-from zoneh.conf import get_config
+from zoneh.args import parse_seconds
+from zoneh.const import (
+    MEM_TRACE_SECONDS, PROFILE_FILENAME, PROFILE_MAX_SECONDS, PROFILE_SECONDS,
+    TELEGRAM_MAX_MSG_LEN, THREAD_STOP_TIMEOUT, Engine
+)
 from zoneh.decorators import authorization_check
 from zoneh.managers.captcha import captcha_manager
 from zoneh.managers.thread import ThreadManager
-from zoneh.processors.csv import CsvProcessor
+from zoneh.parsers.formatter import DigestRecord
+from zoneh.processors.export import ExportOptions, RecordExporter
+from zoneh.processors.store import SearchQuery
 from zoneh.processors.zoneh import ZonehProcessor
+from zoneh.profiling import (
+    SamplingProfiler, format_memory_report, get_bot_threads, trace_memory
+)
 from zoneh.threads.processor import ProcessorThread
-from zoneh.threads.pusher import PusherThread
-from zoneh.utils import get_lock
-
-_CONF = get_config()
+from zoneh.threads.pusher import Pusher, PusherThread, pack_messages
 
 
 class ZoneHBot(Bot):
     """Class where main bot things are done."""
 
-    def __init__(self, stop_polling):
+    def __init__(self, conf, stop_polling):
         """Class constructor."""
-        token = _CONF['telegram']['token']
+        token = conf['telegram']['token']
         super().__init__(token, request=(Request(con_pool_size=10)))
         self._log = logging.getLogger(self.__class__.__name__)
-        self._user_ids = _CONF['telegram']['allowed_user_ids']
+        self._conf = conf
+        self._user_ids = conf['telegram']['allowed_user_ids']
         self._stop_polling = stop_polling
         self._log.info('Initializing %s bot', self.first_name)
 
-        self._pusher_on = Event()
-        self._processor = ZonehProcessor()
-        self._lock = get_lock()
+        self._processor = ZonehProcessor(conf['zoneh'])
+        captcha_manager.subscribe(self._processor.push_queue.put_captcha)
         self._thread_manager = ThreadManager([])
+        self._profile_lock = Lock()
 
     def send_welcome_message(self):
         """Send welcome message after bot launch."""
@@ -47,6 +54,15 @@ class ZoneHBot(Bot):
                                        f'see /help for available commands '
                                        f'or /run')
 
+    def shutdown(self):
+        """Stop threads, wait for them and close record stores."""
+        self._thread_manager.stop_threads()
+        if not self._thread_manager.join_threads(THREAD_STOP_TIMEOUT):
+            self._log.warning('Threads are still running after %ss',
+                              THREAD_STOP_TIMEOUT)
+        self._processor.close()
+        self._log.info('Record stores closed')
+
     @authorization_check
     def cmds(self, update):
         """Print bot commands."""
@@ -82,40 +98,183 @@ class ZoneHBot(Bot):
         """Send help message to telegram chat."""
         self._log.info('Help message has been requested')
         self._log.debug(self._get_user_info(update))
-        update.message.reply_text('Use /run to run data gathering\n'
-                                  'Use /stop command to fully stop the bot')
+        update.message.reply_text(
+            'Use /run to run data gathering\n'
+            'Use /csv [format=csv|jsonl] [compress=none|gzip|zip] '
+            '[from=YYYY-MM-DD] [to=YYYY-MM-DD] [country=FR,BR] '
+            '[notifier=name] to export gathered records\n'
+            'Use /search [notifier=name] [country=BR] [domain=.go.id] '
+            '[from=YYYY-MM-DD] [to=YYYY-MM-DD] [mirror=id] [limit=N] '
+            'to search stored records\n'
+            'Use /stats to show stored records statistics\n'
+            'Use /profile [seconds] to profile scraping and delivery\n'
+            'Use /mem [seconds] to show top memory allocations\n'
+            'Use /stop command to fully stop the bot')
         self._log.info('Help message has been sent')
 
     @authorization_check
     def make_csv(self, update):
-        """Make csv from all gathered records during bot run."""
-        with self._lock:
-            csv_ = CsvProcessor()
-            for rec in self._processor.temp_queue:
-                csv_.write(rec)
+        """Export gathered records during bot run in background thread.
+
+        Command arguments: `format=csv|jsonl compress=none|gzip|zip
+        from=YYYY-MM-DD to=YYYY-MM-DD country=FR,BR notifier=name`.
+        """
+        try:
+            options = ExportOptions.from_text(update.message.text)
+        except exc.CommandArgsError as err:
+            update.message.reply_text(str(err))
+            return
+        thread = Thread(target=self._export, args=(update, options),
+                        name='Export thread')
+        thread.start()
+
+    def _export(self, update, options):
+        """Export records and send them as document."""
+        try:
+            data, count = RecordExporter(options).export(
+                self._processor.seen_records)
+        except Exception:
+            err_msg = 'Failed to export records'
+            self._log.exception(err_msg)
+            update.message.reply_text(err_msg)
+            return
+        with data:
+            self.send_document(chat_id=update.message.chat.id,
+                               document=data,
+                               caption=f'{count} records',
+                               filename=options.filename)
+
+    @authorization_check
+    def cmd_search(self, update):
+        """Search records in record store."""
+        if not self._processor.record_store:
+            update.message.reply_text('Record store is disabled')
+            return
+        try:
+            query = SearchQuery.from_text(update.message.text)
+        except exc.CommandArgsError as err:
+            update.message.reply_text(str(err))
+            return
+        records = self._processor.record_store.search(query)
+        if not records:
+            update.message.reply_text('Nothing found')
+            return
+        lines = [DigestRecord(rec, num).data
+                 for num, rec in enumerate(records, start=1)]
+        for chunk in pack_messages(lines):
+            update.message.reply_html('\n'.join(chunk),
+                                      disable_web_page_preview=True)
+
+    @authorization_check
+    def cmd_stats(self, update):
+        """Send record store statistics."""
+        if not self._processor.record_store:
+            update.message.reply_text('Record store is disabled')
+            return
+        total, tops = self._processor.record_store.stats()
+        lines = [f'Records: {total}']
+        for kind, title in (('notifier', 'Top notifiers'),
+                            ('country', 'Top countries'),
+                            ('date', 'Latest dates')):
+            lines.append(f'\n{title}:')
+            lines.extend(f'  {key}: {count}' for key, count in tops[kind])
+        update.message.reply_text('\n'.join(lines))
+
+    @authorization_check
+    def cmd_profile(self, update):
+        """Profile scraping and delivery threads in background thread.
+
+        Command argument: profiling duration in seconds.
+        """
+        if not get_bot_threads():
+            update.message.reply_text('Scraping is not running, use /run')
+            return
+        self._run_profiling(update, self._profile, PROFILE_SECONDS)
 
-        self.send_document(chat_id=update.message.chat.id,
-                           document=csv_.get_data(),
-                           caption='csv data',
-                           filename='records.csv')
+    @authorization_check
+    def cmd_mem(self, update):
+        """Report memory allocations in background thread.
+
+        Command argument: allocation tracing duration in seconds.
+        """
+        self._run_profiling(update, self._trace_memory, MEM_TRACE_SECONDS)
+
+    def _run_profiling(self, update, target, default_seconds):
+        """Run one profiling session at a time."""
+        try:
+            seconds = parse_seconds(update.message.text, default_seconds,
+                                    PROFILE_MAX_SECONDS)
+        except exc.CommandArgsError as err:
+            update.message.reply_text(str(err))
+            return
+        if not self._profile_lock.acquire(blocking=False):
+            update.message.reply_text('Profiling is already in progress')
+            return
+        update.message.reply_text(f'Profiling for {seconds} seconds')
+        thread = Thread(target=self._profile_wrapper,
+                        args=(update, target, seconds),
+                        name='Profile thread', daemon=True)
+        thread.start()
+
+    def _profile_wrapper(self, update, target, seconds):
+        """Run profiling target and release profiling lock."""
+        try:
+            target(update, seconds)
+        except Exception:
+            err_msg = 'Failed to profile'
+            self._log.exception(err_msg)
+            update.message.reply_text(err_msg)
+        finally:
+            self._profile_lock.release()
+
+    def _profile(self, update, seconds):
+        """Sample bot threads and send report with pstats file."""
+        profiler = SamplingProfiler().run(seconds)
+        update.message.reply_text(
+            profiler.format_report()[:TELEGRAM_MAX_MSG_LEN])
+        if profiler.samples:
+            self.send_document(chat_id=update.message.chat.id,
+                               document=BytesIO(profiler.dump_stats()),
+                               caption=f'{profiler.samples} samples',
+                               filename=PROFILE_FILENAME)
+
+    def _trace_memory(self, update, seconds):
+        """Send top allocations and sizes of processing queues."""
+        lines = [f'Push queue: {len(self._processor.push_queue)} items',
+                 f'Seen index: {len(self._processor.seen_records)} records',
+                 format_memory_report(trace_memory(seconds))]
+        update.message.reply_text('\n'.join(lines)[:TELEGRAM_MAX_MSG_LEN])
 
     def _start_threads(self, update):
         """Start core threads during bot start"""
-        proc_thread = ProcessorThread(self._processor.push_queue,
-                                      self._processor.temp_queue)
-        pusher_thread = PusherThread(self._processor.push_queue, update)
-        self._thread_manager = ThreadManager([proc_thread, pusher_thread])
+        self._processor.push_queue.reopen()
+        pusher = Pusher(self._processor.conf, self._processor.push_queue,
+                        update)
+        engine = self._conf['zoneh'].get('engine', Engine.THREADS)
+        if engine == Engine.THREADS:
+            threads = [ProcessorThread(self._processor), PusherThread(pusher)]
+        elif engine == Engine.ASYNCIO:
+            from zoneh.aio.engine import AsyncEngineThread
+            threads = [AsyncEngineThread(self._processor, pusher)]
+        else:
+            raise exc.ConfigError(f'Invalid engine "{engine}", '
+                                  f'choose from {sorted(Engine.ALL)}')
+        self._thread_manager = ThreadManager(threads)
         self._thread_manager.start_threads()
 
     @authorization_check
     def solve_captcha(self, update):
         """Solve captcha."""
-        if not captcha.is_active:
-            self._log.warning('Captcha inactive, skip solving')
+        if not captcha_manager.has_pending:
+            self._log.warning('No pending captcha, skip solving')
             return
 
         self._log.info('Solving captcha')
-        is_solved = captcha_manager.solve_captcha(update.message.text)
+        reply_to = update.message.reply_to_message
+        is_solved = captcha_manager.solve_captcha(
+            update.message.text, reply_to.message_id if reply_to else None)
+        if is_solved is None:
+            return
         update.message.reply_text(
             'Captcha solved' if is_solved else 'Try again')
 